@@ -1,5 +1,5 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File
 from sqlalchemy import select, func
 from sqlalchemy.orm import Session
 from supabase import Client, create_client
@@ -14,8 +14,10 @@ from app.schemas.medication import (
     PaginatedResponse,
 )
 from app.services.session_service import get_current_user
+from app.services.enrichment_service import PENDING, enrich_medication
 
-from app.services.ocr_service import get_ocr_client
+from app.services.ocr_executor import OCRExecutor, get_ocr_executor
+from app.services.ocr_service import ImageTooLargeError, open_image
 
 router = APIRouter()
 
@@ -25,19 +27,32 @@ supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
 
 @router.post("/upload", response_model=MedicationResponse)
 async def upload_medication(
+    background_tasks: BackgroundTasks,
     image: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
-    ocr_client=Depends(get_ocr_client),
+    ocr_executor: OCRExecutor = Depends(get_ocr_executor),
 ):
-    """Upload and process a medication image."""
+    """Upload and process a medication image.
+
+    Active ingredients are extracted after the response is sent; the
+    medication's ``enrichment_status`` tracks the progress.
+    """
     try:
         # Upload image to Supabase storage
         file_path = f"medications/{current_user['id']}/{image.filename}"
 
-        file_content = await image.read()
+        # Read at most one byte past the limit, so oversized uploads never sit in memory
+        max_bytes = settings.OCR_MAX_IMAGE_BYTES
+        file_content = await image.read(max_bytes + 1)
         logger.info(f"File path: {file_path}")
 
+        # Reject oversized images before storing or decoding them
+        try:
+            open_image(file_content, max_bytes=max_bytes)
+        except ImageTooLargeError as e:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+
         # Upload to storage and check response
         supabase.storage.from_(settings.SUPABASE_BUCKET_NAME).upload(
             file_path, file_content, file_options={"content-type": image.content_type}
@@ -46,8 +61,8 @@ async def upload_medication(
         # Get public URL
         public_url = f"{settings.storage_url}/{file_path}"
 
-        # Process image with OCR
-        ocr_text = ocr_client.read_text(file_content)
+        # Process image with OCR in the worker pool
+        ocr_text = await ocr_executor.read_text(file_content)
 
         # Create medication record
         medication_data = MedicationCreate(
@@ -56,13 +71,17 @@ async def upload_medication(
             scanned_text=ocr_text,
         )
 
-        medication = Medication(**medication_data.model_dump())
+        medication = Medication(**medication_data.model_dump(), enrichment_status=PENDING)
         db.add(medication)
         db.commit()
         db.refresh(medication)
 
+        background_tasks.add_task(enrich_medication, medication.id, ocr_text)
+
         return MedicationResponse.model_validate(medication)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -49,6 +49,39 @@ class Settings(BaseSettings):
     # Storage
     STORAGE_URL: Optional[str] = None
 
+    # OCR
+    OCR_WORKERS: int = 1  # Worker processes for OCR, 0 runs OCR in a thread instead
+    OCR_CACHE_SIZE: int = 256  # Results kept in memory, 0 disables the memory tier
+    OCR_CACHE_DIR: Optional[str] = None  # Directory for cached results, unset disables it
+    OCR_CACHE_DISK_ENTRIES: int = (
+        10_000  # Results kept on disk, oldest pruned first, 0 is unbounded
+    )
+    OCR_MAX_BATCH_SIZE: int = 4  # Concurrent scans run as one batch, 1 disables batching
+    OCR_BATCH_WINDOW_MS: int = 20  # How long the first scan of a batch waits for others
+    OCR_TARGET_PIXELS: int = 2_000_000  # Scans are scaled to about this many pixels
+    OCR_TARGET_TEXT_HEIGHT: Optional[int] = None  # Scale to this text height in pixels instead
+    OCR_CASCADE: bool = True  # Try a fast low-resolution pass before full pre-processing
+    OCR_FAST_PASS_PIXELS: int = 1_000_000  # Size of the fast pass input
+    OCR_FAST_PASS_MIN_CONFIDENCE: float = 0.6  # Lower mean confidence escalates to the full pass
+    OCR_FAST_PASS_MIN_CHARS: int = 10  # Less text escalates to the full pass
+    OCR_MAX_IMAGE_BYTES: int = 20 * 1024 * 1024  # Larger uploads are rejected
+    OCR_MAX_IMAGE_PIXELS: int = 50_000_000  # Larger images are rejected before decoding
+
+    # Biomedical NER service
+    BIOMED_BACKEND: str = "http"  # "http" calls the model service, "embedded" runs it in-process
+    BIOMED_MODEL_PATH: Optional[str] = None  # Model service directory for the embedded backend
+    BIOMED_EMBEDDED_WORKERS: int = 1  # Embedded NER processes, 0 runs NER in a thread instead
+    BIOMED_CONNECT_TIMEOUT: float = 2.0  # Seconds to establish a connection
+    BIOMED_READ_TIMEOUT: float = 30.0  # Seconds to wait for a response
+    BIOMED_MAX_RETRIES: int = 2  # Retries after connection errors, timeouts and 502/503/504
+    BIOMED_RETRY_BACKOFF: float = 0.2  # Base of the randomized exponential retry delay
+    BIOMED_MAX_CONNECTIONS: int = 20  # Size of the keep-alive connection pool
+    BIOMED_MAX_BATCH_TEXTS: int = 1000  # Texts per batch call, the service's NLP_MAX_BATCH_TEXTS
+    BIOMED_BREAKER_FAILURES: int = 5  # Consecutive failures that take a replica out of rotation
+    BIOMED_BREAKER_RESET_SECONDS: float = 30.0  # How long before a failed replica is probed again
+    BIOMED_SLOW_RESPONSE_SECONDS: float = 10.0  # Slower responses count as replica failures
+    BIOMED_HEDGE: bool = False  # Also ask a second replica when a request passes the p95 latency
+
     # Logging
     LOG_LEVEL: str = "INFO"
     LOG_FILE: str = "app.log"
@@ -1,9 +1,13 @@
 """Application event handlers and health checks."""
 
-from typing import Callable
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable
 
 from app.core.database import engine
 from app.core.logging_config import logger
+from app.services.biomed_ner_client import close_ner_client, get_ner_client
+from app.services.ocr_executor import get_ocr_executor, shutdown_ocr_executor
 from fastapi import FastAPI, Response, status
 from sqlalchemy import text
 from tenacity import retry, stop_after_attempt, wait_exponential
@@ -44,6 +48,7 @@ def create_stop_app_handler(app: FastAPI) -> Callable:
     def stop_app() -> None:
         """Clean up application resources."""
         try:
+            shutdown_ocr_executor()
             engine.dispose()
             logger.info("Database connections closed")
         except Exception as e:
@@ -87,14 +92,16 @@ def setup_healthcheck(app: FastAPI) -> None:
         """Kubernetes readiness probe."""
         is_db_healthy = check_database_health()
         is_api_healthy = check_api_health()
+        ocr_executor = get_ocr_executor()
 
-        if not (is_db_healthy and is_api_healthy):
+        if not (is_db_healthy and is_api_healthy and ocr_executor.is_ready):
             response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
             return {
                 "status": "unavailable",
                 "details": {
                     "database": "healthy" if is_db_healthy else "unhealthy",
                     "api": "healthy" if is_api_healthy else "unhealthy",
+                    "ocr": ocr_executor.status,
                 },
             }
 
@@ -103,12 +110,44 @@ def setup_healthcheck(app: FastAPI) -> None:
             "details": {
                 "database": "healthy",
                 "api": "healthy",
+                "ocr": ocr_executor.status,
             },
         }
 
+    @app.get("/health/ocr", status_code=status.HTTP_200_OK)
+    def ocr_stats():
+        """OCR cache and batching metrics."""
+        return get_ocr_executor().stats()
+
+    @app.get("/health/ner", status_code=status.HTTP_200_OK)
+    def ner_stats():
+        """NER replica circuit breakers, retries and hedged requests."""
+        try:
+            return get_ner_client().stats()
+        except ValueError:
+            return {"status": "not_configured"}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Run startup and shutdown handlers around the application lifetime.
+
+    The OCR model is loaded and warmed up in the background, so the app can
+    answer probes meanwhile; /health/ready reports it once warm.
+    """
+    create_start_app_handler(app)()
+    ocr_warm_up = asyncio.create_task(get_ocr_executor().warm_up())
+    try:
+        yield
+    finally:
+        ocr_warm_up.cancel()
+        await close_ner_client()
+        create_stop_app_handler(app)()
+
 
 def setup_events(app: FastAPI) -> None:
-    """Configure application event handlers."""
-    app.add_event_handler("startup", create_start_app_handler(app))
-    app.add_event_handler("shutdown", create_stop_app_handler(app))
+    """Configure application event handlers.
+
+    Startup and shutdown run through ``lifespan``, passed to the app constructor.
+    """
     setup_healthcheck(app)
@@ -7,7 +7,7 @@ from fastapi.templating import Jinja2Templates
 
 from app.api.v1 import auth, medications
 from app.core.config import settings
-from app.core.events import setup_events
+from app.core.events import lifespan, setup_events
 from app.core.security import setup_security
 
 # Initialize FastAPI app
@@ -17,6 +17,7 @@ app = FastAPI(
     description="API for PillChecker application",
     docs_url="/api/docs" if settings.DEBUG else None,  # Disable docs in production
     redoc_url="/api/redoc" if settings.DEBUG else None,
+    lifespan=lifespan,
 )
 
 # Configure static files and templates
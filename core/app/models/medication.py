@@ -25,6 +25,8 @@ class Medication(Base):
         dosage: Dosage information
         prescription_details: Additional prescription details in JSON format
         scan_url: URL of the uploaded medication scan
+        enrichment_status: State of the background ingredient extraction
+        enriched_at: When the ingredient extraction finished
         created_at: Timestamp when the record was created
         updated_at: Timestamp when the record was last updated
         profile: Reference to the associated profile
@@ -60,6 +62,14 @@ class Medication(Base):
     scan_url: Mapped[Optional[str]] = Column(
         Text, nullable=True, comment="URL of the uploaded medication scan"
     )
+    enrichment_status: Mapped[Optional[str]] = Column(
+        String(length=20),
+        nullable=True,
+        comment="State of the ingredient extraction: pending, done, skipped or failed",
+    )
+    enriched_at: Mapped[Optional[datetime]] = Column(
+        DateTime, nullable=True, comment="When the ingredient extraction finished"
+    )
 
     # Relationships
     profile: Mapped["Profile"] = relationship("Profile", back_populates="medications")
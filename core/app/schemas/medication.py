@@ -56,6 +56,12 @@ class MedicationResponse(MedicationInDB):
     """Schema for medication response."""
 
     scan_url: Optional[str] = Field(None, description="URL of the uploaded medication scan")
+    enrichment_status: Optional[str] = Field(
+        None, description="State of the ingredient extraction: pending, done, skipped or failed"
+    )
+    enriched_at: Optional[datetime] = Field(
+        None, description="When the ingredient extraction finished"
+    )
 
 
 class PaginatedResponse(BaseSchema):
@@ -1,24 +1,388 @@
+"""Async client for the biomedical NER service."""
+
+import asyncio
 import os
+import time
+from collections import defaultdict, deque
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Sequence, Set, Union
+
+import httpx
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.services.single_flight import SingleFlight
+
+if TYPE_CHECKING:
+    from app.services.embedded_ner_client import EmbeddedNERClient
+
+# Only entity texts are used, so skip the linked entity details
+LEAN_SHAPE = {"fields": [], "max_candidates": 0}
+
+# Statuses worth retrying: the service is restarting, still loading its model or overloaded
+RETRY_STATUSES = {502, 503, 504}
+
+# Circuit breaker states of a replica
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Latencies kept per endpoint, and how many are needed before hedging starts
+LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+
+class NERServiceError(RuntimeError):
+    """Raised when the NER service fails or cannot be reached after all retries."""
+
+
+class _RetryableStatus(Exception):
+    """A response with a status from RETRY_STATUSES, raised to trigger a retry."""
+
+    def __init__(self, response: httpx.Response):
+        super().__init__(response.status_code)
+        self.response = response
+
 
-import requests
+class Replica:
+    """One NER service replica: its load and its circuit breaker.
+
+    The breaker opens after ``failure_threshold`` consecutive failures and
+    rejects requests for ``reset_timeout`` seconds. It then lets a single
+    probe request through: success closes it, failure opens it again.
+    """
+
+    def __init__(self, url: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.url = url
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        """``closed``, ``open`` or ``half_open``."""
+        if self.opened_at is None:
+            return CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return OPEN
+
+    @property
+    def is_available(self) -> bool:
+        """Whether a request may be sent to this replica now."""
+        state = self.state
+        return state == CLOSED or (state == HALF_OPEN and not self.probing)
+
+    def begin_request(self) -> bool:
+        """Count a request sent now. Returns whether it is the half-open probe."""
+        probe = self.state == HALF_OPEN
+        if probe:
+            self.probing = True
+        self.outstanding += 1
+        self.requests += 1
+        return probe
+
+    def end_request(self, probe: bool) -> None:
+        """Count a finished request, freeing the probe slot only if it held it."""
+        self.outstanding -= 1
+        if probe:
+            self.probing = False
+
+    def record_success(self) -> None:
+        """Close the breaker after a good response."""
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the breaker at the threshold or after a failed probe."""
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """State of the replica for the health endpoint."""
+        return {
+            "url": self.url,
+            "state": self.state,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "consecutive_failures": self.failures,
+        }
 
 
 class MedicalNERClient:
-    def __init__(self):
-        host = os.getenv("BIOMED_HOST")
-        if not host:
-            raise ValueError("Environment variable 'BIOMED_HOST' must be set.")
-        scheme = os.getenv("BIOMED_SCHEME", "http")
-        self.api_url = f"{scheme}://{host}"
-
-    def find_active_ingredients(self, text):
+    """Finds active ingredients in text with the NER service.
+
+    Requests are spread over the service replicas in ``api_urls``, each going
+    to the available replica with the fewest requests in flight. Every
+    replica has a circuit breaker that opens on consecutive connection
+    errors, timeouts, 502/503/504 responses or responses slower than
+    ``slow_response`` seconds, e.g. while the replica loads its model.
+
+    All calls share one keep-alive connection pool. Failed calls are retried
+    up to ``max_retries`` times on another replica where possible, waiting a
+    random, exponentially growing delay between attempts so that many
+    callers do not retry in lockstep. With ``hedge`` set, a request still
+    running after the 95th percentile of recent latencies is also sent to a
+    second replica and the first answer wins. Concurrent calls for the same
+    text share one request.
+    """
+
+    def __init__(
+        self,
+        api_urls: Optional[Sequence[str]] = None,
+        connect_timeout: float = 2.0,
+        read_timeout: float = 30.0,
+        max_retries: int = 2,
+        retry_backoff: float = 0.2,
+        retry_backoff_max: float = 5.0,
+        max_connections: int = 20,
+        max_batch_texts: int = 1000,
+        breaker_failures: int = 5,
+        breaker_reset: float = 30.0,
+        slow_response: float = 10.0,
+        hedge: bool = False,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        if api_urls is None:
+            hosts = [host.strip() for host in os.getenv("BIOMED_HOST", "").split(",")]
+            hosts = [host for host in hosts if host]
+            if not hosts:
+                raise ValueError("Environment variable 'BIOMED_HOST' must be set.")
+            scheme = os.getenv("BIOMED_SCHEME", "http")
+            api_urls = [f"{scheme}://{host}" for host in hosts]
+        self.replicas = [
+            Replica(url.rstrip("/"), breaker_failures, breaker_reset) for url in api_urls
+        ]
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.max_batch_texts = max_batch_texts
+        self.slow_response = slow_response
+        self.hedge = hedge
+        self.retries = 0
+        self.hedges = 0
+        self.single_flight = SingleFlight()
+        # Recent latencies of good responses per endpoint, for the hedging threshold
+        self.latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections, max_keepalive_connections=max_connections
+            ),
+            transport=transport,
+        )
+
+    def _pick_replica(self, tried: Set[Replica]) -> Optional[Replica]:
+        """The available replica with the fewest requests in flight, preferring untried ones."""
+        available = [replica for replica in self.replicas if replica.is_available]
+        untried = [replica for replica in available if replica not in tried]
+        candidates = untried or available
+        if not candidates:
+            return None
+        return min(candidates, key=lambda replica: (replica.outstanding, replica.requests))
+
+    def hedge_delay(self, path: str) -> Optional[float]:
+        """Seconds after which a request to ``path`` is hedged, None to not hedge."""
+        samples = self.latencies[path]
+        if not self.hedge or len(self.replicas) < 2 or len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+    def _start(
+        self, replica: Replica, path: str, payload: Dict[str, Any]
+    ) -> "asyncio.Task[httpx.Response]":
+        """Send to a replica in a task, holding its load and probe slot until the task ends."""
+        # Taken right after picking the replica, so no other request can claim the probe
+        probe = replica.begin_request()
+        task = asyncio.ensure_future(self._send(replica, path, payload))
+        # A callback also runs when the task is cancelled before it started
+        task.add_done_callback(lambda _: replica.end_request(probe))
+        return task
+
+    async def _send(self, replica: Replica, path: str, payload: Dict[str, Any]) -> httpx.Response:
+        """POST to one replica and update its breaker."""
+        started = time.perf_counter()
+        try:
+            response = await self._client.post(f"{replica.url}{path}", json=payload)
+        except httpx.TransportError:
+            replica.record_failure()
+            raise
+
+        elapsed = time.perf_counter() - started
+        if response.status_code in RETRY_STATUSES or elapsed > self.slow_response:
+            replica.record_failure()
+        else:
+            replica.record_success()
+            self.latencies[path].append(elapsed)
+        if response.status_code in RETRY_STATUSES:
+            raise _RetryableStatus(response)
+        return response
+
+    async def _attempt(
+        self, path: str, payload: Dict[str, Any], tried: Set[Replica]
+    ) -> httpx.Response:
+        """Send one attempt, hedged to a second replica if it runs too long."""
+        replica = self._pick_replica(tried)
+        if replica is None:
+            raise NERServiceError("No NER service replica available, all circuit breakers are open")
+        tried.add(replica)
+        first = self._start(replica, path, payload)
+        tasks = [first]
+        try:
+            delay = self.hedge_delay(path)
+            if delay is None:
+                return await first
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            backup = None if done else self._pick_replica(tried)
+            if backup is None or backup is replica:
+                return await first
+
+            tried.add(backup)
+            self.hedges += 1
+            tasks.append(self._start(backup, path, payload))
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                if not pending:
+                    # Both failed, report the one that was sent first
+                    return first.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST to the service with retries and return the decoded response."""
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(self.max_retries + 1),
+            wait=wait_random_exponential(multiplier=self.retry_backoff, max=self.retry_backoff_max),
+            retry=retry_if_exception_type((httpx.TransportError, _RetryableStatus)),
+            before_sleep=self._log_retry,
+            reraise=True,
+        )
+        tried: Set[Replica] = set()
+        try:
+            async for attempt in retrying:
+                with attempt:
+                    response = await self._attempt(path, payload, tried)
+        except _RetryableStatus as e:
+            response = e.response
+        except httpx.TransportError as e:
+            raise NERServiceError(f"API call to {path} failed: {e!r}") from e
+
+        if response.status_code != 200:
+            raise NERServiceError(
+                f"API call failed with status {response.status_code}: {response.text}"
+            )
+        return response.json()
+
+    def _log_retry(self, retry_state) -> None:
+        """Count and log a retry before waiting for it."""
+        self.retries += 1
+        logger.warning(
+            f"NER service call failed ({retry_state.outcome.exception()!r}), "
+            f"retry {retry_state.attempt_number} of {self.max_retries}"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Replica states, retries, hedged and coalesced requests."""
+        return {
+            "backend": "http",
+            "replicas": [replica.stats() for replica in self.replicas],
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "coalescing": self.single_flight.stats(),
+            "hedge_after": {path: self.hedge_delay(path) for path in self.latencies},
+        }
+
+    async def find_active_ingredients(self, text: str) -> List[str]:
         """
         Sends text to the API and retrieves recognized entities.
         """
-        response = requests.post(f"{self.api_url}/extract_entities", json={"text": text})
-        if response.status_code != 200:
-            raise RuntimeError(
-                f"API call failed with status {response.status_code}: {response.text}"
+        payload = {"text": text, "shape": LEAN_SHAPE}
+        result = await self.single_flight.run(
+            text, lambda: self._post("/extract_entities", payload)
+        )
+        return [entity["text"] for entity in result["entities"]]
+
+    async def find_active_ingredients_batch(self, texts: List[str]) -> List[List[str]]:
+        """Recognize entities in many texts, in input order.
+
+        Texts are sent to the batch endpoint in groups of at most
+        ``max_batch_texts``, the service's limit per call.
+        """
+        ingredients = []
+        for start in range(0, len(texts), self.max_batch_texts):
+            payload = {"texts": texts[start : start + self.max_batch_texts], "shape": LEAN_SHAPE}
+            result = await self._post("/extract_entities_batch", payload)
+            ingredients.extend(
+                [entity["text"] for entity in item["entities"]] for item in result["results"]
             )
-        result = [entity["text"] for entity in response.json()["entities"]]
-        return result
+        return ingredients
+
+    async def aclose(self) -> None:
+        """Close the pooled connections."""
+        await self._client.aclose()
+
+
+_ner_client = None
+
+
+def get_ner_client() -> Union[MedicalNERClient, "EmbeddedNERClient"]:
+    """Get or create the NER client singleton.
+
+    BIOMED_BACKEND picks the HTTP client or the embedded pipeline, which has
+    the same interface.
+    """
+    global _ner_client
+    if _ner_client is not None:
+        return _ner_client
+
+    if settings.BIOMED_BACKEND == "http":
+        _ner_client = MedicalNERClient(
+            connect_timeout=settings.BIOMED_CONNECT_TIMEOUT,
+            read_timeout=settings.BIOMED_READ_TIMEOUT,
+            max_retries=settings.BIOMED_MAX_RETRIES,
+            retry_backoff=settings.BIOMED_RETRY_BACKOFF,
+            max_connections=settings.BIOMED_MAX_CONNECTIONS,
+            max_batch_texts=settings.BIOMED_MAX_BATCH_TEXTS,
+            breaker_failures=settings.BIOMED_BREAKER_FAILURES,
+            breaker_reset=settings.BIOMED_BREAKER_RESET_SECONDS,
+            slow_response=settings.BIOMED_SLOW_RESPONSE_SECONDS,
+            hedge=settings.BIOMED_HEDGE,
+        )
+    elif settings.BIOMED_BACKEND == "embedded":
+        from app.services.embedded_ner_client import EmbeddedNERClient
+
+        _ner_client = EmbeddedNERClient(
+            model_path=settings.BIOMED_MODEL_PATH,
+            workers=settings.BIOMED_EMBEDDED_WORKERS,
+            max_batch_texts=settings.BIOMED_MAX_BATCH_TEXTS,
+        )
+    else:
+        raise ValueError(
+            f"BIOMED_BACKEND must be 'http' or 'embedded', got {settings.BIOMED_BACKEND!r}"
+        )
+    return _ner_client
+
+
+async def close_ner_client() -> None:
+    """Close the NER client singleton if it was created."""
+    global _ner_client
+    if _ner_client is not None:
+        await _ner_client.aclose()
+        _ner_client = None
@@ -0,0 +1,177 @@
+"""In-process NER backend running the model service pipeline in a worker process."""
+
+import asyncio
+import importlib
+import multiprocessing
+import sys
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from types import ModuleType
+from typing import Any, Dict, List, Optional
+
+from app.core.logging_config import logger
+from app.services.biomed_ner_client import NERServiceError
+from app.services.single_flight import SingleFlight
+
+# Model service loaded by the current pool worker process
+_worker_service = None
+
+
+def load_model_service(model_path: str) -> ModuleType:
+    """Import the model service from its directory and load its pipeline.
+
+    The service module reads its NLP_* settings from the environment, so
+    profiles, the dictionary and snapshots work as in the HTTP service.
+    """
+    if model_path not in sys.path:
+        sys.path.insert(0, model_path)
+    service = importlib.import_module("main")
+    service.load_model()
+    if not service.model_state.is_ready:
+        raise RuntimeError(f"NER model failed to load: {service.model_state.error}")
+    return service
+
+
+def extract_ingredients(
+    service: ModuleType, texts: List[str], profile: Optional[str] = None
+) -> List[List[str]]:
+    """Entity texts of every text, with the service's default dictionary setting."""
+    runner = service.get_profile(profile)
+    dictionary = service.get_dictionary(None)
+    results = runner.extract_batch(texts, service.BATCH_SIZE, 1, dictionary)
+    return [[text for text, _ in mentions] for mentions in results]
+
+
+def _init_worker(model_path: str) -> None:
+    """Load the pipeline inside a pool worker process."""
+    global _worker_service
+    _worker_service = load_model_service(model_path)
+
+
+def _worker_extract(texts: List[str], profile: Optional[str]) -> List[List[str]]:
+    """Run NER inside a pool worker process."""
+    return extract_ingredients(_worker_service, texts, profile)
+
+
+class EmbeddedNERClient:
+    """Finds active ingredients with the model service pipeline, without HTTP.
+
+    Has the interface of MedicalNERClient. The pipeline from the model
+    service directory ``model_path`` is loaded on first use, in a worker
+    process so that loading and inference never block the event loop. With
+    ``workers`` set to 0 it runs on the default thread pool of the current
+    process instead, which is useful for tests and local development.
+    """
+
+    def __init__(
+        self,
+        model_path: Optional[str],
+        workers: int = 1,
+        profile: Optional[str] = None,
+        max_batch_texts: int = 1000,
+    ):
+        if not model_path:
+            raise ValueError("BIOMED_MODEL_PATH must be set for the embedded NER backend.")
+        self.model_path = model_path
+        self.workers = workers
+        self.profile = profile
+        self.max_batch_texts = max_batch_texts
+        self.single_flight = SingleFlight()
+        self._pool: Optional[Executor] = None
+        self._service: Optional[ModuleType] = None
+        self._load_lock = threading.Lock()
+
+        # Model loading state: loading happens during the first call
+        self.status = "not_started"
+        self.load_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def _get_pool(self) -> Executor:
+        """Start the worker pool on first use."""
+        if self._pool is None:
+            # Spawn rather than fork: the parent may already hold torch threads
+            context = multiprocessing.get_context("spawn")
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.model_path,),
+            )
+            logger.info(f"NER process pool started with {self.workers} worker(s)")
+        return self._pool
+
+    def _extract_in_thread(self, texts: List[str]) -> List[List[str]]:
+        """Run NER in the current process, loading the pipeline once."""
+        with self._load_lock:
+            if self._service is None:
+                self._service = load_model_service(self.model_path)
+        return extract_ingredients(self._service, texts, self.profile)
+
+    async def _extract(self, texts: List[str]) -> List[List[str]]:
+        """Run NER on a list of texts without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        if self.status in ("not_started", "failed"):
+            self.status = "loading"
+        try:
+            if self.workers <= 0:
+                results = await loop.run_in_executor(None, self._extract_in_thread, texts)
+            else:
+                pool = self._get_pool()
+                results = await loop.run_in_executor(pool, _worker_extract, texts, self.profile)
+        except BrokenProcessPool as e:
+            # The worker died, usually while loading the model; start over on the next call
+            self._pool = None
+            self._fail(e)
+            raise NERServiceError(f"Embedded NER worker failed: {e}") from e
+        except Exception as e:
+            if self.status == "loading":
+                self._fail(e)
+            raise NERServiceError(f"Embedded NER failed: {e!r}") from e
+
+        if self.status == "loading":
+            self.load_seconds = round(time.perf_counter() - started, 3)
+            self.status = "ready"
+            self.error = None
+            logger.info(f"Embedded NER ready after {self.load_seconds} s")
+        return results
+
+    def _fail(self, error: Exception) -> None:
+        """Record a failed model load."""
+        self.status = "failed"
+        self.error = str(error)
+        logger.error(f"Embedded NER failed to load: {error}")
+
+    async def find_active_ingredients(self, text: str) -> List[str]:
+        """
+        Runs NER on the text and returns the recognized entities.
+        """
+        results = await self.single_flight.run(text, lambda: self._extract([text]))
+        return list(results[0])
+
+    async def find_active_ingredients_batch(self, texts: List[str]) -> List[List[str]]:
+        """Recognize entities in many texts, in input order."""
+        ingredients = []
+        for start in range(0, len(texts), self.max_batch_texts):
+            ingredients.extend(await self._extract(texts[start : start + self.max_batch_texts]))
+        return ingredients
+
+    def stats(self) -> Dict[str, Any]:
+        """Model state and coalesced requests."""
+        return {
+            "backend": "embedded",
+            "status": self.status,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+            "workers": self.workers,
+            "coalescing": self.single_flight.stats(),
+        }
+
+    async def aclose(self) -> None:
+        """Stop the worker pool."""
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+            logger.info("NER process pool stopped")
@@ -0,0 +1,96 @@
+"""Background extraction of active ingredients from uploaded scans."""
+
+import asyncio
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.core.logging_config import logger
+from app.models.medication import Medication
+from app.services.biomed_ner_client import MedicalNERClient, get_ner_client
+
+# Values of Medication.enrichment_status
+PENDING = "pending"
+DONE = "done"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+# Longest active_ingredients value accepted by the medication schemas
+MAX_INGREDIENTS_LENGTH = 500
+
+
+def format_ingredients(
+    ingredients: List[str], max_length: int = MAX_INGREDIENTS_LENGTH
+) -> Optional[str]:
+    """Join recognized ingredients into the text stored on the medication.
+
+    Repeated ingredients are listed once, in order of first mention.
+    Ingredients that would exceed ``max_length`` are left out.
+    """
+    seen = set()
+    unique = []
+    for ingredient in ingredients:
+        ingredient = " ".join(ingredient.split())
+        if ingredient and ingredient.casefold() not in seen:
+            seen.add(ingredient.casefold())
+            unique.append(ingredient)
+
+    text = ""
+    for ingredient in unique:
+        candidate = f"{text}, {ingredient}" if text else ingredient
+        if len(candidate) > max_length:
+            break
+        text = candidate
+    return text or None
+
+
+def _store_enrichment(
+    session_factory: Callable[[], Session],
+    medication_id: int,
+    status: str,
+    active_ingredients: Optional[str] = None,
+) -> None:
+    """Record the enrichment result on the medication row."""
+    with session_factory() as session:
+        medication = session.get(Medication, medication_id)
+        if medication is None:
+            logger.warning(f"Medication {medication_id} was deleted before enrichment finished")
+            return
+        if status == DONE:
+            medication.active_ingredients = active_ingredients
+        medication.enrichment_status = status
+        medication.enriched_at = datetime.utcnow()
+        session.commit()
+
+
+async def enrich_medication(
+    medication_id: int,
+    scanned_text: Optional[str],
+    ner_client: Optional[MedicalNERClient] = None,
+    session_factory: Callable[[], Session] = SessionLocal,
+) -> str:
+    """Find the active ingredients in a scan's text and store them on its medication.
+
+    Runs as a background task after the upload response is sent, so NER
+    latency and failures never reach the upload. Returns the final status.
+    """
+    status = SKIPPED
+    active_ingredients = None
+    if scanned_text and scanned_text.strip():
+        try:
+            ner_client = ner_client or get_ner_client()
+            ingredients = await ner_client.find_active_ingredients(scanned_text)
+            active_ingredients = format_ingredients(ingredients)
+            status = DONE
+        except Exception as e:
+            logger.error(f"Ingredient extraction failed for medication {medication_id}: {e}")
+            status = FAILED
+
+    # The database session is synchronous, keep it off the event loop
+    await asyncio.to_thread(
+        _store_enrichment, session_factory, medication_id, status, active_ingredients
+    )
+    logger.info(f"Enrichment of medication {medication_id}: {status}")
+    return status
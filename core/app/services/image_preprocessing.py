@@ -0,0 +1,376 @@
+"""Vectorized image pre-processing for OCR.
+
+Every stage works on a single 8-bit grayscale ``numpy`` buffer and writes its
+result back into it, so a scan allocates one working buffer plus a small
+scratch area instead of a new image per stage. Pointwise stages are applied
+through lookup tables and reproduce the output of the equivalent PIL
+operations pixel for pixel.
+"""
+
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.core.logging_config import logger
+
+# Bump whenever decoding or a stage changes its output, invalidates cached OCR results
+PIPELINE_VERSION = 4
+
+# Image.info key holding the size of a scan before draft decoding reduced it
+ORIGINAL_SIZE_KEY = "ocr_original_size"
+
+# Rows processed per block by the median filter, bounds its scratch memory
+MEDIAN_BLOCK_ROWS = 256
+
+
+def to_grayscale_array(image: Image.Image) -> np.ndarray:
+    """Convert an image to a writable 8-bit grayscale array."""
+    if image.mode != "L":
+        image = image.convert("L")
+    return np.array(image, dtype=np.uint8)
+
+
+def _blend_lut(base: np.ndarray, factor: float) -> np.ndarray:
+    """Build the lookup table of ``PIL.Image.blend(base, pixel, factor)``."""
+    pixels = np.arange(256, dtype=np.float32)
+    base = base.astype(np.float32)
+    values = base + np.float32(factor) * (pixels - base)
+    return np.clip(np.trunc(values), 0, 255).astype(np.uint8)
+
+
+def apply_contrast(gray: np.ndarray, factor: float = 1.5) -> np.ndarray:
+    """Enhance contrast in place, matching ``ImageEnhance.Contrast``."""
+    mean = int(int(gray.sum(dtype=np.uint64)) / max(gray.size, 1) + 0.5)
+    lut = _blend_lut(np.array(mean), factor)
+    np.take(lut, gray, out=gray, mode="clip")
+    return gray
+
+
+def apply_sharpness(
+    gray: np.ndarray, factor: float = 2.0, scratch: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Enhance sharpness in place, matching ``ImageEnhance.Sharpness``.
+
+    The image is blended with its ``ImageFilter.SMOOTH`` version. Border pixels
+    are left untouched, as PIL does.
+    """
+    height, width = gray.shape
+    if height < 3 or width < 3:
+        return gray
+
+    inner = (slice(1, -1), slice(1, -1))
+    if scratch is None:
+        scratch = np.empty((height - 2, width - 2), dtype=np.uint16)
+
+    # Sum of the 3x3 neighbourhood with a centre weight of 5
+    np.multiply(gray[inner], 5, out=scratch, dtype=np.uint16)
+    for dy in range(3):
+        for dx in range(3):
+            if dy == 1 and dx == 1:
+                continue
+            np.add(scratch, gray[dy : height - 2 + dy, dx : width - 2 + dx], out=scratch)
+
+    # Rounded division by the kernel scale
+    scratch *= 2
+    scratch += 13
+    scratch //= 26
+
+    # Index a (smoothed, original) lookup table of blended values
+    lut = _blend_lut(np.arange(256).reshape(256, 1), factor).ravel()
+    scratch <<= 8
+    scratch |= gray[inner]
+    np.take(lut, scratch, out=gray[inner], mode="clip")
+    return gray
+
+
+def apply_median(gray: np.ndarray, block_rows: int = MEDIAN_BLOCK_ROWS) -> np.ndarray:
+    """Apply a 3x3 median filter in place, matching ``ImageFilter.MedianFilter(3)``.
+
+    Each vertical triplet is sorted once and the median of the 3x3 window is
+    taken as the median of the column minimum, middle and maximum values.
+    """
+    padded = np.pad(gray, 1, mode="edge")
+    height = gray.shape[0]
+
+    for top in range(0, height, block_rows):
+        bottom = min(top + block_rows, height)
+        upper = padded[top:bottom]
+        centre = padded[top + 1 : bottom + 1]
+        lower = padded[top + 2 : bottom + 2]
+
+        # Sort each vertical triplet into low, mid and high
+        low = np.minimum(upper, centre)
+        high = np.maximum(upper, centre)
+        mid = np.maximum(low, lower)
+        np.minimum(low, lower, out=low)
+        temp = np.minimum(high, mid)
+        np.maximum(high, mid, out=high)
+        mid = temp
+
+        # Combine the three columns of every window
+        left, middle, right = (slice(None, -2), slice(1, -1), slice(2, None))
+        max_low = np.maximum(low[:, left], low[:, middle])
+        np.maximum(max_low, low[:, right], out=max_low)
+        min_high = np.minimum(high[:, left], high[:, middle])
+        np.minimum(min_high, high[:, right], out=min_high)
+        med_mid = _median3(mid[:, left], mid[:, middle], mid[:, right])
+
+        gray[top:bottom] = _median3(max_low, med_mid, min_high)
+
+    return gray
+
+
+def _median3(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """Element-wise median of three arrays."""
+    low = np.minimum(a, b)
+    high = np.maximum(a, b)
+    np.minimum(high, c, out=high)
+    return np.maximum(low, high, out=low)
+
+
+def apply_threshold(gray: np.ndarray, threshold: int = 128) -> np.ndarray:
+    """Binarize in place: pixels above ``threshold`` become 255, others 0."""
+    lut = np.where(np.arange(256) > threshold, 255, 0).astype(np.uint8)
+    np.take(lut, gray, out=gray, mode="clip")
+    return gray
+
+
+def crop_and_resize(gray: np.ndarray, scale_factor: float = 2.0, border: int = 10) -> np.ndarray:
+    """Crop ``border`` output pixels and resize the remaining area with LANCZOS.
+
+    The crop box is applied in source coordinates before resampling, so border
+    pixels are never resized. The result equals resizing the full image and
+    cropping ``border`` pixels afterwards. Without scaling the cropped view of
+    ``gray`` is returned as is.
+    """
+    height, width = gray.shape
+    if scale_factor == 1:
+        return gray[border : height - border, border : width - border]
+
+    source_border = border / scale_factor
+    box = (source_border, source_border, width - source_border, height - source_border)
+    size = (int(width * scale_factor) - 2 * border, int(height * scale_factor) - 2 * border)
+    return np.asarray(Image.fromarray(gray).resize(size, Image.LANCZOS, box=box))
+
+
+def pad_to_shape(gray: np.ndarray, shape: Tuple[int, int], fill: int = 255) -> np.ndarray:
+    """Pad an image at the bottom and right to ``shape``, e.g. to stack a batch.
+
+    The padding defaults to white, the background of binarized labels.
+    """
+    if gray.shape == tuple(shape):
+        return gray
+    padded = np.full(shape, fill, dtype=gray.dtype)
+    padded[: gray.shape[0], : gray.shape[1]] = gray
+    return padded
+
+
+def estimate_text_height(
+    gray: np.ndarray, threshold: int = 128, sample_step: int = 4
+) -> Optional[float]:
+    """Estimate the height of text lines in pixels from the ink row profile.
+
+    Rows containing ink form runs, one per text line, and the median run
+    length is taken as the text height. Columns are sampled every
+    ``sample_step`` pixels to keep this cheap on large scans.
+    """
+    ink = gray[:, ::sample_step] <= threshold
+    if ink.mean() > 0.5:
+        # Light text on a dark background
+        ink = ~ink
+    ink_rows = np.concatenate(([False], ink.mean(axis=1) > 0.01, [False]))
+    edges = np.flatnonzero(ink_rows[1:] != ink_rows[:-1])
+    runs = edges[1::2] - edges[::2]
+    runs = runs[runs >= 2]
+    if runs.size == 0:
+        return None
+    return float(np.median(runs))
+
+
+class ResizeDecision(NamedTuple):
+    """Scale chosen for a scan and why."""
+
+    scale: float
+    reason: str
+    text_height: Optional[float] = None
+
+
+class ResizePolicy:
+    """Chooses how much to scale a scan before text detection.
+
+    By default the scale brings the image to about ``target_pixels`` pixels.
+    With ``target_text_height`` set, the scale brings the estimated text height
+    to that many pixels instead, falling back to the pixel target when no text
+    lines are found. Scales within ``tolerance`` of 1 are not applied.
+    """
+
+    def __init__(
+        self,
+        target_pixels: int = 2_000_000,
+        target_text_height: Optional[int] = None,
+        min_scale: float = 0.25,
+        max_scale: float = 2.0,
+        tolerance: float = 0.05,
+    ):
+        self.target_pixels = target_pixels
+        self.target_text_height = target_text_height
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.tolerance = tolerance
+
+    @property
+    def version(self) -> str:
+        """Identify the policy parameters."""
+        return (
+            f"p{self.target_pixels}-h{self.target_text_height}"
+            f"-{self.min_scale}:{self.max_scale}:{self.tolerance}"
+        )
+
+    def _clamp(self, scale: float) -> float:
+        """Limit a scale to the allowed range, snapping values close to 1."""
+        scale = min(max(scale, self.min_scale), self.max_scale)
+        if abs(scale - 1) <= self.tolerance:
+            return 1.0
+        return scale
+
+    def scale_for_size(self, width: int, height: int) -> ResizeDecision:
+        """Scale that brings an image of the given size to the pixel target."""
+        pixels = max(width * height, 1)
+        scale = self._clamp((self.target_pixels / pixels) ** 0.5)
+        return ResizeDecision(scale, f"{pixels} px, target {self.target_pixels} px")
+
+    def decide(self, image: Image.Image) -> ResizeDecision:
+        """Choose the scale of a grayscale image."""
+        if self.target_text_height:
+            text_height = estimate_text_height(np.asarray(image))
+            if text_height:
+                scale = self._clamp(self.target_text_height / text_height)
+                return ResizeDecision(
+                    scale,
+                    f"text height {text_height:.0f} px, target {self.target_text_height} px",
+                    text_height,
+                )
+        return self.scale_for_size(*image.size)
+
+
+class ImagePreprocessor:
+    """Fused OCR pre-processing pipeline over a single grayscale buffer.
+
+    Scans are downscaled before the other stages, so large photos are cheaper
+    to process, and upscaled at the end. A fixed ``scale_factor`` bypasses the
+    resize policy.
+    """
+
+    def __init__(
+        self,
+        contrast: float = 1.5,
+        sharpness: float = 2.0,
+        threshold: int = 128,
+        scale_factor: Optional[float] = None,
+        border: int = 10,
+        resize_policy: Optional[ResizePolicy] = None,
+    ):
+        self.contrast = contrast
+        self.sharpness = sharpness
+        self.threshold = threshold
+        self.scale_factor = scale_factor
+        self.border = border
+        self.resize_policy = resize_policy or ResizePolicy()
+
+    @property
+    def version(self) -> str:
+        """Identify the pipeline and its parameters, e.g. for cache keys."""
+        scaling = self.scale_factor if self.scale_factor else self.resize_policy.version
+        return (
+            f"v{PIPELINE_VERSION}-c{self.contrast}-s{self.sharpness}-t{self.threshold}"
+            f"-x{scaling}-b{self.border}"
+        )
+
+    def decide_scale(
+        self, image: Image.Image, original_size: Optional[Tuple[int, int]] = None
+    ) -> ResizeDecision:
+        """Choose the scale of a grayscale image.
+
+        For an image the decoder already reduced from ``original_size`` (see
+        ``draft``), the scale is chosen for the original size and only the
+        part the decoder has not applied yet is returned.
+        """
+        if not original_size or original_size == image.size:
+            if self.scale_factor:
+                return ResizeDecision(self.scale_factor, "fixed scale factor")
+            return self.resize_policy.decide(image)
+
+        if self.scale_factor:
+            decision = ResizeDecision(self.scale_factor, "fixed scale factor")
+        else:
+            decision = self.resize_policy.scale_for_size(*original_size)
+        remaining = decision.scale * original_size[0] / image.size[0]
+        if abs(remaining - 1) <= self.resize_policy.tolerance:
+            remaining = 1.0
+        return decision._replace(
+            scale=remaining,
+            reason=f"{decision.reason}, decoded from {original_size[0]}x{original_size[1]}",
+        )
+
+    def draft(self, image: Image.Image) -> Image.Image:
+        """Configure a not yet decoded image to decode at reduced resolution.
+
+        JPEG can be decoded directly at 1/2, 1/4 or 1/8 scale and to grayscale.
+        This only applies when the target size is known from the image size,
+        i.e. with a fixed scale factor or the pixel target of the policy. The
+        original size is kept in ``image.info`` so ``process`` applies only
+        the rest of the scale.
+        """
+        if image.format != "JPEG":
+            return image
+        if self.scale_factor:
+            scale = self.scale_factor
+        elif self.resize_policy.target_text_height:
+            return image
+        else:
+            scale = self.resize_policy.scale_for_size(*image.size).scale
+
+        if scale < 1:
+            width, height = image.size
+            image.draft("L", (max(int(width * scale), 1), max(int(height * scale), 1)))
+            if image.size != (width, height):
+                image.info[ORIGINAL_SIZE_KEY] = (width, height)
+        return image
+
+    def process_fast(self, image: Image.Image, target_pixels: int) -> np.ndarray:
+        """Convert to grayscale and downscale to about ``target_pixels``, nothing else."""
+        if image.mode != "L":
+            image = image.convert("L")
+        width, height = image.size
+        scale = min((target_pixels / max(width * height, 1)) ** 0.5, 1.0)
+        if scale < 1:
+            size = (max(int(width * scale), 1), max(int(height * scale), 1))
+            image = image.resize(size, Image.LANCZOS)
+        return to_grayscale_array(image)
+
+    def process(self, image: Image.Image) -> np.ndarray:
+        """Run grayscale, contrast, sharpness, denoise, threshold, crop and resize.
+
+        Returns a single-channel array that can be passed to EasyOCR directly.
+        """
+        original_size = image.info.get(ORIGINAL_SIZE_KEY)
+        if image.mode != "L":
+            image = image.convert("L")
+
+        decision = self.decide_scale(image, original_size)
+        width, height = image.size
+        logger.info(f"OCR resize {width}x{height} by {decision.scale:.2f} ({decision.reason})")
+
+        scale = decision.scale
+        if scale < 1:
+            size = (max(int(width * scale), 1), max(int(height * scale), 1))
+            image = image.resize(size, Image.LANCZOS)
+            scale = 1
+
+        gray = to_grayscale_array(image)
+        apply_contrast(gray, self.contrast)
+        apply_sharpness(gray, self.sharpness)
+        apply_median(gray)
+        apply_threshold(gray, self.threshold)
+        return crop_and_resize(gray, scale, self.border)
@@ -0,0 +1,238 @@
+"""Process pool executor that keeps OCR work off the event loop."""
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Union
+
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.services.ocr_scheduler import OCRBatchScheduler
+from app.services.single_flight import SingleFlight
+from app.services.ocr_service import (
+    OCRResult,
+    OCRResultCache,
+    create_warm_up_image,
+    get_ocr_client,
+    get_ocr_version,
+)
+
+# EasyOCR client owned by the current pool worker process
+_worker_client = None
+
+
+def _init_worker(languages: List[str]) -> None:
+    """Load a dedicated EasyOCR reader inside a pool worker process and warm it up.
+
+    The warm-up inference runs before the worker takes any job, so every
+    process pays the first-inference cost instead of some user request.
+    """
+    global _worker_client
+    _worker_client = get_ocr_client(languages=languages)
+    _worker_client.scan(create_warm_up_image())
+
+
+def _worker_pid() -> int:
+    """Identify a pool worker; only runs once the worker's initializer has finished."""
+    return os.getpid()
+
+
+def _worker_scan(image_data: bytes) -> OCRResult:
+    """Run OCR on raw image bytes inside a pool worker process."""
+    return _worker_client.scan(image_data)
+
+
+def _worker_scan_batch(images: List[bytes]) -> List[Union[OCRResult, Exception]]:
+    """Run batched OCR on raw image bytes inside a pool worker process."""
+    return _worker_client.scan_batch(images)
+
+
+class OCRExecutor:
+    """Runs OCR in a pool of worker processes, each holding its own reader.
+
+    With ``workers`` set to 0 OCR runs on the default thread pool of the
+    current process instead, which is useful for tests and local development.
+    Results found in ``cache`` are returned without running OCR. With
+    ``max_batch_size`` above 1 concurrent requests are grouped into batches
+    for EasyOCR's batched API. Concurrent requests for the same image bytes
+    share a single OCR run.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        languages: Optional[List[str]] = None,
+        cache: Optional[OCRResultCache] = None,
+        max_batch_size: int = 1,
+        batch_window: float = 0.02,
+    ):
+        self.workers = workers
+        self.languages = languages or ["en"]
+        self.cache = cache
+        self.scheduler = None
+        if max_batch_size > 1:
+            self.scheduler = OCRBatchScheduler(
+                self._run_batch, max_batch_size=max_batch_size, batch_window=batch_window
+            )
+        self._pool: Optional[Executor] = None
+        self.single_flight = SingleFlight()
+        # Scans per OCR path: "fast", "full" or "cache"
+        self.paths = Counter()
+
+        # Model loading state, see warm_up
+        self.status = "not_started"
+        self.warm_up_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def is_ready(self) -> bool:
+        """Whether the OCR model is loaded and has completed a warm-up inference."""
+        return self.status == "ready"
+
+    async def warm_up(self) -> None:
+        """Load the OCR model and run one inference on a synthetic image.
+
+        In pool mode every worker is started and runs the warm-up inference
+        in its initializer; the executor is ready once each worker has taken
+        a job. Failures are recorded in ``status`` and ``error`` rather than
+        raised.
+        """
+        self.status = "loading"
+        started = time.perf_counter()
+        image_data = create_warm_up_image()
+        loop = asyncio.get_running_loop()
+        try:
+            if self.workers <= 0:
+                client = get_ocr_client(languages=self.languages)
+                await loop.run_in_executor(None, client.scan, image_data)
+            else:
+                # Concurrent jobs make the pool spawn all of its workers. A fast
+                # worker can take several jobs, so repeat until each one answered.
+                pool = self._get_pool()
+                warm_workers = set()
+                while True:
+                    pids = await asyncio.gather(
+                        *(loop.run_in_executor(pool, _worker_pid) for _ in range(self.workers))
+                    )
+                    warm_workers.update(pids)
+                    if len(warm_workers) >= self.workers:
+                        break
+                    await asyncio.sleep(0.1)
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            logger.error(f"OCR warm-up failed: {e}")
+            return
+
+        self.warm_up_seconds = round(time.perf_counter() - started, 3)
+        self.status = "ready"
+        logger.info(f"OCR ready after {self.warm_up_seconds} s")
+
+    def _get_pool(self) -> Executor:
+        """Start the worker pool on first use."""
+        if self._pool is None:
+            # Spawn rather than fork: the parent may already hold torch threads
+            context = multiprocessing.get_context("spawn")
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.languages,),
+            )
+            logger.info(f"OCR process pool started with {self.workers} worker(s)")
+        return self._pool
+
+    async def read_text(self, image_data: bytes) -> str:
+        """Extract text from image bytes without blocking the event loop."""
+        if self.cache is not None:
+            key = self.cache.key_for(image_data)
+            text = await self.cache.get_async(key)
+            if text is not None:
+                self.paths["cache"] += 1
+                return text
+        else:
+            key = hashlib.sha256(image_data).hexdigest()
+
+        return await self.single_flight.run(key, lambda: self._read_uncached(key, image_data))
+
+    async def _read_uncached(self, key: str, image_data: bytes) -> str:
+        """Run OCR on an image missing from the cache and cache the result."""
+        result = await self._run(image_data)
+        self.paths[result.path] += 1
+        if self.cache is not None:
+            await self.cache.put_async(key, result.text)
+        return result.text
+
+    async def _run(self, image_data: bytes) -> OCRResult:
+        """Run OCR in the worker pool, or in a thread when there are no workers."""
+        if self.scheduler is not None:
+            return await self.scheduler.submit(image_data)
+
+        loop = asyncio.get_running_loop()
+        if self.workers <= 0:
+            client = get_ocr_client(languages=self.languages)
+            return await loop.run_in_executor(None, client.scan, image_data)
+        return await loop.run_in_executor(self._get_pool(), _worker_scan, image_data)
+
+    async def _run_batch(self, images: List[bytes]) -> List[Union[OCRResult, Exception]]:
+        """Run one batch of images with a single batched OCR call."""
+        loop = asyncio.get_running_loop()
+        if self.workers <= 0:
+            client = get_ocr_client(languages=self.languages)
+            return await loop.run_in_executor(None, client.scan_batch, images)
+        return await loop.run_in_executor(self._get_pool(), _worker_scan_batch, images)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache, OCR path, coalescing and batching statistics."""
+        return {
+            "status": self.status,
+            "warm_up_seconds": self.warm_up_seconds,
+            "workers": self.workers,
+            "paths": dict(self.paths),
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "coalescing": self.single_flight.stats(),
+            "batching": self.scheduler.stats() if self.scheduler is not None else None,
+        }
+
+    def shutdown(self) -> None:
+        """Stop the worker pool, cancelling queued work."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+            logger.info("OCR process pool stopped")
+
+
+_ocr_executor = None
+
+
+def get_ocr_executor() -> OCRExecutor:
+    """Get or create the OCR executor singleton."""
+    global _ocr_executor
+    if _ocr_executor is None:
+        cache = None
+        if settings.OCR_CACHE_SIZE > 0 or settings.OCR_CACHE_DIR:
+            cache = OCRResultCache(
+                version=get_ocr_version(),
+                max_entries=settings.OCR_CACHE_SIZE,
+                directory=settings.OCR_CACHE_DIR,
+                max_disk_entries=settings.OCR_CACHE_DISK_ENTRIES,
+            )
+        _ocr_executor = OCRExecutor(
+            workers=settings.OCR_WORKERS,
+            cache=cache,
+            max_batch_size=settings.OCR_MAX_BATCH_SIZE,
+            batch_window=settings.OCR_BATCH_WINDOW_MS / 1000,
+        )
+    return _ocr_executor
+
+
+def shutdown_ocr_executor() -> None:
+    """Shut down the OCR executor singleton if it was started."""
+    global _ocr_executor
+    if _ocr_executor is not None:
+        _ocr_executor.shutdown()
+        _ocr_executor = None
@@ -0,0 +1,129 @@
+"""Micro-batching of concurrent OCR requests."""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from app.core.logging_config import logger
+from app.services.ocr_service import OCRResult
+
+# Runs OCR on a batch of images, returning an OCRResult or an exception per image
+BatchRunner = Callable[[List[bytes]], Awaitable[List[Union[OCRResult, Exception]]]]
+
+
+class OCRBatchScheduler:
+    """Collects concurrent OCR requests into batches.
+
+    The first request of a batch opens a window of ``batch_window`` seconds.
+    The batch is dispatched when the window closes or when it reaches
+    ``max_batch_size`` requests, whichever comes first. Each caller receives
+    the result for its own image.
+    """
+
+    def __init__(
+        self,
+        run_batch: BatchRunner,
+        max_batch_size: int = 4,
+        batch_window: float = 0.02,
+        history_size: int = 100,
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self._pending: List[Tuple[bytes, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+        # Batch metrics
+        self.batches = 0
+        self.requests = 0
+        self.largest_batch = 0
+        self.total_wait_ms = 0.0
+        self.total_run_ms = 0.0
+        self.recent_batches = deque(maxlen=history_size)
+
+    async def submit(self, image_data: bytes) -> OCRResult:
+        """Queue an image for the next batch and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((image_data, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.batch_window, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        """Dispatch the pending requests as one batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._dispatch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: List[Tuple[bytes, asyncio.Future, float]]) -> None:
+        """Run a batch and hand each result to its caller."""
+        started = time.perf_counter()
+        try:
+            results = await self.run_batch([image_data for image_data, _, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        finished = time.perf_counter()
+
+        if len(results) != len(batch):
+            logger.error(f"OCR batch of {len(batch)} images returned {len(results)} results")
+        if len(results) < len(batch):
+            # Fail the callers without a result rather than leave them waiting forever
+            missing = RuntimeError("OCR batch returned no result for this image")
+            results = list(results) + [missing] * (len(batch) - len(results))
+
+        for (_, future, _), result in zip(batch, results):
+            if future.done():
+                # The caller went away while the batch was running
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        self._record(batch, started, finished)
+
+    def _record(
+        self, batch: List[Tuple[bytes, asyncio.Future, float]], started: float, finished: float
+    ) -> None:
+        """Update the batch metrics."""
+        size = len(batch)
+        wait_ms = (started - batch[0][2]) * 1000
+        run_ms = (finished - started) * 1000
+
+        self.batches += 1
+        self.requests += size
+        self.largest_batch = max(self.largest_batch, size)
+        self.total_wait_ms += wait_ms
+        self.total_run_ms += run_ms
+        self.recent_batches.append(
+            {"size": size, "wait_ms": round(wait_ms, 2), "run_ms": round(run_ms, 2)}
+        )
+        logger.debug(f"OCR batch of {size} ran in {run_ms:.1f} ms after waiting {wait_ms:.1f} ms")
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals, averages and the most recent batches."""
+        batches = max(self.batches, 1)
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "largest_batch": self.largest_batch,
+            "average_batch_size": round(self.requests / batches, 2),
+            "average_wait_ms": round(self.total_wait_ms / batches, 2),
+            "average_run_ms": round(self.total_run_ms / batches, 2),
+            "recent_batches": list(self.recent_batches),
+        }
@@ -1,13 +1,130 @@
 """OCR service for text recognition from images."""
 
+import asyncio
+import hashlib
 import io
-from typing import Union, BinaryIO
-from PIL import Image, ImageEnhance, ImageFilter
+import os
+import tempfile
+import threading
+import warnings
+from collections import OrderedDict
+from importlib import metadata
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter
+
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.services.image_preprocessing import (
+    ImagePreprocessor,
+    ResizePolicy,
+    apply_contrast,
+    apply_median,
+    apply_sharpness,
+    apply_threshold,
+    pad_to_shape,
+    to_grayscale_array,
+)
+
+
+class ImageTooLargeError(ValueError):
+    """Raised when an image exceeds the configured byte or pixel limits."""
+
+
+def open_image(
+    image_data: Union[bytes, BinaryIO],
+    max_bytes: Optional[int] = None,
+    max_pixels: Optional[int] = None,
+) -> Image.Image:
+    """Open an image lazily, rejecting oversized input before any decoding.
+
+    Only the header is read here, so the byte and pixel limits are enforced
+    before the pixel data is decompressed.
+    """
+    max_bytes = max_bytes or settings.OCR_MAX_IMAGE_BYTES
+    max_pixels = max_pixels or settings.OCR_MAX_IMAGE_PIXELS
+
+    if isinstance(image_data, bytes):
+        size = len(image_data)
+        image_data = io.BytesIO(image_data)
+    else:
+        position = image_data.tell()
+        size = image_data.seek(0, io.SEEK_END) - position
+        image_data.seek(position)
+    if size > max_bytes:
+        raise ImageTooLargeError(f"Image is {size} bytes, the limit is {max_bytes}")
+
+    try:
+        with warnings.catch_warnings():
+            # The pixel limit below decides, PIL's own bomb check only has to not get in the way
+            warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+            image = Image.open(image_data)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e)) from e
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ImageTooLargeError(
+            f"Image is {width}x{height} pixels, the limit is {max_pixels} pixels"
+        )
+    return image
+
+
+class OCRResult(NamedTuple):
+    """Text read from a scan and the OCR path that produced it."""
+
+    text: str
+    path: str
+    confidence: Optional[float] = None
+
+    @classmethod
+    def from_detections(cls, detections: List[Tuple[Any, str, float]], path: str) -> "OCRResult":
+        """Build a result from EasyOCR ``detail=1`` output."""
+        text = " ".join(text for _, text, _ in detections)
+        confidence = None
+        if detections:
+            confidence = float(np.mean([score for _, _, score in detections]))
+        return cls(text, path, confidence)
+
+    def log(self) -> None:
+        """Record which path produced this result."""
+        confidence = "n/a" if self.confidence is None else f"{self.confidence:.2f}"
+        logger.info(f"OCR {self.path} pass: {len(self.text)} chars, confidence {confidence}")
+
+
+class CascadePolicy(NamedTuple):
+    """Thresholds of the two-pass OCR cascade.
+
+    The fast pass reads the scan downscaled to ``fast_pass_pixels`` with only
+    grayscale conversion. Its result is kept when the mean confidence reaches
+    ``min_confidence`` and at least ``min_chars`` characters were read.
+    """
+
+    fast_pass_pixels: int = 1_000_000
+    min_confidence: float = 0.6
+    min_chars: int = 10
 
 
 class EasyOCRClient:
     """OCR client using EasyOCR."""
 
+    preprocessor = ImagePreprocessor(
+        resize_policy=ResizePolicy(
+            target_pixels=settings.OCR_TARGET_PIXELS,
+            target_text_height=settings.OCR_TARGET_TEXT_HEIGHT,
+        )
+    )
+    cascade: Optional[CascadePolicy] = (
+        CascadePolicy(
+            fast_pass_pixels=settings.OCR_FAST_PASS_PIXELS,
+            min_confidence=settings.OCR_FAST_PASS_MIN_CONFIDENCE,
+            min_chars=settings.OCR_FAST_PASS_MIN_CHARS,
+        )
+        if settings.OCR_CASCADE
+        else None
+    )
+
     def __init__(self, languages=None):
         """Initialize EasyOCR reader immediately on startup."""
         self.languages = languages or ["en"]
@@ -18,30 +135,40 @@ class EasyOCRClient:
 
     def preprocess_grayscale(self, image: Image.Image) -> Image.Image:
         """Convert image to grayscale."""
-        return image.convert("L")
+        return Image.fromarray(to_grayscale_array(image))
+
+    # The single stages keep the mode of their input. Grayscale images take the
+    # NumPy path of the fused pipeline, which gives the same pixels as PIL.
 
     def preprocess_contrast(self, image: Image.Image, factor: float = 1.5) -> Image.Image:
         """Enhance image contrast."""
-        enhancer = ImageEnhance.Contrast(image)
-        return enhancer.enhance(factor)
+        if image.mode != "L":
+            return ImageEnhance.Contrast(image).enhance(factor)
+        return Image.fromarray(apply_contrast(to_grayscale_array(image), factor))
 
     def preprocess_sharpness(self, image: Image.Image, factor: float = 2.0) -> Image.Image:
         """Enhance image sharpness."""
-        enhancer = ImageEnhance.Sharpness(image)
-        return enhancer.enhance(factor)
+        if image.mode != "L":
+            return ImageEnhance.Sharpness(image).enhance(factor)
+        return Image.fromarray(apply_sharpness(to_grayscale_array(image), factor))
 
     def preprocess_denoise(self, image: Image.Image) -> Image.Image:
         """Apply median filter to denoise image."""
-        return image.filter(ImageFilter.MedianFilter(size=3))
+        if image.mode != "L":
+            return image.filter(ImageFilter.MedianFilter(size=3))
+        return Image.fromarray(apply_median(to_grayscale_array(image)))
 
     def preprocess_threshold(self, image: Image.Image, threshold: int = 128) -> Image.Image:
         """Convert image to binary using threshold."""
-        grayscale = image.convert("L")
-        return grayscale.point(lambda p: 255 if p > threshold else 0)
+        return Image.fromarray(apply_threshold(to_grayscale_array(image), threshold))
 
-    def preprocess_resize(self, image: Image.Image, scale_factor: float = 2.0) -> Image.Image:
-        """Resize image by a scale factor."""
+    def preprocess_resize(
+        self, image: Image.Image, scale_factor: Optional[float] = None
+    ) -> Image.Image:
+        """Resize image by a scale factor, chosen by the resize policy by default."""
         width, height = image.size
+        if scale_factor is None:
+            scale_factor = self.preprocessor.resize_policy.scale_for_size(width, height).scale
         new_size = (int(width * scale_factor), int(height * scale_factor))
         return image.resize(new_size, Image.LANCZOS)
 
@@ -50,36 +177,308 @@ class EasyOCRClient:
         width, height = image.size
         return image.crop((border, border, width - border, height - border))
 
-    def preprocess_image(self, image: Image.Image) -> Image.Image:
-        """Chain all pre-processing steps and convert to RGB at the end."""
-        image = self.preprocess_grayscale(image)
-        image = self.preprocess_contrast(image)
-        image = self.preprocess_sharpness(image)
-        image = self.preprocess_denoise(image)
-        image = self.preprocess_threshold(image)
-        image = self.preprocess_resize(image)
-        image = self.preprocess_crop(image)
-        return image.convert("RGB")
+    def preprocess_image(self, image: Image.Image) -> np.ndarray:
+        """Run the fused pre-processing pipeline, keeping the result single-channel."""
+        return self.preprocessor.process(image)
+
+    def load_image(self, image_data: Union[bytes, BinaryIO]) -> Image.Image:
+        """Load image from bytes or file-like object, decoding JPEG at reduced scale."""
+        return self.preprocessor.draft(open_image(image_data))
+
+    def preprocess_fast(self, image: Image.Image) -> np.ndarray:
+        """Minimal pre-processing for the fast pass of the cascade."""
+        return self.preprocessor.process_fast(image, self.cascade.fast_pass_pixels)
+
+    def _accepts_fast_pass(self, result: OCRResult) -> bool:
+        """Whether a fast pass result is good enough to skip the full pass."""
+        return (
+            result.confidence is not None
+            and result.confidence >= self.cascade.min_confidence
+            and len(result.text.replace(" ", "")) >= self.cascade.min_chars
+        )
+
+    def scan(self, image_data: Union[bytes, BinaryIO]) -> OCRResult:
+        """Extract text, escalating from the fast pass to the full pass if needed.
+
+        The fast pass reads a downscaled grayscale image. The full
+        pre-processing chain only runs when the fast pass finds too little text
+        or reads it with low confidence.
+        """
+        image = self.load_image(image_data)
+
+        if self.cascade is not None:
+            # EasyOCR takes grayscale arrays without re-encoding
+            detections = self.reader.readtext(self.preprocess_fast(image), detail=1)
+            result = OCRResult.from_detections(detections, "fast")
+            if self._accepts_fast_pass(result):
+                result.log()
+                return result
+
+        detections = self.reader.readtext(self.preprocess_image(image), detail=1)
+        result = OCRResult.from_detections(detections, "full")
+        result.log()
+        return result
 
     def read_text(self, image_data: Union[bytes, BinaryIO]) -> str:
         """Extract text using EasyOCR."""
-        # Load image from bytes or file-like object
-        if isinstance(image_data, bytes):
-            image = Image.open(io.BytesIO(image_data))
-        else:
-            image = Image.open(image_data)
+        return self.scan(image_data).text
+
+    def _scan_batched(
+        self,
+        images: Dict[int, Image.Image],
+        preprocess: Callable[[Image.Image], np.ndarray],
+        path: str,
+        results: List[Union[OCRResult, Exception, None]],
+    ) -> Dict[int, OCRResult]:
+        """Run one batched EasyOCR call over the given images.
+
+        Images are padded to a common size so the detector runs on them as one
+        batch. Pre-processing failures are stored in ``results``.
+        """
+        batch_pixels = {}
+        for index, image in images.items():
+            try:
+                batch_pixels[index] = preprocess(image)
+            except Exception as e:
+                results[index] = e
+        if not batch_pixels:
+            return {}
+
+        shape = (
+            max(pixels.shape[0] for pixels in batch_pixels.values()),
+            max(pixels.shape[1] for pixels in batch_pixels.values()),
+        )
+        padded = [pad_to_shape(pixels, shape) for pixels in batch_pixels.values()]
+        batch_detections = self.reader.readtext_batched(padded, detail=1)
+        return {
+            index: OCRResult.from_detections(detections, path)
+            for index, detections in zip(batch_pixels, batch_detections)
+        }
+
+    def scan_batch(self, images: List[Union[bytes, BinaryIO]]) -> List[Union[OCRResult, Exception]]:
+        """Extract text from several images with batched EasyOCR calls.
+
+        The cascade runs per batch: one batched fast pass, then one batched
+        full pass over the images that need it. An image that cannot be loaded
+        or pre-processed gets its exception in place of its result, without
+        failing the rest of the batch.
+        """
+        results: List[Union[OCRResult, Exception, None]] = [None] * len(images)
+        pending = {}
+        for index, image_data in enumerate(images):
+            try:
+                pending[index] = self.load_image(image_data)
+            except Exception as e:
+                results[index] = e
+
+        if self.cascade is not None and pending:
+            for index, result in self._scan_batched(
+                pending, self.preprocess_fast, "fast", results
+            ).items():
+                if self._accepts_fast_pass(result):
+                    results[index] = result
+            pending = {index: image for index, image in pending.items() if results[index] is None}
+
+        if pending:
+            for index, result in self._scan_batched(
+                pending, self.preprocess_image, "full", results
+            ).items():
+                results[index] = result
+
+        for result in results:
+            if isinstance(result, OCRResult):
+                result.log()
+        return results
+
+    def read_text_batch(self, images: List[Union[bytes, BinaryIO]]) -> List[Union[str, Exception]]:
+        """Extract text from several images, see scan_batch."""
+        return [
+            result.text if isinstance(result, OCRResult) else result
+            for result in self.scan_batch(images)
+        ]
+
+
+class OCRResultCache:
+    """Content-addressed cache of OCR results.
+
+    Results are keyed by a hash of the image bytes and the version of the
+    pre-processing and model that produced them. A bounded in-memory LRU tier
+    is backed by an optional on-disk tier that survives restarts. The disk
+    tier keeps at most ``max_disk_entries`` results, pruning the oldest first;
+    0 leaves it unbounded.
+    """
+
+    def __init__(
+        self,
+        version: str,
+        max_entries: int = 256,
+        directory: Optional[str] = None,
+        max_disk_entries: int = 10_000,
+    ):
+        self.version = version
+        self.max_entries = max_entries
+        self.directory = Path(directory) if directory else None
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        # Results on disk, counted on the first write
+        self._disk_entries: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def key_for(self, image_data: bytes) -> str:
+        """Build the cache key of an image."""
+        digest = hashlib.sha256(image_data)
+        digest.update(self.version.encode())
+        return digest.hexdigest()
+
+    def _path_for(self, key: str) -> Path:
+        """Location of a cached result in the disk tier."""
+        return self.directory / key[:2] / f"{key}.txt"
+
+    def _remember(self, key: str, text: str) -> None:
+        """Store a result in the memory tier, evicting the least recently used."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        """Look up a result in the memory tier, counting a hit."""
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return text
+
+    def _get_disk(self, key: str) -> Optional[str]:
+        """Look up a result in the disk tier, counting a miss if it is not there either."""
+        text = None
+        if self.directory is not None:
+            try:
+                text = self._path_for(key).read_text(encoding="utf-8")
+            except OSError:
+                text = None
+        if text is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        self._remember(key, text)
+        with self._lock:
+            self.hits += 1
+            self.disk_hits += 1
+        return text
+
+    def _write_disk(self, key: str, text: str) -> None:
+        """Store a result in the disk tier."""
+        path = self._path_for(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so readers never see partial results
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+                tmp_file.write(text)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write OCR cache entry {key}: {e}")
+            return
+        self._count_disk_write()
+
+    def _count_disk_write(self) -> None:
+        """Count a written result and prune the disk tier once it is over its limit."""
+        if self.max_disk_entries <= 0:
+            return
+        with self._disk_lock:
+            if self._disk_entries is None:
+                self._disk_entries = sum(1 for _ in self.directory.glob("*/*.txt"))
+            else:
+                self._disk_entries += 1
+            if self._disk_entries > self.max_disk_entries:
+                self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """Delete the oldest results on disk, down to 90% of the limit.
+
+        Pruning below the limit means the directory is only scanned again
+        after many more writes.
+        """
+        entries = []
+        for path in self.directory.glob("*/*.txt"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        entries.sort()
+
+        keep = self.max_disk_entries * 9 // 10
+        removed = 0
+        for _, path in entries[: max(len(entries) - keep, 0)]:
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                continue
+        self._disk_entries = len(entries) - removed
+        logger.info(f"Pruned {removed} OCR cache entries from {self.directory}")
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a result in memory, then on disk."""
+        text = self._get_memory(key)
+        return text if text is not None else self._get_disk(key)
+
+    def put(self, key: str, text: str) -> None:
+        """Store a result in every tier."""
+        self._remember(key, text)
+        if self.directory is not None:
+            self._write_disk(key, text)
+
+    async def get_async(self, key: str) -> Optional[str]:
+        """Like ``get``, but reads the disk tier on a thread to keep the event loop free."""
+        text = self._get_memory(key)
+        if text is not None:
+            return text
+        if self.directory is None:
+            # Only counts the miss, no I/O
+            return self._get_disk(key)
+        return await asyncio.to_thread(self._get_disk, key)
+
+    async def put_async(self, key: str, text: str) -> None:
+        """Like ``put``, but writes the disk tier on a thread to keep the event loop free."""
+        self._remember(key, text)
+        if self.directory is not None:
+            await asyncio.to_thread(self._write_disk, key, text)
 
-        # Preprocess image using the defined chain
-        image = self.preprocess_image(image)
+    def stats(self) -> Dict[str, int]:
+        """Hit and miss counters of the cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "memory_entries": len(self._entries),
+            }
 
-        # Convert preprocessed image to bytes for EasyOCR
-        image_bytes = io.BytesIO()
-        image.save(image_bytes, format="JPEG")
-        image_bytes.seek(0)
 
-        # Extract text
-        results = self.reader.readtext(image_bytes.read(), detail=0)
-        return " ".join(results)
+def get_ocr_version(languages: Optional[List[str]] = None) -> str:
+    """Identify the model and pre-processing behind OCR results."""
+    try:
+        model_version = metadata.version("easyocr")
+    except metadata.PackageNotFoundError:
+        model_version = "unknown"
+    language_list = "+".join(languages or ["en"])
+    cascade = EasyOCRClient.cascade
+    cascade_version = "-".join(map(str, cascade)) if cascade is not None else "off"
+    return (
+        f"easyocr-{model_version}-{language_list}-{EasyOCRClient.preprocessor.version}"
+        f"-cascade-{cascade_version}"
+    )
 
 
 _ocr_client = None
@@ -93,4 +492,12 @@ def get_ocr_client(languages=None):
     return _ocr_client
 
 
-get_ocr_client()
+def create_warm_up_image() -> bytes:
+    """Render a small synthetic label used to warm up the OCR model."""
+    image = Image.new("RGB", (400, 120), "white")
+    draw = ImageDraw.Draw(image)
+    draw.text((20, 20), "IBUPROFEN 200 mg", fill="black")
+    draw.text((20, 60), "TAKE ONE TABLET DAILY", fill="black")
+    image_bytes = io.BytesIO()
+    image.save(image_bytes, format="PNG")
+    return image_bytes.getvalue()
@@ -0,0 +1,50 @@
+"""Coalescing of identical concurrent calls."""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time.
+
+    A call made while another call with the same key is in flight waits for
+    that call instead of starting its own, and gets the same result or
+    exception. Cancelling one waiter does not cancel the shared call.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, function: Callable[[], Awaitable[T]]) -> T:
+        """Await ``function()``, or the call already running for ``key``."""
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(function())
+            self._calls[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        """Forget a finished call so the next one with its key runs again."""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved in case every waiter was cancelled
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls run, calls that joined a running one, and calls in flight."""
+        calls = self.executions + self.coalesced
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / calls, 4) if calls else 0.0,
+            "in_flight": len(self._calls),
+        }
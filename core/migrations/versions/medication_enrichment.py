@@ -0,0 +1,44 @@
+"""Add ingredient enrichment state to medications
+
+Revision ID: add_medication_enrichment
+Revises: add_rls_policies
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "add_medication_enrichment"
+down_revision: Union[str, None] = "add_rls_policies"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "medications",
+        sa.Column(
+            "enrichment_status",
+            sa.String(length=20),
+            nullable=True,
+            comment="State of the ingredient extraction: pending, done, skipped or failed",
+        ),
+    )
+    op.add_column(
+        "medications",
+        sa.Column(
+            "enriched_at",
+            sa.TIMESTAMP(),
+            nullable=True,
+            comment="When the ingredient extraction finished",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("medications", "enriched_at")
+    op.drop_column("medications", "enrichment_status")
@@ -0,0 +1,7 @@
+alter table "public"."medications" add column "enrichment_status" character varying(20);
+
+alter table "public"."medications" add column "enriched_at" timestamp without time zone;
+
+comment on column "public"."medications"."enrichment_status" is 'State of the ingredient extraction: pending, done, skipped or failed';
+
+comment on column "public"."medications"."enriched_at" is 'When the ingredient extraction finished';
@@ -33,6 +33,8 @@ CREATE TABLE IF NOT EXISTS "public"."medications" (
     "dosage" character varying(255),
     "prescription_details" "json",
     "scan_url" "text",
+    "enrichment_status" character varying(20),
+    "enriched_at" timestamp without time zone,
     "created_at" timestamp without time zone,
     "updated_at" timestamp without time zone
 );
@@ -46,6 +48,8 @@ COMMENT ON COLUMN "public"."medications"."scanned_text" IS 'Raw text extracted f
 COMMENT ON COLUMN "public"."medications"."dosage" IS 'Dosage information';
 COMMENT ON COLUMN "public"."medications"."prescription_details" IS 'Additional prescription details in JSON format';
 COMMENT ON COLUMN "public"."medications"."scan_url" IS 'URL of the uploaded medication scan';
+COMMENT ON COLUMN "public"."medications"."enrichment_status" IS 'State of the ingredient extraction: pending, done, skipped or failed';
+COMMENT ON COLUMN "public"."medications"."enriched_at" IS 'When the ingredient extraction finished';
 ALTER TABLE "public"."medications" ALTER COLUMN "id" ADD GENERATED BY DEFAULT AS IDENTITY (
     SEQUENCE NAME "public"."medications_id_seq"
     START WITH 1
@@ -0,0 +1,173 @@
+"""Compare NER latency of the HTTP and the embedded backend.
+
+Both backends run the same label texts. For each one the benchmark times
+the first call (which loads the model for the embedded backend), then one
+call per text in turn for latency percentiles, then a concurrent burst for
+throughput. The report puts the two side by side and checks that they
+found the same ingredients.
+
+Every call sends a text no earlier call sent, so the model service's
+extraction cache cannot answer HTTP calls that the embedded backend has to
+run through the pipeline. Start the model service with
+NLP_TEXT_CACHE_SIZE=0 so texts from earlier runs are not served either.
+
+Usage (from the ``core`` directory, with the model service running and its
+requirements installed):
+    NLP_TEXT_CACHE_SIZE=0 uvicorn main:app --port 8081  # in ../model
+    python -m tests.benchmarks.ner_benchmark --model-path ../model --hosts localhost:8081
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, List, Optional
+
+from app.services.biomed_ner_client import MedicalNERClient
+from app.services.embedded_ner_client import EmbeddedNERClient
+
+MODEL_DIR = Path(__file__).resolve().parents[3] / "model"
+
+
+def load_label_corpus() -> ModuleType:
+    """The model service benchmark's label corpus, without putting ``model`` on sys.path."""
+    path = MODEL_DIR / "label_corpus.py"
+    if not path.exists():
+        # Raised as an import error so test collection can skip without the model service
+        raise ModuleNotFoundError(f"No label corpus at {path}", name="label_corpus")
+    spec = importlib.util.spec_from_file_location("label_corpus", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+label_corpus = load_label_corpus()
+
+
+def label_texts(count: int) -> List[str]:
+    """Label texts from the shared corpus, numbered so that no two are the same."""
+    return [f"{text} Lot {index}." for index, text in enumerate(label_corpus.build_corpus(count))]
+
+
+async def measure_backend(client, texts: List[str], burst: int = 16) -> Dict[str, Any]:
+    """Time the first call, one call per text in turn and a concurrent burst of a client.
+
+    The first text warms the client up, the last ``burst`` texts are sent at
+    once and the rest one at a time, so each text is sent exactly once.
+    """
+    if len(texts) < burst + 2:
+        raise ValueError(f"Need at least {burst + 2} texts for a burst of {burst}")
+    sequential, concurrent = texts[1:-burst], texts[-burst:]
+
+    started = time.perf_counter()
+    await client.find_active_ingredients(texts[0])
+    first_call_ms = (time.perf_counter() - started) * 1000
+
+    latencies = []
+    ingredients = {}
+    for text in sequential:
+        started = time.perf_counter()
+        ingredients[text] = await client.find_active_ingredients(text)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(client.find_active_ingredients(text) for text in concurrent))
+    burst_seconds = time.perf_counter() - started
+    ingredients.update(zip(concurrent, results))
+
+    return {
+        "first_call_ms": round(first_call_ms, 3),
+        "latency_ms": label_corpus.summarize(latencies),
+        "concurrent_texts_per_second": round(len(concurrent) / burst_seconds, 3),
+        "stats": client.stats(),
+        "ingredients": ingredients,
+    }
+
+
+def compare(http: Dict[str, Any], embedded: Dict[str, Any]) -> Dict[str, Any]:
+    """Latency ratios (embedded / HTTP) and how often both found the same ingredients."""
+    ratios = {
+        stat: round(embedded["latency_ms"][stat] / http["latency_ms"][stat], 3)
+        for stat in ("p50", "p95", "p99")
+        if http["latency_ms"][stat]
+    }
+    texts = http["ingredients"].keys() & embedded["ingredients"].keys()
+    differing = sorted(
+        text for text in texts if http["ingredients"][text] != embedded["ingredients"][text]
+    )
+    return {
+        "embedded_to_http_latency": ratios,
+        "agreement": round(1 - len(differing) / len(texts), 4) if texts else None,
+        "differing_texts": differing,
+    }
+
+
+async def run_ab(http_client, embedded_client, texts: List[str], burst: int = 16) -> Dict[str, Any]:
+    """Measure both backends one after the other and compare them."""
+    results = {}
+    for name, client in (("http", http_client), ("embedded", embedded_client)):
+        try:
+            results[name] = await measure_backend(client, texts, burst)
+        finally:
+            await client.aclose()
+
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "texts": len(texts),
+        "burst": burst,
+        **results,
+        "comparison": compare(results["http"], results["embedded"]),
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-path", default="../model", help="model service directory")
+    parser.add_argument("--hosts", nargs="+", help="model service hosts (default: BIOMED_HOST)")
+    parser.add_argument("--scheme", default="http", help="model service scheme")
+    parser.add_argument("--workers", type=int, default=1, help="embedded NER processes")
+    parser.add_argument("--texts", type=int, default=100, help="texts sent one at a time")
+    parser.add_argument("--burst", type=int, default=16, help="texts sent at once")
+    parser.add_argument("--output", default="ner_benchmark.json", help="result file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    api_urls = [f"{args.scheme}://{host}" for host in args.hosts] if args.hosts else None
+    http_client = MedicalNERClient(api_urls=api_urls)
+    embedded_client = EmbeddedNERClient(args.model_path, workers=args.workers)
+    texts = label_texts(1 + args.texts + args.burst)
+    print(f"Benchmarking {len(texts)} texts on both NER backends")
+
+    results = asyncio.run(run_ab(http_client, embedded_client, texts, args.burst))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    for name in ("http", "embedded"):
+        latency = results[name]["latency_ms"]
+        print(
+            f"  {name:<9} first call {results[name]['first_call_ms']:>10.1f} ms"
+            f"  p50 {latency['p50']:>8.2f} ms  p95 {latency['p95']:>8.2f} ms"
+            f"  {results[name]['concurrent_texts_per_second']} texts/s"
+        )
+    comparison = results["comparison"]
+    print(f"  embedded / http latency: {comparison['embedded_to_http_latency']}")
+    print(f"  same ingredients for {comparison['agreement']:.0%} of texts")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
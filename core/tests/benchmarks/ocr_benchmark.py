@@ -0,0 +1,358 @@
+"""Benchmark the OCR pipeline on a synthetic corpus of medication labels.
+
+Labels are rendered with the test image generator and varied in resolution,
+noise and rotation. For every label the benchmark times each stage of the
+pipeline (decode, every ``preprocess_*`` step, detection and recognition) and
+records its memory two ways: ``python_peak_kib`` is the peak of Python heap
+allocations seen by tracemalloc, which misses the native buffers of torch,
+EasyOCR and most of PIL and NumPy; ``max_rss_growth_kib`` is how far the
+stage raised the peak resident memory of the process, which covers native
+memory but stays 0 for stages below an earlier peak. It then measures
+end-to-end throughput through the OCR executor for 1..N workers.
+
+Results are written as JSON. Pass ``--baseline`` with an earlier result file
+to fail when a stage got slower than ``--tolerance`` allows.
+
+Usage (from the ``core`` directory):
+    python -m tests.benchmarks.ocr_benchmark --output ocr_benchmark.json
+    python -m tests.benchmarks.ocr_benchmark --workers 4 --baseline previous.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import platform
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from importlib import metadata
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.services.ocr_executor import OCRExecutor
+from app.services.ocr_service import EasyOCRClient, get_ocr_client, get_ocr_version
+from tests.test_utils.test_create_test_image import render_test_image
+
+# Long side of the rendered label, in pixels
+RESOLUTIONS = (800, 1600, 3200)
+# Standard deviation of the Gaussian noise added to each pixel
+NOISE_LEVELS = (0, 12, 30)
+# Rotation of the label, in degrees
+ROTATIONS = (0, 3, 10)
+
+# Pre-processing steps of EasyOCRClient, in pipeline order
+PREPROCESS_STEPS = ("grayscale", "contrast", "sharpness", "denoise", "threshold", "resize", "crop")
+
+
+class CorpusImage(NamedTuple):
+    """An encoded label and the variations used to produce it."""
+
+    name: str
+    resolution: int
+    noise: int
+    rotation: int
+    data: bytes
+
+
+def build_corpus(
+    resolutions: Iterable[int] = RESOLUTIONS,
+    noise_levels: Iterable[int] = NOISE_LEVELS,
+    rotations: Iterable[int] = ROTATIONS,
+    image_format: str = "JPEG",
+    seed: int = 0,
+) -> List[CorpusImage]:
+    """Render one label for every combination of resolution, noise and rotation."""
+    rng = np.random.default_rng(seed)
+    label = render_test_image()
+    corpus = []
+    for resolution in resolutions:
+        scale = resolution / max(label.size)
+        size = (round(label.width * scale), round(label.height * scale))
+        scaled = label.resize(size, Image.LANCZOS)
+        for noise in noise_levels:
+            noisy = scaled
+            if noise:
+                pixels = np.asarray(scaled, dtype=np.float32)
+                pixels = pixels + rng.normal(0, noise, pixels.shape)
+                noisy = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+            for rotation in rotations:
+                image = noisy
+                if rotation:
+                    image = noisy.rotate(
+                        rotation, resample=Image.BICUBIC, expand=True, fillcolor="white"
+                    )
+                buffer = io.BytesIO()
+                image.convert("RGB").save(buffer, format=image_format)
+                name = f"label-{resolution}px-noise{noise}-rot{rotation}"
+                corpus.append(CorpusImage(name, resolution, noise, rotation, buffer.getvalue()))
+    return corpus
+
+
+def measure(function: Callable, *args) -> Tuple[Any, float, int, int]:
+    """Call a function and return its result, duration in ms, peak Python allocation in
+    bytes and growth of the peak resident memory in KiB."""
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    rss_before = own_max_rss_kib()
+    started = time.perf_counter()
+    result = function(*args)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    return result, elapsed_ms, max(peak - baseline, 0), own_max_rss_kib() - rss_before
+
+
+def profile_image(client: EasyOCRClient, image_data: bytes) -> Dict[str, Dict[str, float]]:
+    """Time every stage of the OCR pipeline on one image."""
+    stages = {}
+
+    def record(stage, function, *args):
+        result, elapsed_ms, python_peak, rss_growth = measure(function, *args)
+        stages[stage] = {
+            "ms": round(elapsed_ms, 3),
+            "python_peak_kib": round(python_peak / 1024, 1),
+            "max_rss_growth_kib": rss_growth,
+        }
+        return result
+
+    image = record("decode", lambda: client.load_image(image_data).convert("RGB"))
+
+    # The individual PIL steps, as documented on EasyOCRClient
+    step_image = image
+    for step in PREPROCESS_STEPS:
+        step_image = record(step, getattr(client, f"preprocess_{step}"), step_image)
+
+    # The pipeline that actually runs in production
+    if client.cascade is not None:
+        record("preprocess_fast", client.preprocess_fast, image)
+    pixels = record("preprocess_image", client.preprocess_image, image)
+
+    horizontal_list, free_list = record("detection", client.reader.detect, pixels)
+    record(
+        "recognition",
+        lambda: client.reader.recognize(pixels, horizontal_list[0], free_list[0], detail=0),
+    )
+    return stages
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Mean, median, 95th percentile and maximum of a list of samples."""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "mean": round(statistics.fmean(ordered), 3),
+        "p50": round(statistics.median(ordered), 3),
+        "p95": round(p95, 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def profile_stages(
+    client: EasyOCRClient, corpus: List[CorpusImage], repeat: int = 1
+) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+    """Profile every corpus image, returning per-stage summaries and per-image results."""
+    tracemalloc.start()
+    try:
+        per_image = []
+        for item in corpus:
+            for _ in range(repeat):
+                per_image.append({"image": item.name, "stages": profile_image(client, item.data)})
+    finally:
+        tracemalloc.stop()
+
+    stages = {}
+    for stage in per_image[0]["stages"]:
+        durations = [result["stages"][stage]["ms"] for result in per_image]
+        stages[stage] = {
+            "ms": summarize(durations),
+            "python_peak_kib": max(
+                result["stages"][stage]["python_peak_kib"] for result in per_image
+            ),
+            "max_rss_growth_kib": max(
+                result["stages"][stage]["max_rss_growth_kib"] for result in per_image
+            ),
+        }
+    return stages, per_image
+
+
+async def measure_throughput(
+    corpus: List[CorpusImage], workers: int, max_batch_size: int = 1
+) -> Dict[str, Any]:
+    """Push the whole corpus through an executor at once and time it.
+
+    Model loading happens during warm-up and is not part of the measurement.
+    """
+    executor = OCRExecutor(workers=workers, max_batch_size=max_batch_size)
+    try:
+        await executor.warm_up()
+        if not executor.is_ready:
+            raise RuntimeError(f"OCR warm-up failed: {executor.error}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(executor.read_text(item.data) for item in corpus))
+        elapsed = time.perf_counter() - started
+    finally:
+        executor.shutdown()
+
+    return {
+        "workers": workers,
+        "max_batch_size": max_batch_size,
+        "images": len(corpus),
+        "warm_up_seconds": executor.warm_up_seconds,
+        "seconds": round(elapsed, 3),
+        "images_per_second": round(len(corpus) / elapsed, 3),
+        "paths": dict(executor.paths),
+    }
+
+
+def _rusage_kib(who: int) -> int:
+    """Peak resident memory reported by getrusage, in KiB."""
+    max_rss = resource.getrusage(who).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return max_rss // 1024 if sys.platform == "darwin" else max_rss
+
+
+def own_max_rss_kib() -> int:
+    """Peak resident memory of this process, native allocations included."""
+    return _rusage_kib(resource.RUSAGE_SELF)
+
+
+def max_rss_kib() -> int:
+    """Peak resident memory of this process and of finished worker processes."""
+    return max(own_max_rss_kib(), _rusage_kib(resource.RUSAGE_CHILDREN))
+
+
+def environment() -> Dict[str, Any]:
+    """Versions and hardware that the results depend on."""
+    try:
+        easyocr_version = metadata.version("easyocr")
+    except metadata.PackageNotFoundError:
+        easyocr_version = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "easyocr": easyocr_version,
+        "ocr_version": get_ocr_version(),
+    }
+
+
+def run_benchmark(
+    client: EasyOCRClient,
+    corpus: List[CorpusImage],
+    worker_counts: Iterable[int] = (1,),
+    max_batch_size: int = 1,
+    repeat: int = 1,
+) -> Dict[str, Any]:
+    """Run the stage profile and the throughput runs and collect the results."""
+    stages, per_image = profile_stages(client, corpus, repeat=repeat)
+    throughput = [
+        asyncio.run(measure_throughput(corpus, workers, max_batch_size))
+        for workers in worker_counts
+    ]
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "environment": environment(),
+        "corpus": [
+            {
+                "image": item.name,
+                "resolution": item.resolution,
+                "noise": item.noise,
+                "rotation": item.rotation,
+                "bytes": len(item.data),
+            }
+            for item in corpus
+        ],
+        "stages": stages,
+        "per_image": per_image,
+        "throughput": throughput,
+        "max_rss_kib": max_rss_kib(),
+    }
+
+
+def find_regressions(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.2
+) -> List[str]:
+    """Describe every stage or throughput run that got worse than ``tolerance`` allows."""
+    regressions = []
+    for stage, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if previous is None:
+            continue
+        before, after = previous["ms"]["p50"], current["ms"]["p50"]
+        if before > 0 and after > before * (1 + tolerance):
+            regressions.append(f"{stage}: p50 {before} ms -> {after} ms")
+
+    previous_runs = {run["workers"]: run for run in baseline.get("throughput", [])}
+    for run in results["throughput"]:
+        previous = previous_runs.get(run["workers"])
+        if previous is None:
+            continue
+        before, after = previous["images_per_second"], run["images_per_second"]
+        if after < before * (1 - tolerance):
+            regressions.append(
+                f"throughput with {run['workers']} worker(s): {before} -> {after} images/s"
+            )
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="ocr_benchmark.json", help="result file")
+    parser.add_argument("--workers", type=int, default=2, help="measure 1..N workers")
+    parser.add_argument("--batch-size", type=int, default=1, help="OCR batch size")
+    parser.add_argument("--repeat", type=int, default=1, help="stage runs per image")
+    parser.add_argument(
+        "--resolutions", type=int, nargs="+", default=RESOLUTIONS, help="label long sides"
+    )
+    parser.add_argument("--noise", type=int, nargs="+", default=NOISE_LEVELS, help="noise levels")
+    parser.add_argument("--rotations", type=int, nargs="+", default=ROTATIONS, help="degrees")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="allowed slowdown before failing"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    corpus = build_corpus(args.resolutions, args.noise, args.rotations)
+    print(f"Benchmarking {len(corpus)} images")
+
+    results = run_benchmark(
+        get_ocr_client(),
+        corpus,
+        worker_counts=range(1, args.workers + 1),
+        max_batch_size=args.batch_size,
+        repeat=args.repeat,
+    )
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    for stage, summary in results["stages"].items():
+        print(
+            f"  {stage:<18} p50 {summary['ms']['p50']:>9.2f} ms"
+            f"  Python peak {summary['python_peak_kib']} KiB"
+            f"  RSS peak +{summary['max_rss_growth_kib']} KiB"
+        )
+    for run in results["throughput"]:
+        print(f"  {run['workers']} worker(s): {run['images_per_second']} images/s")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
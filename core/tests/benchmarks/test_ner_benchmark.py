@@ -0,0 +1,110 @@
+"""Tests for the NER backend A/B benchmark."""
+
+import asyncio
+import json
+import sys
+
+import httpx
+import pytest
+
+from app.services.biomed_ner_client import MedicalNERClient
+from app.services.embedded_ner_client import EmbeddedNERClient
+from tests.test_embedded_ner_client import MODEL_SERVICE
+
+# The benchmark shares the label corpus of ../model, missing when core is tested alone
+ner_benchmark = pytest.importorskip("tests.benchmarks.ner_benchmark")
+
+DRUGS = {"advil", "ibuprofen", "motrin"}
+
+
+def http_service(request):
+    """Answer like the model service, finding the same drugs as the stand-in pipeline."""
+    text = json.loads(request.content)["text"]
+    http_service.sent.append(text)
+    entities = [
+        {"text": word, "umls_entities": []} for word in text.split() if word.lower() in DRUGS
+    ]
+    return httpx.Response(200, json={"entities": entities})
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    """A stand-in model service directory for the embedded backend."""
+    (tmp_path / "main.py").write_text(MODEL_SERVICE)
+    yield str(tmp_path)
+    sys.modules.pop("main", None)
+    if str(tmp_path) in sys.path:
+        sys.path.remove(str(tmp_path))
+
+
+@pytest.fixture
+def clients(model_path):
+    """An HTTP client on a stub transport and an inline embedded client."""
+    http_service.sent = []
+    http_client = MedicalNERClient(
+        api_urls=["http://ner"], transport=httpx.MockTransport(http_service)
+    )
+    return http_client, EmbeddedNERClient(model_path, workers=0)
+
+
+class TestNERBenchmark:
+    """Test the A/B report with stand-in backends."""
+
+    def test_report_compares_backends(self, clients):
+        """Both backends are measured and found the same ingredients."""
+        texts = ["Advil 200 mg", "Motrin IB", "no drugs here", "ibuprofen", "Advil PM"]
+        results = asyncio.run(ner_benchmark.run_ab(*clients, texts, burst=2))
+
+        for name in ("http", "embedded"):
+            assert results[name]["first_call_ms"] > 0
+            assert set(results[name]["latency_ms"]) == {"mean", "p50", "p95", "p99", "max"}
+            assert results[name]["stats"]["backend"] == name
+            assert set(results[name]["ingredients"]) == set(texts[1:])
+        assert results["embedded"]["ingredients"]["Advil PM"] == ["Advil"]
+        assert results["comparison"]["agreement"] == 1.0
+        assert set(results["comparison"]["embedded_to_http_latency"]) == {"p50", "p95", "p99"}
+        json.dumps(results)
+
+    def test_every_text_is_sent_once(self, clients):
+        """No call can be answered from the model service's cache of an earlier call."""
+        texts = ner_benchmark.label_texts(10)
+        assert len(set(texts)) == len(texts)
+
+        asyncio.run(ner_benchmark.run_ab(*clients, texts, burst=3))
+
+        assert sorted(http_service.sent) == sorted(texts)
+
+    def test_too_few_texts(self, clients):
+        """A burst needs texts left over for the first and the sequential calls."""
+        with pytest.raises(ValueError, match="at least 5 texts"):
+            asyncio.run(ner_benchmark.run_ab(*clients, ner_benchmark.label_texts(4), burst=3))
+
+    def test_differences_are_listed(self):
+        """Texts where the backends disagree are reported."""
+        latency = {"p50": 2.0, "p95": 4.0, "p99": 8.0}
+        http = {"latency_ms": latency, "ingredients": {"a": ["advil"], "b": []}}
+        embedded = {
+            "latency_ms": {"p50": 1.0, "p95": 1.0, "p99": 1.0},
+            "ingredients": {"a": ["advil"], "b": ["motrin"]},
+        }
+
+        comparison = ner_benchmark.compare(http, embedded)
+
+        assert comparison["embedded_to_http_latency"] == {"p50": 0.5, "p95": 0.25, "p99": 0.125}
+        assert comparison["agreement"] == 0.5
+        assert comparison["differing_texts"] == ["b"]
+
+    def test_main_writes_json(self, clients, tmp_path, monkeypatch):
+        """The command line entry point writes the results file."""
+        http_client, embedded_client = clients
+        monkeypatch.setattr(
+            "tests.benchmarks.ner_benchmark.MedicalNERClient", lambda api_urls: http_client
+        )
+        monkeypatch.setattr(
+            "tests.benchmarks.ner_benchmark.EmbeddedNERClient",
+            lambda model_path, workers: embedded_client,
+        )
+        output = tmp_path / "results.json"
+
+        assert ner_benchmark.main(["--output", str(output), "--texts", "5", "--burst", "2"]) == 0
+        assert json.loads(output.read_text())["texts"] == 8
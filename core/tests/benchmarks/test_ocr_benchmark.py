@@ -0,0 +1,116 @@
+"""Tests for the OCR benchmark suite."""
+
+import io
+import json
+
+import pytest
+from PIL import Image
+
+from app.services.ocr_service import EasyOCRClient
+from tests.benchmarks.ocr_benchmark import (
+    build_corpus,
+    find_regressions,
+    main,
+    run_benchmark,
+)
+
+
+class MockReader:
+    """Reader exposing the detection and recognition steps of EasyOCR."""
+
+    def detect(self, image):
+        """Return one horizontal box for the whole image."""
+        height, width = image.shape
+        return [[[0, width, 0, height]]], [[]]
+
+    def recognize(self, image, horizontal_list, free_list, detail=1):
+        """Return a fixed text for every box."""
+        return ["Ibuprofen 200mg"] * len(horizontal_list)
+
+
+@pytest.fixture
+def client():
+    """A client with a mock reader."""
+    client = EasyOCRClient.__new__(EasyOCRClient)
+    client.languages = ["en"]
+    client.reader = MockReader()
+    return client
+
+
+class TestOCRBenchmark:
+    """Test the benchmark on a tiny corpus without a real model."""
+
+    def test_corpus_covers_every_combination(self):
+        """One label is rendered per resolution, noise level and rotation."""
+        corpus = build_corpus(resolutions=[200, 400], noise_levels=[0, 20], rotations=[0, 5])
+
+        assert len(corpus) == 8
+        assert len({item.name for item in corpus}) == 8
+
+        rotated = Image.open(io.BytesIO(corpus[1].data))
+        straight = Image.open(io.BytesIO(corpus[0].data))
+        assert straight.size == (200, 100)
+        assert rotated.size[1] > straight.size[1]
+
+    def test_results_cover_stages_and_workers(self, client):
+        """Every pipeline stage and throughput run ends up in the results."""
+        corpus = build_corpus(resolutions=[200], noise_levels=[0, 20], rotations=[0])
+
+        results = run_benchmark(client, corpus, worker_counts=[0])
+
+        for stage in [
+            "decode",
+            "grayscale",
+            "crop",
+            "preprocess_image",
+            "detection",
+            "recognition",
+        ]:
+            assert stage in results["stages"]
+            assert results["stages"][stage]["ms"]["max"] >= results["stages"][stage]["ms"]["p50"]
+            assert results["stages"][stage]["python_peak_kib"] >= 0
+            assert results["stages"][stage]["max_rss_growth_kib"] >= 0
+        assert len(results["per_image"]) == 2
+        assert results["throughput"][0]["workers"] == 0
+        assert results["throughput"][0]["images"] == 2
+        assert results["max_rss_kib"] > 0
+        json.dumps(results)
+
+    def test_regressions_are_reported(self):
+        """Slower stages and lower throughput than the baseline are flagged."""
+        baseline = {
+            "stages": {"decode": {"ms": {"p50": 10.0}}, "detection": {"ms": {"p50": 100.0}}},
+            "throughput": [{"workers": 1, "images_per_second": 4.0}],
+        }
+        results = {
+            "stages": {"decode": {"ms": {"p50": 11.0}}, "detection": {"ms": {"p50": 150.0}}},
+            "throughput": [{"workers": 1, "images_per_second": 2.0}],
+        }
+
+        regressions = find_regressions(results, baseline, tolerance=0.2)
+
+        assert len(regressions) == 2
+        assert regressions[0].startswith("detection")
+
+    def test_main_writes_json(self, client, tmp_path, monkeypatch):
+        """The command line entry point writes the results file."""
+        monkeypatch.setattr("tests.benchmarks.ocr_benchmark.get_ocr_client", lambda: client)
+        output = tmp_path / "results.json"
+
+        exit_code = main(
+            [
+                "--output",
+                str(output),
+                "--workers",
+                "0",
+                "--resolutions",
+                "200",
+                "--noise",
+                "0",
+                "--rotations",
+                "0",
+            ]
+        )
+
+        assert exit_code == 0
+        assert json.loads(output.read_text())["corpus"][0]["resolution"] == 200
@@ -9,7 +9,7 @@ from datetime import datetime
 
 from app.core.config import Settings
 from app.models import Profile, Medication
-from app.services.ocr_service import EasyOCRClient
+from app.services.ocr_service import EasyOCRClient, OCRResult
 import app.services.ocr_service  # Import the module to access its global variables
 
 # Required for settings validation
@@ -130,6 +130,18 @@ class MockOCRClient(EasyOCRClient):
         """Return mock text instead of performing actual OCR."""
         return "Mocked OCR text for testing"
 
+    def read_text_batch(self, images):
+        """Return mock text for every image in the batch."""
+        return [self.read_text(image_data) for image_data in images]
+
+    def scan(self, image_data):
+        """Return mock text as a fast pass result."""
+        return OCRResult(self.read_text(image_data), "fast", 1.0)
+
+    def scan_batch(self, images):
+        """Return mock fast pass results for every image in the batch."""
+        return [OCRResult(text, "fast", 1.0) for text in self.read_text_batch(images)]
+
 
 @pytest.fixture(autouse=True)
 def mock_ocr_service():
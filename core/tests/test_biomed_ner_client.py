@@ -0,0 +1,342 @@
+"""Tests for the async NER service client."""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.services.biomed_ner_client import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    MedicalNERClient,
+    NERServiceError,
+    Replica,
+)
+
+
+def entities(*texts):
+    """Build the lean entity list returned by the NER service."""
+    return [{"text": text, "umls_entities": []} for text in texts]
+
+
+class StubService:
+    """Answers NER requests, failing the first ``failures`` calls."""
+
+    def __init__(self, failures=0, failure=None):
+        self.failures = failures
+        self.failure = failure or httpx.Response(503, json={"detail": "Model not loaded yet"})
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        if len(self.requests) <= self.failures:
+            if isinstance(self.failure, Exception):
+                raise self.failure
+            return self.failure
+
+        payload = json.loads(request.content)
+        if request.url.path == "/extract_entities_batch":
+            results = [{"entities": entities(*text.split())} for text in payload["texts"]]
+            return httpx.Response(200, json={"results": results})
+        return httpx.Response(200, json={"entities": entities("ibuprofen")})
+
+
+def make_client(service, **kwargs):
+    """Create a client that talks to a stub service without waiting between retries."""
+    return MedicalNERClient(
+        api_urls=["http://ner"],
+        retry_backoff=0,
+        transport=httpx.MockTransport(service),
+        **kwargs,
+    )
+
+
+def call(client, method, *args):
+    """Run one client call and close the client."""
+
+    async def run():
+        try:
+            return await getattr(client, method)(*args)
+        finally:
+            await client.aclose()
+
+    return asyncio.run(run())
+
+
+class TestMedicalNERClient:
+    """Test the NER client against a stub transport."""
+
+    def test_find_active_ingredients(self):
+        """Entity texts are returned and the lean response shape is requested."""
+        service = StubService()
+        result = call(make_client(service), "find_active_ingredients", "Advil 200 mg")
+
+        assert result == ["ibuprofen"]
+        payload = json.loads(service.requests[0].content)
+        assert payload == {
+            "text": "Advil 200 mg",
+            "shape": {"fields": [], "max_candidates": 0},
+        }
+
+    def test_retries_unavailable_service(self):
+        """503 responses, e.g. while the model loads, are retried."""
+        service = StubService(failures=2)
+        client = make_client(service, max_retries=2)
+        assert call(client, "find_active_ingredients", "text") == ["ibuprofen"]
+        assert len(service.requests) == 3
+        assert client.retries == 2
+
+    def test_retries_are_bounded(self):
+        """The last failure is reported once the retries are used up."""
+        service = StubService(failures=10)
+        with pytest.raises(NERServiceError, match="503"):
+            call(make_client(service, max_retries=1), "find_active_ingredients", "text")
+        assert len(service.requests) == 2
+
+    def test_timeouts_are_retried_then_raised(self):
+        """Timeouts count as retryable failures and surface as NERServiceError."""
+        service = StubService(failures=10, failure=httpx.ReadTimeout("timed out"))
+        with pytest.raises(NERServiceError, match="ReadTimeout"):
+            call(make_client(service, max_retries=2), "find_active_ingredients", "text")
+        assert len(service.requests) == 3
+
+    def test_client_errors_are_not_retried(self):
+        """A rejected request fails right away."""
+        service = StubService(failures=10, failure=httpx.Response(422, json={"detail": "bad"}))
+        with pytest.raises(NERServiceError, match="422"):
+            call(make_client(service), "find_active_ingredients", "text")
+        assert len(service.requests) == 1
+
+    def test_batch_is_split_by_service_limit(self):
+        """Batches larger than the service accepts are sent in several calls."""
+        service = StubService()
+        texts = ["advil", "tylenol aleve", "", "motrin", "zyrtec"]
+        client = make_client(service, max_batch_texts=2)
+        result = call(client, "find_active_ingredients_batch", texts)
+
+        assert result == [["advil"], ["tylenol", "aleve"], [], ["motrin"], ["zyrtec"]]
+        assert [request.url.path for request in service.requests] == ["/extract_entities_batch"] * 3
+
+    def test_identical_texts_share_one_request(self):
+        """Concurrent calls for the same text send a single request."""
+
+        requests = []
+
+        async def slow_service(request):
+            requests.append(request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"entities": entities("ibuprofen")})
+
+        client = MedicalNERClient(
+            api_urls=["http://ner"], transport=httpx.MockTransport(slow_service)
+        )
+
+        async def run():
+            results = await asyncio.gather(
+                *(client.find_active_ingredients(text) for text in ["Advil", "Advil", "Motrin"])
+            )
+            await client.aclose()
+            return results
+
+        results = asyncio.run(run())
+        assert results == [["ibuprofen"]] * 3
+        assert results[0] is not results[1]
+        assert len(requests) == 2
+        assert client.stats()["coalescing"]["coalesced"] == 1
+
+    def test_missing_host(self, monkeypatch):
+        """Without BIOMED_HOST the client cannot be created."""
+        monkeypatch.delenv("BIOMED_HOST", raising=False)
+        with pytest.raises(ValueError, match="BIOMED_HOST"):
+            MedicalNERClient()
+
+
+class StubServer:
+    """A local HTTP server standing in for one NER service replica."""
+
+    def __init__(self):
+        self.status = 200
+        self.delay = 0.0
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                stub.requests += 1
+                time.sleep(stub.delay)
+                body = json.dumps({"entities": entities("ibuprofen")}).encode()
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        """Stop serving."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def replicas():
+    """Two running stub replicas."""
+    servers = [StubServer(), StubServer()]
+    yield servers
+    for server in servers:
+        server.close()
+
+
+def replica_client(servers, **kwargs):
+    """Create a client for the stub replicas without waiting between retries."""
+    return MedicalNERClient(api_urls=[server.url for server in servers], retry_backoff=0, **kwargs)
+
+
+class TestReplicas:
+    """Test load balancing, circuit breaking and hedging against local stub servers."""
+
+    def test_least_outstanding_requests(self, replicas):
+        """Requests avoid the replica that is still busy."""
+        slow, fast = replicas
+        slow.delay = 0.5
+        client = replica_client(replicas)
+
+        async def run():
+            busy = asyncio.ensure_future(client.find_active_ingredients("first"))
+            await asyncio.sleep(0.1)
+            for _ in range(3):
+                await client.find_active_ingredients("next")
+            await busy
+            await client.aclose()
+
+        asyncio.run(run())
+        assert (slow.requests, fast.requests) == (1, 3)
+
+    def test_circuit_breaker_opens_and_recovers(self, replicas):
+        """A failing replica is skipped once its breaker opens and probed after the reset."""
+        failing, healthy = replicas
+        failing.status = 503
+        client = replica_client(replicas, breaker_failures=2, breaker_reset=0.3, max_retries=1)
+
+        async def run():
+            for _ in range(5):
+                assert await client.find_active_ingredients("text") == ["ibuprofen"]
+            state = client.replicas[0].state
+            failed_requests = failing.requests
+            served_requests = healthy.requests
+
+            failing.status = 200
+            await asyncio.sleep(0.3)
+            probe_state = client.replicas[0].state
+            for _ in range(2):
+                await client.find_active_ingredients("text")
+            await client.aclose()
+            return state, failed_requests, served_requests, probe_state
+
+        state, failed_requests, served_requests, probe_state = asyncio.run(run())
+        assert state == OPEN
+        assert failed_requests == 2
+        # The healthy replica answered every request while the other one failed
+        assert served_requests == 5
+        assert client.retries == 2
+        assert probe_state == HALF_OPEN
+        assert client.replicas[0].state == CLOSED
+        assert failing.requests == 4
+
+    def test_slow_responses_open_the_breaker(self, replicas):
+        """Responses slower than the limit count as failures."""
+        slow, fast = replicas
+        slow.delay = 0.1
+        client = replica_client(replicas, breaker_failures=1, slow_response=0.05)
+
+        async def run():
+            for _ in range(4):
+                await client.find_active_ingredients("text")
+            await client.aclose()
+
+        asyncio.run(run())
+        assert client.replicas[0].state == OPEN
+        assert (slow.requests, fast.requests) == (1, 3)
+
+    def test_hedged_request(self, replicas):
+        """A request past the p95 latency is also sent to the other replica."""
+        slow, fast = replicas
+        slow.delay = 1.0
+        client = replica_client(replicas, hedge=True)
+        client.latencies["/extract_entities"].extend([0.02] * 20)
+
+        async def run():
+            started = time.perf_counter()
+            result = await client.find_active_ingredients("text")
+            elapsed = time.perf_counter() - started
+            await client.aclose()
+            return result, elapsed
+
+        result, elapsed = asyncio.run(run())
+        assert result == ["ibuprofen"]
+        assert elapsed < 0.8
+        assert client.hedges == 1
+        assert (slow.requests, fast.requests) == (1, 1)
+
+    def test_no_hedging_without_latency_history(self, replicas):
+        """Hedging waits for enough samples to know the p95."""
+        client = replica_client(replicas, hedge=True)
+        assert client.hedge_delay("/extract_entities") is None
+
+    def test_all_breakers_open(self, replicas):
+        """With every replica out of rotation calls fail fast."""
+        for server in replicas:
+            server.status = 503
+        client = replica_client(replicas, breaker_failures=1, max_retries=1)
+
+        async def run():
+            try:
+                with pytest.raises(NERServiceError, match="503"):
+                    await client.find_active_ingredients("text")
+                with pytest.raises(NERServiceError, match="No NER service replica"):
+                    await client.find_active_ingredients("text")
+            finally:
+                await client.aclose()
+
+        asyncio.run(run())
+        assert [server.requests for server in replicas] == [1, 1]
+
+    def test_only_the_probe_frees_the_probe_slot(self):
+        """A request that started before the breaker opened does not end the probe."""
+        replica = Replica("http://ner", failure_threshold=1, reset_timeout=0)
+        earlier = replica.begin_request()
+        replica.record_failure()
+
+        probe = replica.begin_request()
+        assert (earlier, probe) == (False, True)
+        assert not replica.is_available
+
+        replica.end_request(earlier)
+        assert not replica.is_available
+        replica.end_request(probe)
+        assert replica.is_available
+        assert replica.outstanding == 0
+
+    def test_replicas_from_environment(self, monkeypatch):
+        """BIOMED_HOST takes a comma-separated list of replicas."""
+        monkeypatch.setenv("BIOMED_HOST", "ner-1:8081, ner-2:8081")
+        client = MedicalNERClient()
+        assert [replica.url for replica in client.replicas] == [
+            "http://ner-1:8081",
+            "http://ner-2:8081",
+        ]
@@ -0,0 +1,127 @@
+"""Tests for the embedded NER backend."""
+
+import asyncio
+import sys
+import textwrap
+
+import pytest
+
+from app.services.biomed_ner_client import NERServiceError
+from app.services.embedded_ner_client import EmbeddedNERClient
+
+# Stand-in for model/main.py with the functions the embedded backend uses
+MODEL_SERVICE = textwrap.dedent("""
+    import os
+
+    DRUGS = {"advil", "ibuprofen", "motrin"}
+    BATCH_SIZE = 8
+    loads = 0
+
+
+    class ModelState:
+        status = "not_started"
+        error = None
+
+        @property
+        def is_ready(self):
+            return self.status == "ready"
+
+
+    model_state = ModelState()
+
+
+    class Runner:
+        def extract_batch(self, texts, batch_size, n_process=1, dictionary=None):
+            return [
+                [(word, [("C0000870", 1.0)]) for word in text.split() if word.lower() in DRUGS]
+                for text in texts
+            ]
+
+
+    def load_model():
+        global loads
+        loads += 1
+        if os.path.exists(os.path.join(os.path.dirname(__file__), "broken")):
+            model_state.status = "failed"
+            model_state.error = "Can't find model 'en_ner_bc5cdr_md'"
+        else:
+            model_state.status = "ready"
+
+
+    def get_profile(name):
+        return Runner()
+
+
+    def get_dictionary(requested):
+        return None
+    """)
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    """A model service directory, removed from the import system afterwards."""
+    (tmp_path / "main.py").write_text(MODEL_SERVICE)
+    yield str(tmp_path)
+    sys.modules.pop("main", None)
+    if str(tmp_path) in sys.path:
+        sys.path.remove(str(tmp_path))
+
+
+def run(client, *calls):
+    """Run client calls one after another and close the client."""
+
+    async def run_calls():
+        try:
+            return [await getattr(client, method)(*args) for method, *args in calls]
+        finally:
+            await client.aclose()
+
+    return asyncio.run(run_calls())
+
+
+class TestEmbeddedNERClient:
+    """Test the embedded backend with a stand-in model service."""
+
+    def test_inline_mode(self, model_path):
+        """With no workers the pipeline is loaded once in the current process."""
+        client = EmbeddedNERClient(model_path, workers=0)
+        assert client.status == "not_started"
+
+        results = run(
+            client,
+            ("find_active_ingredients", "Advil 200 mg"),
+            ("find_active_ingredients_batch", ["Motrin IB", "no drugs", "ibuprofen advil"]),
+        )
+
+        assert results == [["Advil"], [["Motrin"], [], ["ibuprofen", "advil"]]]
+        assert client.status == "ready"
+        assert client.load_seconds is not None
+        assert sys.modules["main"].loads == 1
+
+    def test_worker_process(self, model_path):
+        """By default NER runs in a worker process."""
+        client = EmbeddedNERClient(model_path, workers=1, max_batch_texts=2)
+        results = run(
+            client,
+            ("find_active_ingredients_batch", ["advil", "motrin", "ibuprofen"]),
+        )
+        assert results == [[["advil"], ["motrin"], ["ibuprofen"]]]
+        assert client.stats()["status"] == "ready"
+        assert "main" not in sys.modules
+
+    def test_failed_load_is_reported(self, model_path, tmp_path):
+        """A model that fails to load raises NERServiceError and is retried later."""
+        (tmp_path / "broken").touch()
+        client = EmbeddedNERClient(model_path, workers=0)
+        with pytest.raises(NERServiceError, match="en_ner_bc5cdr_md"):
+            run(client, ("find_active_ingredients", "advil"))
+        assert client.status == "failed"
+
+        (tmp_path / "broken").unlink()
+        assert run(client, ("find_active_ingredients", "advil")) == [["advil"]]
+        assert client.status == "ready"
+
+    def test_model_path_is_required(self):
+        """The backend needs the model service directory."""
+        with pytest.raises(ValueError, match="BIOMED_MODEL_PATH"):
+            EmbeddedNERClient(None)
@@ -0,0 +1,106 @@
+"""Tests for the background ingredient enrichment."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.models.medication import Medication
+from app.services.biomed_ner_client import NERServiceError
+from app.services.enrichment_service import (
+    DONE,
+    FAILED,
+    PENDING,
+    SKIPPED,
+    enrich_medication,
+    format_ingredients,
+)
+
+
+class MockNERClient:
+    """Returns fixed ingredients, or raises the given error."""
+
+    def __init__(self, ingredients=None, error=None):
+        self.ingredients = ingredients or []
+        self.error = error
+        self.texts = []
+
+    async def find_active_ingredients(self, text):
+        """Record the text and answer like the NER service."""
+        self.texts.append(text)
+        if self.error is not None:
+            raise self.error
+        return self.ingredients
+
+
+@pytest.fixture
+def medication():
+    """A freshly uploaded medication waiting for enrichment."""
+    return Medication(id=7, scanned_text="Advil 200 mg", enrichment_status=PENDING)
+
+
+@pytest.fixture
+def session_factory(medication):
+    """A session factory whose sessions find the medication."""
+    session = MagicMock()
+    session.__enter__.return_value = session
+    session.get.side_effect = lambda model, medication_id: (
+        medication if medication_id == medication.id else None
+    )
+    factory = MagicMock(return_value=session)
+    factory.session = session
+    return factory
+
+
+def enrich(medication_id, text, client, session_factory):
+    """Run the enrichment task to completion."""
+    return asyncio.run(enrich_medication(medication_id, text, client, session_factory))
+
+
+class TestEnrichment:
+    """Test the enrichment task with a mock NER client and session."""
+
+    def test_stores_ingredients(self, medication, session_factory):
+        """Recognized ingredients and the finish time are stored on the row."""
+        client = MockNERClient(["ibuprofen", "Ibuprofen", "caffeine"])
+        assert enrich(7, "Advil 200 mg", client, session_factory) == DONE
+
+        assert client.texts == ["Advil 200 mg"]
+        assert medication.active_ingredients == "ibuprofen, caffeine"
+        assert medication.enrichment_status == DONE
+        assert medication.enriched_at is not None
+        session_factory.session.commit.assert_called_once()
+
+    def test_ner_failure_is_recorded(self, medication, session_factory):
+        """A failing NER service marks the row instead of raising."""
+        client = MockNERClient(error=NERServiceError("API call failed with status 503"))
+        assert enrich(7, "Advil 200 mg", client, session_factory) == FAILED
+
+        assert medication.enrichment_status == FAILED
+        assert medication.active_ingredients is None
+        assert medication.enriched_at is not None
+
+    def test_empty_text_is_skipped(self, medication, session_factory):
+        """Scans without text never reach the NER service."""
+        client = MockNERClient(["ibuprofen"])
+        assert enrich(7, "  ", client, session_factory) == SKIPPED
+
+        assert client.texts == []
+        assert medication.enrichment_status == SKIPPED
+
+    def test_deleted_medication(self, session_factory):
+        """A medication deleted meanwhile is left alone."""
+        assert enrich(8, "Advil", MockNERClient(["ibuprofen"]), session_factory) == DONE
+        session_factory.session.commit.assert_not_called()
+
+
+class TestFormatIngredients:
+    """Test how ingredients are stored."""
+
+    def test_no_ingredients(self):
+        """Nothing recognized stores no value."""
+        assert format_ingredients([]) is None
+
+    def test_length_limit(self):
+        """Ingredients past the schema's length limit are left out."""
+        assert format_ingredients(["ibuprofen", "caffeine"], max_length=15) == "ibuprofen"
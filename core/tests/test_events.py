@@ -0,0 +1,70 @@
+"""Tests for application lifespan and health checks."""
+
+import subprocess
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.services.ocr_executor
+from app.core.events import lifespan, setup_healthcheck
+from app.services.ocr_executor import OCRExecutor
+
+
+@pytest.fixture
+def ocr_executor():
+    """Install an in-process OCR executor as the singleton."""
+    original = app.services.ocr_executor._ocr_executor
+    executor = OCRExecutor(workers=0)
+    app.services.ocr_executor._ocr_executor = executor
+    yield executor
+    app.services.ocr_executor._ocr_executor = original
+
+
+@pytest.fixture
+def test_app():
+    """Create an application with the lifespan and health checks, without a database."""
+    with (
+        patch("app.core.events.create_start_app_handler", return_value=lambda: None),
+        patch("app.core.events.create_stop_app_handler", return_value=lambda: None),
+        patch("app.core.events.check_database_health", return_value=True),
+    ):
+        test_app = FastAPI(lifespan=lifespan)
+        setup_healthcheck(test_app)
+        yield test_app
+
+
+def wait_until_ready(executor, timeout=5.0):
+    """Wait for the background warm-up to finish."""
+    deadline = time.monotonic() + timeout
+    while not executor.is_ready and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_not_ready_before_ocr_warm_up(test_app, ocr_executor):
+    """Readiness fails while the OCR model has not been warmed up."""
+    client = TestClient(test_app)
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["details"]["ocr"] == "not_started"
+
+
+def test_lifespan_warms_up_ocr(test_app, ocr_executor, mock_ocr_service):
+    """The lifespan warms up OCR in the background and readiness follows."""
+    with TestClient(test_app) as client:
+        assert client.get("/health/live").status_code == 200
+        wait_until_ready(ocr_executor)
+
+        response = client.get("/health/ready")
+        assert response.status_code == 200
+        assert response.json()["details"]["ocr"] == "ready"
+        assert client.get("/health/ocr").json()["status"] == "ready"
+
+
+def test_importing_ocr_services_does_not_load_model():
+    """EasyOCR is only imported once the model is needed."""
+    code = "import sys, app.services.ocr_executor; sys.exit('easyocr' in sys.modules)"
+    subprocess.run([sys.executable, "-c", code], check=True)
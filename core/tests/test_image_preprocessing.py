@@ -0,0 +1,161 @@
+"""Tests for the vectorized image pre-processing pipeline."""
+
+import numpy as np
+import pytest
+from PIL import Image, ImageEnhance, ImageFilter
+
+from app.services.image_preprocessing import (
+    ImagePreprocessor,
+    ResizePolicy,
+    apply_contrast,
+    apply_median,
+    apply_sharpness,
+    apply_threshold,
+    crop_and_resize,
+    estimate_text_height,
+    to_grayscale_array,
+)
+
+
+def pil_preprocess(image):
+    """Reference implementation chaining the equivalent PIL operations."""
+    image = image.convert("L")
+    image = ImageEnhance.Contrast(image).enhance(1.5)
+    image = ImageEnhance.Sharpness(image).enhance(2.0)
+    image = image.filter(ImageFilter.MedianFilter(size=3))
+    image = image.point(lambda p: 255 if p > 128 else 0)
+    width, height = image.size
+    image = image.resize((width * 2, height * 2), Image.LANCZOS)
+    width, height = image.size
+    return image.crop((10, 10, width - 10, height - 10))
+
+
+@pytest.fixture
+def noisy_image():
+    """Create a smooth RGB image with random content."""
+    rng = np.random.default_rng(42)
+    pixels = rng.integers(0, 256, (61, 83, 3), dtype=np.uint8)
+    return Image.fromarray(pixels).filter(ImageFilter.GaussianBlur(2))
+
+
+@pytest.fixture
+def gray_array(noisy_image):
+    """Grayscale array of the noisy image."""
+    return to_grayscale_array(noisy_image)
+
+
+class TestImagePreprocessing:
+    """Check that every stage matches its PIL counterpart."""
+
+    def test_to_grayscale_array(self, noisy_image):
+        """Grayscale conversion returns a writable 2D uint8 array."""
+        gray = to_grayscale_array(noisy_image)
+        assert gray.shape == (61, 83)
+        assert gray.dtype == np.uint8
+        assert gray.flags.writeable
+
+    @pytest.mark.parametrize("factor", [0.5, 1.5, 3.0])
+    def test_contrast_matches_pil(self, gray_array, factor):
+        """Contrast enhancement matches ImageEnhance.Contrast."""
+        expected = np.asarray(ImageEnhance.Contrast(Image.fromarray(gray_array)).enhance(factor))
+        result = apply_contrast(gray_array.copy(), factor)
+        np.testing.assert_array_equal(result, expected)
+
+    @pytest.mark.parametrize("factor", [0.3, 2.0])
+    def test_sharpness_matches_pil(self, gray_array, factor):
+        """Sharpness enhancement matches ImageEnhance.Sharpness."""
+        expected = np.asarray(ImageEnhance.Sharpness(Image.fromarray(gray_array)).enhance(factor))
+        result = apply_sharpness(gray_array.copy(), factor)
+        np.testing.assert_array_equal(result, expected)
+
+    def test_median_matches_pil(self, gray_array):
+        """Median filtering matches ImageFilter.MedianFilter, across row blocks."""
+        expected = np.asarray(Image.fromarray(gray_array).filter(ImageFilter.MedianFilter(3)))
+        result = apply_median(gray_array.copy(), block_rows=7)
+        np.testing.assert_array_equal(result, expected)
+
+    def test_threshold_is_binary(self, gray_array):
+        """Thresholding leaves only 0 and 255."""
+        result = apply_threshold(gray_array.copy(), 128)
+        assert set(np.unique(result)) <= {0, 255}
+        np.testing.assert_array_equal(result == 255, gray_array > 128)
+
+    def test_stages_work_in_place(self, gray_array):
+        """Stages write into the buffer they are given."""
+        buffer = gray_array.copy()
+        assert apply_contrast(buffer) is buffer
+        assert apply_sharpness(buffer) is buffer
+        assert apply_median(buffer) is buffer
+        assert apply_threshold(buffer) is buffer
+
+    def test_crop_and_resize_size(self, gray_array):
+        """Cropping before resizing gives the same size as resizing first."""
+        result = crop_and_resize(gray_array, scale_factor=2.0, border=10)
+        assert result.shape == (61 * 2 - 20, 83 * 2 - 20)
+
+    def test_crop_without_scaling_is_a_view(self, gray_array):
+        """Without scaling the crop shares memory with the input buffer."""
+        result = crop_and_resize(gray_array, scale_factor=1, border=5)
+        assert result.shape == (51, 73)
+        assert np.shares_memory(result, gray_array)
+
+    def test_pipeline_matches_pil_chain(self, noisy_image):
+        """The fused pipeline reproduces the PIL stage chain."""
+        expected = np.asarray(pil_preprocess(noisy_image))
+        result = ImagePreprocessor(scale_factor=2.0).process(noisy_image)
+        assert isinstance(result, np.ndarray)
+        assert result.ndim == 2
+        np.testing.assert_array_equal(result, expected)
+
+
+def text_lines_image(line_height, lines=4, width=600):
+    """Grayscale image with dark horizontal bars standing in for text lines."""
+    gray = np.full((lines * line_height * 3, width), 255, dtype=np.uint8)
+    for line in range(lines):
+        top = line * line_height * 3 + line_height
+        gray[top : top + line_height, 50:-50:3] = 0
+    return gray
+
+
+class TestResizePolicy:
+    """Test the size-aware resize policy."""
+
+    def test_large_images_are_downscaled(self):
+        """A 12 MP photo is brought down to the pixel target."""
+        decision = ResizePolicy(target_pixels=2_000_000).scale_for_size(4000, 3000)
+        assert decision.scale == pytest.approx((2_000_000 / 12_000_000) ** 0.5)
+
+    def test_small_images_are_upscaled_up_to_the_limit(self):
+        """Small scans are upscaled, but never beyond max_scale."""
+        policy = ResizePolicy(target_pixels=2_000_000, max_scale=2.0)
+        assert policy.scale_for_size(800, 400).scale == 2.0
+        assert policy.scale_for_size(1200, 1000).scale == pytest.approx((2 / 1.2) ** 0.5)
+
+    def test_scales_close_to_one_are_skipped(self):
+        """Images already near the target are not resampled."""
+        assert ResizePolicy(target_pixels=1_000_000).scale_for_size(1010, 1000).scale == 1.0
+
+    def test_estimate_text_height(self):
+        """The text height is the typical height of ink row runs."""
+        assert estimate_text_height(text_lines_image(12)) == 12
+        assert estimate_text_height(np.full((50, 50), 255, dtype=np.uint8)) is None
+
+    def test_text_height_target(self):
+        """With a text height target the scale follows the estimated text size."""
+        policy = ResizePolicy(target_text_height=30)
+        decision = policy.decide(Image.fromarray(text_lines_image(60)))
+        assert decision.scale == 0.5
+        assert decision.text_height == 60
+
+    def test_text_height_falls_back_to_pixels(self):
+        """Without detectable text the pixel target is used."""
+        policy = ResizePolicy(target_pixels=10_000, target_text_height=30)
+        blank = Image.new("L", (400, 100), 255)
+        assert policy.decide(blank).scale == 0.5
+
+    def test_pipeline_downscales_before_processing(self, noisy_image):
+        """Large inputs come out smaller rather than doubled."""
+        policy = ResizePolicy(target_pixels=1_000, min_scale=0.1)
+        result = ImagePreprocessor(border=2, resize_policy=policy).process(noisy_image)
+        assert result.size < 61 * 83
+        assert result.dtype == np.uint8
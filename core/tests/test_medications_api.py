@@ -0,0 +1,49 @@
+"""Tests for the medication endpoints."""
+
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.datastructures import UploadFile
+
+import app.api.v1.medications as medications
+from app.core.config import settings
+from app.core.database import get_db
+from app.services.ocr_executor import get_ocr_executor
+from app.services.session_service import get_current_user
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """The medication router with storage, database, user and OCR replaced."""
+    monkeypatch.setattr(medications, "supabase", MagicMock())
+    test_app = FastAPI()
+    test_app.include_router(medications.router)
+    test_app.dependency_overrides[get_db] = lambda: MagicMock()
+    test_app.dependency_overrides[get_current_user] = lambda: {"id": "user"}
+    test_app.dependency_overrides[get_ocr_executor] = lambda: MagicMock()
+    return TestClient(test_app)
+
+
+class TestUpload:
+    """Test the upload size limit."""
+
+    def test_oversized_upload_is_rejected(self, client, monkeypatch):
+        """Uploads above OCR_MAX_IMAGE_BYTES get 413, are not stored and not read in full."""
+        monkeypatch.setattr(settings, "OCR_MAX_IMAGE_BYTES", 1024)
+        read_sizes = []
+        read = UploadFile.read
+
+        async def recording_read(self, size=-1):
+            data = await read(self, size)
+            read_sizes.append(len(data))
+            return data
+
+        monkeypatch.setattr(UploadFile, "read", recording_read)
+
+        response = client.post("/upload", files={"image": ("scan.png", b"x" * 4096, "image/png")})
+
+        assert response.status_code == 413
+        medications.supabase.storage.from_.assert_not_called()
+        assert read_sizes == [1025]
@@ -0,0 +1,186 @@
+"""Tests for the OCR process pool executor."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app.services.ocr_executor
+from app.services.ocr_executor import OCRExecutor, get_ocr_executor, shutdown_ocr_executor
+from app.services.ocr_service import OCRResult, OCRResultCache
+
+
+class MockWorkerClient:
+    """Stand-in for the reader held by a pool worker."""
+
+    def scan(self, image_data):
+        """Echo the payload size so calls can be told apart."""
+        return OCRResult(f"worker read {len(image_data)} bytes", "full", 0.9)
+
+
+@pytest.fixture
+def worker_client():
+    """Install a mock worker client in the current process."""
+    original = app.services.ocr_executor._worker_client
+    app.services.ocr_executor._worker_client = MockWorkerClient()
+    yield app.services.ocr_executor._worker_client
+    app.services.ocr_executor._worker_client = original
+
+
+class TestOCRExecutor:
+    """Test the OCR executor without spawning real worker processes."""
+
+    def test_inline_mode_uses_ocr_client(self, mock_ocr_service):
+        """With no workers OCR runs on the in-process client."""
+        executor = OCRExecutor(workers=0)
+        result = asyncio.run(executor.read_text(b"image"))
+        assert result == "Mocked OCR text for testing"
+
+    def test_pool_mode_dispatches_to_worker(self, worker_client):
+        """With workers OCR is dispatched to the pool."""
+        executor = OCRExecutor(workers=2)
+        executor._pool = ThreadPoolExecutor(max_workers=2)
+
+        async def run_concurrently():
+            return await asyncio.gather(executor.read_text(b"a" * 3), executor.read_text(b"b" * 5))
+
+        results = asyncio.run(run_concurrently())
+        executor.shutdown()
+
+        assert results == ["worker read 3 bytes", "worker read 5 bytes"]
+        assert executor._pool is None
+
+    def test_event_loop_stays_responsive(self, mock_ocr_service):
+        """Other coroutines keep running while OCR is in progress."""
+        executor = OCRExecutor(workers=0)
+        ticks = []
+
+        def slow_read_text(image_data):
+            import time
+
+            time.sleep(0.2)
+            return "done"
+
+        mock_ocr_service.read_text = slow_read_text
+
+        async def ticker():
+            for _ in range(3):
+                ticks.append(True)
+                await asyncio.sleep(0.01)
+
+        async def run_both():
+            return await asyncio.gather(executor.read_text(b"image"), ticker())
+
+        result, _ = asyncio.run(run_both())
+        assert result == "done"
+        assert len(ticks) == 3
+
+    def test_cached_results_skip_ocr(self, mock_ocr_service):
+        """A repeated image is answered from the cache."""
+        calls = []
+
+        def counting_read_text(image_data):
+            calls.append(image_data)
+            return "Ibuprofen 200mg"
+
+        mock_ocr_service.read_text = counting_read_text
+        executor = OCRExecutor(workers=0, cache=OCRResultCache(version="test"))
+
+        async def scan_twice():
+            first = await executor.read_text(b"image")
+            second = await executor.read_text(b"image")
+            return first, second
+
+        assert asyncio.run(scan_twice()) == ("Ibuprofen 200mg", "Ibuprofen 200mg")
+        assert len(calls) == 1
+        assert executor.cache.stats()["hits"] == 1
+        assert executor.stats()["paths"] == {"fast": 1, "cache": 1}
+
+    def test_identical_concurrent_scans_share_one_run(self, mock_ocr_service):
+        """Concurrent requests for the same image run OCR once."""
+        calls = []
+
+        def counting_read_text(image_data):
+            calls.append(image_data)
+            return f"read {image_data.decode()}"
+
+        mock_ocr_service.read_text = counting_read_text
+        executor = OCRExecutor(workers=0)
+
+        async def scan_concurrently():
+            images = [b"label", b"label", b"other", b"label"]
+            return await asyncio.gather(*(executor.read_text(image) for image in images))
+
+        results = asyncio.run(scan_concurrently())
+        assert results == ["read label", "read label", "read other", "read label"]
+        assert sorted(calls) == [b"label", b"other"]
+        assert executor.stats()["coalescing"]["coalesced"] == 2
+        assert executor.stats()["paths"] == {"fast": 2}
+
+    def test_get_ocr_executor_singleton(self):
+        """The factory returns a shared executor until shut down."""
+        shutdown_ocr_executor()
+        first = get_ocr_executor()
+        assert get_ocr_executor() is first
+        shutdown_ocr_executor()
+        assert app.services.ocr_executor._ocr_executor is None
+
+
+class TestOCRWarmUp:
+    """Test model warm-up and readiness reporting."""
+
+    def test_warm_up_marks_executor_ready(self, mock_ocr_service):
+        """A successful warm-up inference makes the executor ready."""
+        executor = OCRExecutor(workers=0)
+        assert not executor.is_ready
+
+        asyncio.run(executor.warm_up())
+
+        assert executor.is_ready
+        assert executor.stats()["status"] == "ready"
+        assert executor.warm_up_seconds is not None
+
+    def test_warm_up_records_failures(self, mock_ocr_service):
+        """A failing warm-up is reported instead of raised."""
+
+        def broken_read_text(image_data):
+            raise RuntimeError("weights missing")
+
+        mock_ocr_service.read_text = broken_read_text
+        executor = OCRExecutor(workers=0)
+
+        asyncio.run(executor.warm_up())
+
+        assert executor.status == "failed"
+        assert executor.error == "weights missing"
+        assert not executor.is_ready
+
+    def test_pool_warm_up_waits_for_every_worker(self, monkeypatch):
+        """Warm-up jobs are repeated until every worker has answered one."""
+        answers = iter([1, 1, 1, 2])
+        monkeypatch.setattr(app.services.ocr_executor, "_worker_pid", lambda: next(answers))
+        executor = OCRExecutor(workers=2)
+        executor._pool = ThreadPoolExecutor(max_workers=1)
+
+        asyncio.run(executor.warm_up())
+        executor.shutdown()
+
+        assert executor.is_ready
+        assert next(answers, None) is None
+
+    def test_worker_initializer_runs_warm_up(self, worker_client, monkeypatch):
+        """Every pool worker runs one inference before it takes jobs."""
+        scanned = []
+
+        class RecordingClient(MockWorkerClient):
+            def scan(self, image_data):
+                scanned.append(image_data)
+                return super().scan(image_data)
+
+        monkeypatch.setattr(
+            app.services.ocr_executor, "get_ocr_client", lambda languages: RecordingClient()
+        )
+
+        app.services.ocr_executor._init_worker(["en"])
+
+        assert len(scanned) == 1
@@ -0,0 +1,114 @@
+"""Tests for the OCR micro-batching scheduler."""
+
+import asyncio
+
+from app.services.ocr_executor import OCRExecutor
+from app.services.ocr_scheduler import OCRBatchScheduler
+
+
+class RecordingRunner:
+    """Batch runner that records the batches it receives."""
+
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.fail_on = fail_on
+
+    async def __call__(self, images):
+        self.batches.append(list(images))
+        await asyncio.sleep(0)
+        return [
+            ValueError(f"cannot read {image!r}") if image == self.fail_on else f"text of {image!r}"
+            for image in images
+        ]
+
+
+def run_concurrently(target, images, method="submit"):
+    """Submit images at the same time and collect results or exceptions."""
+
+    async def submit_all():
+        submit = getattr(target, method)
+        return await asyncio.gather(*(submit(image) for image in images), return_exceptions=True)
+
+    return asyncio.run(submit_all())
+
+
+class TestOCRBatchScheduler:
+    """Test batching of concurrent OCR requests."""
+
+    def test_concurrent_requests_share_a_batch(self):
+        """Requests arriving within the window are run together."""
+        runner = RecordingRunner()
+        scheduler = OCRBatchScheduler(runner, max_batch_size=8, batch_window=0.01)
+
+        results = run_concurrently(scheduler, [b"a", b"b", b"c"])
+
+        assert results == ["text of b'a'", "text of b'b'", "text of b'c'"]
+        assert runner.batches == [[b"a", b"b", b"c"]]
+
+    def test_batches_are_capped_at_max_size(self):
+        """A full batch is dispatched without waiting for the window."""
+        runner = RecordingRunner()
+        scheduler = OCRBatchScheduler(runner, max_batch_size=2, batch_window=10)
+
+        results = run_concurrently(scheduler, [b"a", b"b", b"c", b"d"])
+
+        assert len(results) == 4
+        assert runner.batches == [[b"a", b"b"], [b"c", b"d"]]
+
+    def test_failures_reach_only_their_caller(self):
+        """An exception for one image does not fail the rest of the batch."""
+        runner = RecordingRunner(fail_on=b"b")
+        scheduler = OCRBatchScheduler(runner, max_batch_size=8, batch_window=0.01)
+
+        results = run_concurrently(scheduler, [b"a", b"b", b"c"])
+
+        assert results[0] == "text of b'a'"
+        assert isinstance(results[1], ValueError)
+        assert results[2] == "text of b'c'"
+
+    def test_runner_errors_fail_the_whole_batch(self):
+        """If the batch cannot run at all every caller gets the error."""
+
+        async def broken_runner(images):
+            raise RuntimeError("worker crashed")
+
+        scheduler = OCRBatchScheduler(broken_runner, max_batch_size=8, batch_window=0.01)
+
+        results = run_concurrently(scheduler, [b"a", b"b"])
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    def test_missing_results_fail_their_callers(self):
+        """Callers left without a result get an error instead of waiting forever."""
+
+        async def short_runner(images):
+            return [f"text of {images[0]!r}"]
+
+        scheduler = OCRBatchScheduler(short_runner, max_batch_size=8, batch_window=0.01)
+
+        results = run_concurrently(scheduler, [b"a", b"b", b"c"])
+
+        assert results[0] == "text of b'a'"
+        assert all(isinstance(result, RuntimeError) for result in results[1:])
+
+    def test_stats(self):
+        """Per-batch metrics are recorded."""
+        scheduler = OCRBatchScheduler(RecordingRunner(), max_batch_size=2, batch_window=10)
+
+        run_concurrently(scheduler, [b"a", b"b", b"c", b"d"])
+        stats = scheduler.stats()
+
+        assert stats["batches"] == 2
+        assert stats["requests"] == 4
+        assert stats["largest_batch"] == 2
+        assert stats["average_batch_size"] == 2
+        assert [batch["size"] for batch in stats["recent_batches"]] == [2, 2]
+
+    def test_executor_batches_through_client(self, mock_ocr_service):
+        """The executor routes concurrent requests through the batched client call."""
+        executor = OCRExecutor(workers=0, max_batch_size=4, batch_window=0.01)
+
+        results = run_concurrently(executor, [b"a", b"b"], method="read_text")
+
+        assert results == ["Mocked OCR text for testing"] * 2
+        assert executor.stats()["batching"]["batches"] == 1
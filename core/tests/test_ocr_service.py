@@ -1,13 +1,25 @@
 """Tests for the OCR service."""
 
+import asyncio
 import io
+import os
+import struct
+import threading
+import zlib
+import numpy as np
 import pytest
 from unittest.mock import patch
 
-from PIL import Image
+from PIL import Image, ImageEnhance, ImageFilter
 from app.services.ocr_service import (
+    CascadePolicy,
     EasyOCRClient,
+    ImageTooLargeError,
+    OCRResultCache,
+    get_ocr_version,
+    open_image,
 )
+from app.services.image_preprocessing import ImagePreprocessor, ResizePolicy
 import app.services.ocr_service
 
 # Original client reference
@@ -17,9 +29,20 @@ _original_client = None
 class MockReader:
     """Mock EasyOCR reader implementation."""
 
+    confidence = 0.9
+
     def readtext(self, image_bytes, detail=0):
         """Return simulated OCR results."""
-        return ["Mock OCR text", "for testing", "purposes"]
+        texts = ["Mock OCR text", "for testing", "purposes"]
+        if detail:
+            return [([[0, 0], [1, 0], [1, 1], [0, 1]], text, self.confidence) for text in texts]
+        return texts
+
+    def readtext_batched(self, images, detail=0):
+        """Return simulated OCR results for each image of a batch."""
+        shapes = {image.shape for image in images}
+        assert len(shapes) == 1, "batched images must share one shape"
+        return [self.readtext(image, detail=detail) for image in images]
 
 
 def setup_module(module):
@@ -96,6 +119,77 @@ class TestOCRService:
         assert len(result) > 0
         assert "Mock OCR text" in result
 
+    def test_read_text_passes_array_to_reader(self, test_image):
+        """The preprocessed pixels reach the reader as a single-channel array."""
+        received = []
+
+        class RecordingReader(MockReader):
+            def readtext(self, image, detail=0):
+                received.append(image)
+                return super().readtext(image, detail=detail)
+
+        client = EasyOCRClient.__new__(EasyOCRClient)
+        client.languages = ["en"]
+        client.reader = RecordingReader()
+        client.cascade = None
+
+        image_bytes = io.BytesIO()
+        test_image.save(image_bytes, format="PNG")
+        client.read_text(image_bytes.getvalue())
+
+        assert isinstance(received[0], np.ndarray)
+        assert received[0].ndim == 2
+        assert received[0].shape == (80, 80)  # 50 * 2 - 10 * 2 = 80
+
+    def test_read_text_batch(self):
+        """Images of different sizes are batched and failures stay isolated."""
+        client = EasyOCRClient.__new__(EasyOCRClient)
+        client.languages = ["en"]
+        client.reader = MockReader()
+
+        images = []
+        for size in [(50, 50), (80, 40)]:
+            image_bytes = io.BytesIO()
+            Image.new("RGB", size, (255, 255, 255)).save(image_bytes, format="PNG")
+            images.append(image_bytes.getvalue())
+        images.insert(1, b"not an image")
+
+        results = client.read_text_batch(images)
+
+        assert results[0] == "Mock OCR text for testing purposes"
+        assert isinstance(results[1], Exception)
+        assert results[2] == "Mock OCR text for testing purposes"
+
+    def test_read_text_batch_escalates_per_image(self):
+        """Only the images the fast pass cannot read go through the full pass."""
+        passes = []
+
+        class MixedReader(MockReader):
+            def readtext_batched(self, images, detail=0):
+                passes.append(len(images))
+                results = super().readtext_batched(images, detail=detail)
+                if len(passes) == 1:
+                    # The fast pass cannot read the second image
+                    results[1] = [(None, "??", 0.1)]
+                return results
+
+        client = EasyOCRClient.__new__(EasyOCRClient)
+        client.languages = ["en"]
+        client.reader = MixedReader()
+        client.cascade = CascadePolicy(min_confidence=0.6, min_chars=10)
+
+        images = []
+        for _ in range(2):
+            image_bytes = io.BytesIO()
+            Image.new("RGB", (50, 50), (255, 255, 255)).save(image_bytes, format="PNG")
+            images.append(image_bytes.getvalue())
+
+        results = client.scan_batch(images)
+
+        assert passes == [2, 1]
+        assert [result.path for result in results] == ["fast", "full"]
+        assert results[1].text == "Mock OCR text for testing purposes"
+
     def test_preprocess_grayscale(self, mock_ocr_client, test_image):
         """Test grayscale conversion."""
         # The real implementation
@@ -128,6 +222,22 @@ class TestOCRService:
         )
         assert isinstance(result, Image.Image)
 
+    @pytest.mark.parametrize("mode", ["RGB", "L"])
+    def test_single_stages_keep_the_input_mode(self, mock_ocr_client, mode):
+        """Contrast, sharpness and denoise return the mode they were given, as PIL does."""
+        rng = np.random.default_rng(0)
+        image = Image.fromarray(rng.integers(0, 256, (20, 30, 3), dtype=np.uint8)).convert(mode)
+        expected = {
+            "preprocess_contrast": ImageEnhance.Contrast(image).enhance(1.5),
+            "preprocess_sharpness": ImageEnhance.Sharpness(image).enhance(2.0),
+            "preprocess_denoise": image.filter(ImageFilter.MedianFilter(3)),
+        }
+
+        for method, reference in expected.items():
+            result = getattr(EasyOCRClient, method)(mock_ocr_client, image)
+            assert result.mode == mode
+            assert np.array_equal(np.asarray(result), np.asarray(reference)), method
+
     def test_preprocess_threshold(self, mock_ocr_client, test_image):
         """Test threshold filter."""
         # The real implementation
@@ -166,3 +276,249 @@ class TestOCRService:
 
             # Reset the global client
             app.services.ocr_service._ocr_client = _original_client
+
+
+class TestOCRCascade:
+    """Test the two-pass OCR cascade."""
+
+    @pytest.fixture
+    def scan_bytes(self):
+        """A large PNG scan as bytes."""
+        image_bytes = io.BytesIO()
+        Image.new("RGB", (2000, 1000), (255, 255, 255)).save(image_bytes, format="PNG")
+        return image_bytes.getvalue()
+
+    def make_client(self, reader, **policy):
+        """Create a client with a mock reader and the given cascade thresholds."""
+        client = EasyOCRClient.__new__(EasyOCRClient)
+        client.languages = ["en"]
+        client.reader = reader
+        client.cascade = CascadePolicy(**policy)
+        return client
+
+    def test_confident_fast_pass_is_kept(self, scan_bytes):
+        """A confident fast pass answers the scan from the downscaled image."""
+        received = []
+
+        class RecordingReader(MockReader):
+            def readtext(self, image, detail=0):
+                received.append(image.shape)
+                return super().readtext(image, detail=detail)
+
+        client = self.make_client(RecordingReader(), fast_pass_pixels=500_000)
+        result = client.scan(scan_bytes)
+
+        assert result.path == "fast"
+        assert result.text == "Mock OCR text for testing purposes"
+        assert result.confidence == pytest.approx(0.9)
+        assert received == [(500, 1000)]
+
+    def test_low_confidence_escalates_to_full_pass(self, scan_bytes):
+        """A fast pass below the confidence threshold is retried on the full chain."""
+        reader = MockReader()
+        reader.confidence = 0.3
+        client = self.make_client(reader, min_confidence=0.6)
+
+        result = client.scan(scan_bytes)
+
+        assert result.path == "full"
+
+    def test_too_little_text_escalates_to_full_pass(self, scan_bytes):
+        """A fast pass that finds almost no text is retried on the full chain."""
+        client = self.make_client(MockReader(), min_chars=100)
+
+        assert client.scan(scan_bytes).path == "full"
+
+    def test_cascade_changes_ocr_version(self):
+        """Cached results from different cascade settings are kept apart."""
+        with patch.object(EasyOCRClient, "cascade", None):
+            disabled = get_ocr_version()
+        assert get_ocr_version() != disabled
+
+
+class TestOCRResultCache:
+    """Test the content-addressed OCR result cache."""
+
+    def test_key_depends_on_content_and_version(self):
+        """Keys change with the image bytes and with the OCR version."""
+        cache = OCRResultCache(version="v1")
+        assert cache.key_for(b"image") == cache.key_for(b"image")
+        assert cache.key_for(b"image") != cache.key_for(b"other")
+        assert cache.key_for(b"image") != OCRResultCache(version="v2").key_for(b"image")
+
+    def test_memory_tier_counts_hits_and_misses(self):
+        """Stored results are returned and counted as hits."""
+        cache = OCRResultCache(version="v1")
+        key = cache.key_for(b"image")
+        assert cache.get(key) is None
+        cache.put(key, "Ibuprofen 200mg")
+        assert cache.get(key) == "Ibuprofen 200mg"
+        assert cache.stats() == {"hits": 1, "misses": 1, "disk_hits": 0, "memory_entries": 1}
+
+    def test_memory_tier_evicts_least_recently_used(self):
+        """The memory tier keeps at most max_entries results."""
+        cache = OCRResultCache(version="v1", max_entries=2)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        cache.get("a")
+        cache.put("c", "C")
+        assert cache.get("b") is None
+        assert cache.get("a") == "A"
+        assert cache.get("c") == "C"
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        """Results written to disk are found by a fresh cache."""
+        cache = OCRResultCache(version="v1", directory=str(tmp_path))
+        key = cache.key_for(b"image")
+        cache.put(key, "Paracetamol 500mg")
+
+        restarted = OCRResultCache(version="v1", directory=str(tmp_path))
+        assert restarted.get(key) == "Paracetamol 500mg"
+        assert restarted.stats()["disk_hits"] == 1
+        # Promoted to the memory tier
+        assert restarted.get(key) == "Paracetamol 500mg"
+        assert restarted.stats()["disk_hits"] == 1
+
+    def test_disk_tier_prunes_oldest_entries(self, tmp_path):
+        """Past max_disk_entries the oldest results are deleted from disk."""
+        cache = OCRResultCache(version="v1", max_entries=0, directory=str(tmp_path))
+        cache.max_disk_entries = 10
+        keys = [cache.key_for(bytes([index])) for index in range(11)]
+        for age, key in enumerate(keys[:10]):
+            cache.put(key, f"text {age}")
+            os.utime(cache._path_for(key), (1_000_000 + age, 1_000_000 + age))
+
+        cache.put(keys[10], "text 10")
+
+        remaining = [key for key in keys if cache._path_for(key).exists()]
+        assert remaining == keys[2:]
+        assert cache.get(keys[0]) is None
+        assert cache.get(keys[10]) == "text 10"
+
+    def test_async_disk_tier_runs_off_the_event_loop(self, tmp_path):
+        """The async variants read and write the disk tier on another thread."""
+        cache = OCRResultCache(version="v1", directory=str(tmp_path))
+        key = cache.key_for(b"image")
+        threads = []
+        get_disk, write_disk = cache._get_disk, cache._write_disk
+
+        def record(method):
+            def wrapper(*args):
+                threads.append(threading.current_thread())
+                return method(*args)
+
+            return wrapper
+
+        cache._get_disk, cache._write_disk = record(get_disk), record(write_disk)
+
+        async def round_trip():
+            missing = await cache.get_async(key)
+            await cache.put_async(key, "Paracetamol 500mg")
+            cache._entries.clear()
+            return missing, await cache.get_async(key), await cache.get_async(key)
+
+        assert asyncio.run(round_trip()) == (None, "Paracetamol 500mg", "Paracetamol 500mg")
+        assert len(threads) == 3
+        assert threading.main_thread() not in threads
+        assert cache.stats() == {"hits": 2, "misses": 1, "disk_hits": 1, "memory_entries": 1}
+
+    def test_get_ocr_version_includes_pipeline(self):
+        """The OCR version reflects languages and pre-processing."""
+        version = get_ocr_version(["en"])
+        assert "-en-" in version
+        assert EasyOCRClient.preprocessor.version in version
+
+
+def encode_image(size, format="PNG"):
+    """Encode a blank RGB image of the given size."""
+    image_bytes = io.BytesIO()
+    Image.new("RGB", size, (255, 255, 255)).save(image_bytes, format=format)
+    return image_bytes.getvalue()
+
+
+def png_header(width, height):
+    """A PNG claiming the given size, with the header chunk but no pixel data."""
+
+    def chunk(kind, data):
+        return (
+            struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+        )
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", b"")
+
+
+class TestImageLoading:
+    """Test size limits and reduced-resolution decoding."""
+
+    def test_open_image_within_limits(self):
+        """Images within the limits open lazily."""
+        image = open_image(encode_image((100, 50)), max_bytes=10_000, max_pixels=5_000)
+        assert image.size == (100, 50)
+
+    def test_open_image_rejects_large_payloads(self):
+        """Payloads above the byte limit are rejected."""
+        with pytest.raises(ImageTooLargeError):
+            open_image(encode_image((100, 50)), max_bytes=10)
+
+    def test_open_image_rejects_large_dimensions(self):
+        """Images above the pixel limit are rejected before decoding."""
+        image_data = encode_image((100, 50))
+        with patch("PIL.ImageFile.ImageFile.load") as load:
+            with pytest.raises(ImageTooLargeError):
+                open_image(image_data, max_pixels=4_999)
+            load.assert_not_called()
+
+    def test_open_image_rejects_decompression_bombs(self):
+        """Headers beyond PIL's own bomb limit are rejected like any oversized image."""
+        header = png_header(20000, 10000)
+        with pytest.raises(ImageTooLargeError):
+            open_image(header, max_pixels=10**12)
+        with pytest.raises(ImageTooLargeError):
+            open_image(header)
+
+    def test_open_image_accepts_file_objects(self):
+        """File-like objects are measured from their current position."""
+        with pytest.raises(ImageTooLargeError):
+            open_image(io.BytesIO(encode_image((100, 50))), max_bytes=10)
+
+    def test_jpeg_decoded_at_reduced_scale(self):
+        """Large JPEGs decode straight to a smaller grayscale image."""
+        client = EasyOCRClient.__new__(EasyOCRClient)
+        client.preprocessor = ImagePreprocessor(
+            resize_policy=ResizePolicy(target_pixels=100_000, min_scale=0.1)
+        )
+        image = client.load_image(encode_image((1600, 1200), format="JPEG"))
+        image.load()
+        assert image.mode == "L"
+        assert image.size[0] < 1600
+        assert image.size[0] * image.size[1] >= 100_000 * 0.9
+
+    def test_fixed_scale_applied_once_to_drafted_jpeg(self):
+        """A fixed scale factor is not applied again after reduced-scale decoding."""
+        client = EasyOCRClient.__new__(EasyOCRClient)
+        client.preprocessor = ImagePreprocessor(scale_factor=0.5, border=0)
+        image = client.load_image(encode_image((4000, 3000), format="JPEG"))
+        assert image.size == (2000, 1500)
+
+        assert client.preprocessor.process(image).shape == (1500, 2000)
+
+    def test_pixel_target_reached_for_drafted_jpeg(self):
+        """The pixel target refers to the original image, not the drafted one."""
+        client = EasyOCRClient.__new__(EasyOCRClient)
+        client.preprocessor = ImagePreprocessor(
+            border=0, resize_policy=ResizePolicy(target_pixels=100_000, min_scale=0.1)
+        )
+        image = client.load_image(encode_image((1600, 1200), format="JPEG"))
+
+        height, width = client.preprocessor.process(image).shape
+        assert abs(width * height - 100_000) < 100_000 * 0.05
+
+    def test_png_decoded_at_full_scale(self):
+        """Formats without reduced-scale decoding are left untouched."""
+        client = EasyOCRClient.__new__(EasyOCRClient)
+        client.preprocessor = ImagePreprocessor(
+            resize_policy=ResizePolicy(target_pixels=100_000, min_scale=0.1)
+        )
+        image = client.load_image(encode_image((1600, 1200)))
+        assert image.size == (1600, 1200)
@@ -0,0 +1,91 @@
+"""Tests for coalescing identical concurrent calls."""
+
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+class SlowFunction:
+    """Counts its calls and answers after a short wait."""
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.error = error
+
+    async def __call__(self, value):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.error is not None:
+            raise self.error
+        return f"result of {value}"
+
+
+class TestSingleFlight:
+    """Test the single-flight layer."""
+
+    def test_identical_calls_share_one_execution(self):
+        """Concurrent calls with the same key run once and get the same result."""
+        single_flight = SingleFlight()
+        function = SlowFunction()
+
+        async def run():
+            return await asyncio.gather(
+                *(single_flight.run(key, lambda key=key: function(key)) for key in "aaab")
+            )
+
+        results = asyncio.run(run())
+        assert results == ["result of a"] * 3 + ["result of b"]
+        assert function.calls == 2
+        assert single_flight.stats() == {
+            "executions": 2,
+            "coalesced": 2,
+            "coalesced_rate": 0.5,
+            "in_flight": 0,
+        }
+
+    def test_sequential_calls_run_again(self):
+        """A finished call is not reused, results are not cached."""
+        single_flight = SingleFlight()
+        function = SlowFunction()
+
+        async def run():
+            for _ in range(2):
+                await single_flight.run("a", lambda: function("a"))
+
+        asyncio.run(run())
+        assert function.calls == 2
+        assert single_flight.coalesced == 0
+
+    def test_errors_reach_every_waiter(self):
+        """All waiters of a failed call get its exception."""
+        single_flight = SingleFlight()
+        function = SlowFunction(error=ValueError("unreadable"))
+
+        async def run():
+            return await asyncio.gather(
+                *(single_flight.run("a", lambda: function("a")) for _ in range(3)),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(run())
+        assert all(isinstance(result, ValueError) for result in results)
+        assert function.calls == 1
+
+    def test_cancelled_waiter_does_not_cancel_the_call(self):
+        """Other waiters still get the result when the first one gives up."""
+        single_flight = SingleFlight()
+        function = SlowFunction()
+
+        async def run():
+            first = asyncio.ensure_future(single_flight.run("a", lambda: function("a")))
+            second = asyncio.ensure_future(single_flight.run("a", lambda: function("a")))
+            await asyncio.sleep(0)
+            first.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return await second
+
+        assert asyncio.run(run()) == "result of a"
+        assert function.calls == 1
@@ -12,22 +12,15 @@ from pathlib import Path
 import tempfile
 
 
-def create_test_image(
-    text="Sample Prescription",
-    filename="test_prescription.png",
-    output_dir=None,
-    include_details=True,
-):
-    """Create a test image with text.
+def render_test_image(text="Sample Prescription", include_details=True):
+    """Render a test image with text in memory.
 
     Args:
         text: Main text to include on the image
-        filename: Name of the output file
-        output_dir: Directory to save image (defaults to tests/test_images)
         include_details: Whether to include additional medication details
 
     Returns:
-        Path to the created image
+        The rendered 800x400 RGB image
     """
     # Create a blank image with white background
     width, height = 800, 400
@@ -77,6 +70,28 @@ def create_test_image(
             draw.text((50, y_position), line, fill="black", font=font)
             y_position += 50
 
+    return img
+
+
+def create_test_image(
+    text="Sample Prescription",
+    filename="test_prescription.png",
+    output_dir=None,
+    include_details=True,
+):
+    """Create a test image with text.
+
+    Args:
+        text: Main text to include on the image
+        filename: Name of the output file
+        output_dir: Directory to save image (defaults to tests/test_images)
+        include_details: Whether to include additional medication details
+
+    Returns:
+        Path to the created image
+    """
+    img = render_test_image(text=text, include_details=include_details)
+
     # Determine output directory
     if output_dir is None:
         # Default to tests/test_images relative to this script
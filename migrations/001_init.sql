@@ -49,6 +49,8 @@ CREATE TABLE medications (
     dosage VARCHAR(255) COMMENT 'Dosage information',
     prescription_details JSON COMMENT 'Additional prescription details in JSON format',
     scan_url text COMMENT 'URL of the uploaded medication scan',
+    enrichment_status VARCHAR(20) COMMENT 'State of the ingredient extraction: pending, done, skipped or failed',
+    enriched_at TIMESTAMP COMMENT 'When the ingredient extraction finished',
     created_at TIMESTAMP,
     updated_at TIMESTAMP,
     FOREIGN KEY (profile_id) REFERENCES profiles(id)
@@ -0,0 +1,227 @@
+"""
+Load generator and latency benchmark for the model service.
+
+Replays a corpus of medication label texts against the ASGI app in-process, at one or
+more concurrency levels, and reports p50/p95/p99 latency and throughput. A second pass
+runs every text through the pipeline one component at a time to split the time between
+NER, abbreviation detection, linking and serialization. The extraction cache is disabled
+unless --cache is given, so every request reaches the pipeline.
+
+Usage: python benchmark.py [--concurrency 1 4 16] [--requests 200] [--corpus texts.txt]
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from importlib import metadata
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpx
+
+import main
+from label_corpus import build_corpus, load_corpus, summarize
+
+# Pipeline components timed as their own stage; everything else counts as NER
+STAGE_GROUPS = {"abbreviation_detector": "abbreviation", "scispacy_linker": "linking"}
+STAGES = ("dictionary", "ner", "abbreviation", "linking", "serialization")
+
+
+async def replay(
+    texts: List[str],
+    concurrency: int,
+    requests: int,
+    payload: Optional[Dict[str, Any]] = None,
+    endpoint: str = "/extract_entities",
+) -> Dict[str, Any]:
+    """
+    Send `requests` extraction requests, cycling through the corpus, with at most
+    `concurrency` in flight, and time each of them.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = defaultdict(int)
+    transport = httpx.ASGITransport(app=main.app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+
+        async def send(text):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(endpoint, json={**(payload or {}), "text": text})
+                elapsed_ms = (time.perf_counter() - started) * 1000
+            if response.status_code == 200:
+                latencies.append(elapsed_ms)
+            else:
+                errors[response.status_code] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(texts[index % len(texts)]) for index in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": dict(errors),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 3),
+        "latency_ms": summarize(latencies) if latencies else None,
+    }
+
+
+def profile_text(
+    runner: main.ProfileRunner,
+    text: str,
+    shape: main.ResponseShape,
+    drug_dictionary: Optional[main.DrugDictionary] = None,
+) -> Dict[str, float]:
+    """
+    Run one text through the steps of the extraction endpoint, timing each stage in ms.
+    """
+    timings = defaultdict(float)
+
+    def timed(stage, function, *args):
+        started = time.perf_counter()
+        result = function(*args)
+        timings[stage] += (time.perf_counter() - started) * 1000
+        return result
+
+    matches, mentions = timed("dictionary", runner.dictionary_mentions, text, drug_dictionary)
+    if mentions is None:
+        doc = timed("ner", runner.nlp.make_doc, text)
+        for name, component in runner.nlp.pipeline:
+            if name not in runner.disable:
+                doc = timed(STAGE_GROUPS.get(name, "ner"), component, doc)
+        mentions = timed("linking", runner.link, doc, matches)
+    timed("serialization", main.serialize_entities, mentions, runner.linker, shape)
+    return {stage: timings[stage] for stage in STAGES}
+
+
+def profile_stages(
+    runner: main.ProfileRunner,
+    texts: Iterable[str],
+    shape: main.ResponseShape,
+    drug_dictionary: Optional[main.DrugDictionary] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-stage latency summaries over the corpus, with each stage's share of the total.
+    """
+    samples = defaultdict(list)
+    for text in texts:
+        for stage, ms in profile_text(runner, text, shape, drug_dictionary).items():
+            samples[stage].append(ms)
+
+    total = sum(sum(values) for values in samples.values()) or 1.0
+    return {
+        stage: {"ms": summarize(samples[stage]), "share": round(sum(samples[stage]) / total, 4)}
+        for stage in STAGES
+    }
+
+
+def environment(runner: main.ProfileRunner) -> Dict[str, Any]:
+    """
+    Versions and hardware that the results depend on.
+    """
+    versions = {}
+    for package in ("spacy", "scispacy", "fastapi"):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "pipeline_version": runner.version,
+        "pipeline_source": main.model_state.source,
+        **versions,
+    }
+
+
+def run_benchmark(
+    texts: List[str],
+    concurrency_levels: Iterable[int] = (1,),
+    requests: Optional[int] = None,
+    profile: Optional[str] = None,
+    dictionary: Optional[bool] = None,
+    cache: bool = False,
+) -> Dict[str, Any]:
+    """
+    Load the model if needed, then run the stage profile and one replay per concurrency
+    level and collect the results.
+    """
+    main.load_model()
+    if not main.model_state.is_ready:
+        raise RuntimeError(f"Model failed to load: {main.model_state.error}")
+    if not cache:
+        main.extraction_cache = main.ExtractionCache(max_entries=0)
+
+    runner = main.get_profile(profile)
+    drug_dictionary = main.get_dictionary(dictionary)
+    shape = main.ResponseShape()
+    payload = {"profile": runner.name, "dictionary": drug_dictionary is not None}
+
+    stages = profile_stages(runner, texts, shape, drug_dictionary)
+    runs = [
+        asyncio.run(replay(texts, concurrency, requests or len(texts), payload))
+        for concurrency in concurrency_levels
+    ]
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "environment": environment(runner),
+        "profile": runner.name,
+        "dictionary": drug_dictionary is not None,
+        "cache": cache,
+        "texts": len(texts),
+        "stages": stages,
+        "runs": runs,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, help="requests per level (default: corpus size)")
+    parser.add_argument("--corpus", help="text file or JSON lines (default: built-in labels)")
+    parser.add_argument("--profile", help="pipeline profile (default: NLP_PROFILE)")
+    parser.add_argument("--dictionary", action="store_true", help="use the dictionary fast path")
+    parser.add_argument("--cache", action="store_true", help="keep the extraction cache on")
+    parser.add_argument("--output", default="model_benchmark.json", help="result file")
+    return parser.parse_args(argv)
+
+
+def run(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    texts = load_corpus(args.corpus) if args.corpus else build_corpus()
+    print(f"Benchmarking {len(texts)} texts")
+
+    results = run_benchmark(
+        texts,
+        concurrency_levels=args.concurrency,
+        requests=args.requests,
+        profile=args.profile,
+        dictionary=args.dictionary or None,
+        cache=args.cache,
+    )
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    for stage, summary in results["stages"].items():
+        print(f"  {stage:<14} p50 {summary['ms']['p50']:>9.3f} ms  {summary['share']:>6.1%}")
+    for result in results["runs"]:
+        latency = result["latency_ms"] or {}
+        print(
+            f"  concurrency {result['concurrency']:>3}: {result['requests_per_second']} req/s"
+            f"  p50 {latency.get('p50')} ms  p95 {latency.get('p95')} ms"
+            f"  p99 {latency.get('p99')} ms  errors {result['errors']}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
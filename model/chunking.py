@@ -0,0 +1,73 @@
+"""
+Splitting long texts into chunks for incremental extraction.
+
+Pipeline latency grows with the length of the document, so a photographed package
+insert is processed as a series of bounded chunks instead of one large document.
+Chunks end at sentence or line boundaries where possible; a sentence longer than the
+chunk size is cut at the last whitespace that fits, or mid-word if there is none.
+"""
+
+import re
+from typing import Iterator, List, NamedTuple, Tuple
+
+# A sentence ends after ., ! or ? followed by whitespace, or at a line break
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n\s*")
+
+
+class TextChunk(NamedTuple):
+    start: int
+    text: str
+
+    @property
+    def end(self) -> int:
+        return self.start + len(self.text)
+
+
+def sentence_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """
+    (start, end) offsets of the sentences of a text, trailing whitespace included.
+    """
+    start = 0
+    for boundary in SENTENCE_END.finditer(text):
+        yield start, boundary.end()
+        start = boundary.end()
+    if start < len(text):
+        yield start, len(text)
+
+
+def cut_span(text: str, start: int, end: int, max_chars: int) -> Iterator[Tuple[int, int]]:
+    """
+    Cut a span longer than max_chars into pieces, preferring whitespace positions.
+    """
+    while end - start > max_chars:
+        cut = text.rfind(" ", start + 1, start + max_chars)
+        if cut == -1:
+            cut = start + max_chars
+        yield start, cut
+        start = cut
+    yield start, end
+
+
+def split_text(text: str, max_chars: int) -> List[TextChunk]:
+    """
+    Split a text into chunks of at most max_chars characters, packing whole sentences
+    together. Whitespace-only chunks are dropped; chunk offsets refer to the input text.
+    """
+    if max_chars < 1:
+        raise ValueError("max_chars must be at least 1")
+
+    spans = []
+    for start, end in sentence_spans(text):
+        spans.extend(cut_span(text, start, end, max_chars))
+
+    chunks = []
+    chunk_start = chunk_end = 0
+    for start, end in spans:
+        if end - chunk_start > max_chars and chunk_end > chunk_start:
+            chunks.append((chunk_start, chunk_end))
+            chunk_start = start
+        chunk_end = end
+    if chunk_end > chunk_start:
+        chunks.append((chunk_start, chunk_end))
+
+    return [TextChunk(start, text[start:end]) for start, end in chunks if text[start:end].strip()]
@@ -0,0 +1,78 @@
+"""
+Exact matching of knowledge base names and aliases.
+
+Most medication labels print the drug's RxNorm name or one of its aliases verbatim. An
+Aho-Corasick automaton over all names finds those mentions in a single pass over the
+text, without NER or the TF-IDF/ANN linker.
+"""
+
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+import ahocorasick
+
+
+class DictionaryMatch(NamedTuple):
+    start: int
+    end: int
+    text: str
+    cuis: Tuple[str, ...]
+
+
+class DrugDictionary:
+    """
+    Case-insensitive whole-word matcher built from a scispaCy KnowledgeBase.
+
+    Names shorter than `min_length` characters are left out: they are mostly codes and
+    abbreviations that are too ambiguous to link without context.
+    """
+
+    def __init__(self, kb, min_length: int = 3):
+        names: Dict[str, Set[str]] = {}
+        for alias, cuis in kb.alias_to_cuis.items():
+            key = alias.lower()
+            if len(key) >= min_length and len(key) == len(alias):
+                names.setdefault(key, set()).update(cuis)
+
+        self.automaton = ahocorasick.Automaton()
+        for key, cuis in names.items():
+            self.automaton.add_word(key, (len(key), tuple(sorted(cuis))))
+        self.size = len(names)
+        if self.size:
+            self.automaton.make_automaton()
+
+    def find(self, text: str) -> List[DictionaryMatch]:
+        """
+        Longest non-overlapping whole-word matches, in text order.
+        """
+        lowered = text.lower()
+        if not self.size or len(lowered) != len(text):
+            # Lowercasing changed the offsets (rare non-ASCII cases), skip the fast path
+            return []
+
+        candidates = []
+        for end, (length, cuis) in self.automaton.iter(lowered):
+            start = end - length + 1
+            if start > 0 and lowered[start - 1].isalnum():
+                continue
+            if end + 1 < len(lowered) and lowered[end + 1].isalnum():
+                continue
+            candidates.append((start, end + 1, cuis))
+
+        matches = []
+        covered_until = 0
+        for start, end, cuis in sorted(candidates, key=lambda c: (c[0], c[0] - c[1])):
+            if start >= covered_until:
+                matches.append(DictionaryMatch(start, end, text[start:end], cuis))
+                covered_until = end
+        return matches
+
+
+def coverage(text: str, matches: List[DictionaryMatch]) -> float:
+    """
+    Share of the text's letters and digits that lie inside matches.
+    """
+    total = sum(char.isalnum() for char in text)
+    if not total:
+        return 0.0
+    matched = sum(char.isalnum() for match in matches for char in match.text)
+    return matched / total
@@ -0,0 +1,36 @@
+"""
+Pre-fork serving for the model service.
+
+With several workers the master loads the spaCy pipeline and the linker knowledge base
+before forking them. The workers share those pages copy-on-write instead of each loading
+its own copy. `python memory_report.py <master pid>` shows how much each worker shares.
+A single worker loads the model in the background instead, so it answers health checks
+while loading.
+"""
+
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8081')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# Seconds a worker may go silent before the master restarts it
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+
+
+def when_ready(server):
+    if server.cfg.workers > 1:
+        import main
+
+        main.load_model()
+
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the garbage collector's reach. Otherwise the
+    # collector updates object headers in the workers and unshares the model's pages.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    server.log.info(f"Worker {worker.pid} forked from master {server.pid}")
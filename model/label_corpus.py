@@ -0,0 +1,81 @@
+"""
+Medication label texts and latency summaries shared by the benchmarks.
+
+Only uses the standard library, so the core service's NER benchmark can load it
+without the model service requirements.
+"""
+
+import json
+import random
+import statistics
+from typing import Dict, List
+
+DRUGS = [
+    ("Advil", "ibuprofen", "200 mg"),
+    ("Tylenol", "acetaminophen", "500 mg"),
+    ("Aleve", "naproxen sodium", "220 mg"),
+    ("Zyrtec", "cetirizine hydrochloride", "10 mg"),
+    ("Claritin", "loratadine", "10 mg"),
+    ("Prilosec OTC", "omeprazole", "20 mg"),
+    ("Benadryl", "diphenhydramine HCl", "25 mg"),
+    ("Lipitor", "atorvastatin calcium", "40 mg"),
+]
+
+LABEL_TEMPLATES = [
+    "{brand} ({generic}) {dose} tablets",
+    "Active ingredient (in each tablet): {generic} {dose}. Purpose: pain reliever.",
+    "{brand} {dose}. Drug Facts. Active ingredient: {generic} {dose}. Uses: temporarily "
+    "relieves minor aches and pains. Warnings: do not use with other products containing "
+    "{generic}. Ask a doctor before use if you take a blood thinner (BT).",
+    "Rx only. {generic} tablets USP, {dose}. Take one tablet by mouth daily. "
+    "Keep out of reach of children.",
+    "{brand}: each capsule contains {generic} {dose}. Inactive ingredients: gelatin, "
+    "magnesium stearate, microcrystalline cellulose, titanium dioxide.",
+    "Directions: adults and children 12 years and over take 1 {brand} tablet every 4 to 6 "
+    "hours while symptoms persist. Do not take more than 6 tablets of {generic} in 24 hours.",
+]
+
+
+def build_corpus(size: int = 48, seed: int = 0) -> List[str]:
+    """
+    Label texts from every template filled with the sample drugs, shuffled.
+    """
+    texts = [
+        template.format(brand=brand, generic=generic, dose=dose)
+        for template in LABEL_TEMPLATES
+        for brand, generic, dose in DRUGS
+    ]
+    random.Random(seed).shuffle(texts)
+    return [texts[index % len(texts)] for index in range(size)]
+
+
+def load_corpus(path: str) -> List[str]:
+    """
+    Texts from a file with one text per line, or JSON lines with a `text` field.
+    """
+    texts = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            texts.append(json.loads(line)["text"] if line.startswith("{") else line)
+    return texts
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """
+    Mean, median, 95th and 99th percentile and maximum of a list of samples.
+    """
+    ordered = sorted(samples)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    return {
+        "mean": round(statistics.fmean(ordered), 3),
+        "p50": round(statistics.median(ordered), 3),
+        "p95": round(percentile(0.95), 3),
+        "p99": round(percentile(0.99), 3),
+        "max": round(ordered[-1], 3),
+    }
@@ -1,13 +1,34 @@
-from typing import Any, Dict, List
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Literal, Optional, Tuple
 
 import spacy
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from scispacy.abbreviation import AbbreviationDetector  # noqa: F401
-from scispacy.linking import EntityLinker  # noqa: F401
+from scispacy.candidate_generation import CandidateGenerator
+from scispacy.linking import EntityLinker
 
+from chunking import TextChunk, split_text
+from dictionary import DictionaryMatch, DrugDictionary, coverage
+from memory_report import read_memory
+from snapshot import is_compatible, load_snapshot, read_manifest
 
-def setup_model():
+MODEL_NAME = "en_ner_bc5cdr_md"
+LINKER_CONFIG = {"resolve_abbreviations": True, "linker_name": "rxnorm"}
+
+
+# Directory of a pipeline snapshot written by snapshot.py, used when present
+SNAPSHOT_DIR = os.getenv("NLP_SNAPSHOT_DIR")
+
+
+def setup_model(on_stage: Callable[[str], None] = print):
     """
     - **UMLS**: Links to the Unified Medical Language System, levels 0, 1, 2, and 9.
       This has approximately 3 million concepts.
@@ -24,68 +45,757 @@ def setup_model():
       focused on phenotypic abnormalities encountered in human diseases.
     """
 
-    print("Loading model...")
-    model = spacy.load("en_ner_bc5cdr_md")
+    on_stage("loading spaCy model")
+    model = spacy.load(MODEL_NAME)
     model.add_pipe("abbreviation_detector")
-    model.add_pipe(
-        "scispacy_linker", config={"resolve_abbreviations": True, "linker_name": "rxnorm"}
-    )
+    on_stage("loading linker knowledge base")
+    model.add_pipe("scispacy_linker", config=LINKER_CONFIG)
 
     print("Model loaded!")
     return model
 
 
-app = FastAPI()
-root_nlp = setup_model()
+def load_pipeline(
+    on_stage: Callable[[str], None] = print,
+) -> Tuple[Any, CandidateGenerator, str]:
+    """
+    Load the pipeline and the linker's candidate generator, from the snapshot in
+    NLP_SNAPSHOT_DIR when there is a compatible one, otherwise with setup_model.
+    Also returns where the pipeline came from.
+    """
+    if SNAPSHOT_DIR:
+        manifest = read_manifest(SNAPSHOT_DIR)
+        if manifest is None:
+            print(f"No snapshot in {SNAPSHOT_DIR}, building the pipeline")
+        elif not is_compatible(manifest):
+            print(f"Snapshot in {SNAPSHOT_DIR} was built with other versions, ignoring it")
+        else:
+            on_stage("loading snapshot")
+            nlp, candidate_generator = load_snapshot(SNAPSHOT_DIR)
+            print("Snapshot loaded!")
+            return nlp, candidate_generator, "snapshot"
+
+    model = setup_model(on_stage)
+    return model, model.get_pipe("scispacy_linker").candidate_generator, "spacy.load"
+
+
+class PipelineProfile(BaseModel):
+    """
+    Pipeline settings that can be chosen per request. `disable` lists spaCy components to
+    skip; the linker settings are those of scispaCy's EntityLinker.
+    """
+
+    disable: List[str] = Field(default_factory=list)
+    resolve_abbreviations: bool = True
+    k: int = Field(30, ge=1)
+    threshold: float = Field(0.7, ge=0, le=1)
+    max_entities_per_mention: int = Field(5, ge=1)
+
+
+# "accurate" matches the full pipeline; "fast" only runs NER and a narrow linker search
+PROFILES = {
+    "accurate": PipelineProfile(),
+    "fast": PipelineProfile(
+        disable=["tagger", "attribute_ruler", "lemmatizer", "parser"],
+        resolve_abbreviations=False,
+        k=10,
+        threshold=0.8,
+        max_entities_per_mention=1,
+    ),
+}
+# Additional or overridden profiles as JSON, e.g. {"batch": {"k": 50}}
+PROFILES.update(
+    {
+        name: PipelineProfile(**config)
+        for name, config in json.loads(os.getenv("NLP_PROFILES", "{}")).items()
+    }
+)
+DEFAULT_PROFILE = os.getenv("NLP_PROFILE", "accurate")
+if DEFAULT_PROFILE not in PROFILES:
+    raise ValueError(f"NLP_PROFILE must be one of {sorted(PROFILES)}, got {DEFAULT_PROFILE!r}")
+
+# Defaults and limits for batch extraction
+BATCH_SIZE = int(os.getenv("NLP_BATCH_SIZE", "32"))
+MAX_BATCH_TEXTS = int(os.getenv("NLP_MAX_BATCH_TEXTS", "1000"))
+MAX_N_PROCESS = int(os.getenv("NLP_MAX_N_PROCESS", "1"))
+
+# Budgets for streaming extraction: longest accepted text, largest chunk, and the time
+# after which the remaining chunks are skipped
+MAX_STREAM_CHARS = int(os.getenv("NLP_MAX_STREAM_CHARS", "200000"))
+STREAM_CHUNK_CHARS = int(os.getenv("NLP_STREAM_CHUNK_CHARS", "1000"))
+STREAM_MAX_SECONDS = float(os.getenv("NLP_STREAM_MAX_SECONDS", "30"))
+
+# Serialized KB entities kept in memory, one entry per CUI and response shape
+ENTITY_CACHE_SIZE = int(os.getenv("NLP_ENTITY_CACHE_SIZE", "10000"))
+
+# Exact name matching before NER and linking, see dictionary.py
+DICTIONARY_ENABLED = os.getenv("NLP_DICTIONARY", "0").lower() in ("1", "true", "yes")
+# Texts at least this much covered by dictionary matches skip the pipeline entirely
+DICTIONARY_MIN_COVERAGE = float(os.getenv("NLP_DICTIONARY_MIN_COVERAGE", "0.5"))
+
+# Extraction results kept in memory, keyed by normalized text; 0 disables the cache
+TEXT_CACHE_SIZE = int(os.getenv("NLP_TEXT_CACHE_SIZE", "4096"))
+
+EntityField = Literal["cui", "score", "canonical_name", "definition", "aliases"]
+DEFAULT_FIELDS = ["canonical_name", "definition", "aliases"]
+
+# An entity mention: its text and the (CUI, score) candidates found by the linker
+Mention = Tuple[str, List[Tuple[str, float]]]
+
+
+def extract_mentions(doc) -> List[Mention]:
+    """
+    Collect the entity mentions of a processed document with their linker candidates.
+    """
+    return [(ent.text, list(ent._.kb_ents)) for ent in doc.ents]
+
+
+class ExtractionCache:
+    """
+    Thread-safe LRU cache of extracted mentions.
+
+    Keys are the input text with whitespace collapsed and case folded, plus the pipeline
+    version, so texts that differ only in spacing or case share an entry. Entity texts in a
+    cached result keep the spelling of the text that filled the entry.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], List[Mention]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.split()).casefold()
+
+    def key_for(self, text: str, version: str) -> Tuple[str, str]:
+        return version, self.normalize(text)
+
+    def get(self, key: Tuple[str, str]) -> Optional[List[Mention]]:
+        with self._lock:
+            mentions = self._entries.get(key)
+            if mentions is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return mentions
+
+    def put(self, key: Tuple[str, str], mentions: List[Mention]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = mentions
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+def pipeline_version(nlp, name: str, profile: PipelineProfile) -> str:
+    """
+    Identify the model, knowledge base and profile settings that produced a result.
+    """
+    settings = profile.model_dump_json()
+    return f"{MODEL_NAME}-{nlp.meta.get('version')}-{LINKER_CONFIG['linker_name']}-{name}{settings}"
+
+
+class ProfileRunner:
+    """
+    Runs the shared pipeline with the components and linker settings of one profile.
+
+    All profiles share the loaded model and the linker's candidate generator, so a profile
+    only adds an EntityLinker with its own settings, applied after the spaCy components.
+    """
+
+    def __init__(
+        self, nlp, candidate_generator: CandidateGenerator, name: str, profile: PipelineProfile
+    ):
+        self.nlp = nlp
+        self.name = name
+        self.profile = profile
+        self.version = pipeline_version(nlp, name, profile)
+
+        # The pipeline's own linker, if any, is replaced by the profile's
+        disable = profile.disable + ["scispacy_linker"]
+        if not profile.resolve_abbreviations:
+            disable.append("abbreviation_detector")
+        self.disable = [component for component in disable if component in nlp.pipe_names]
+
+        self.linker = EntityLinker(
+            candidate_generator=candidate_generator,
+            resolve_abbreviations=profile.resolve_abbreviations,
+            k=profile.k,
+            threshold=profile.threshold,
+            max_entities_per_mention=profile.max_entities_per_mention,
+        )
+
+    def dictionary_candidates(self, match: DictionaryMatch) -> List[Tuple[str, float]]:
+        return [(cui, 1.0) for cui in match.cuis[: self.profile.max_entities_per_mention]]
+
+    def link(self, doc, matches: List[DictionaryMatch]) -> List[Mention]:
+        """
+        Link the entities of a processed document. Entities overlapping a dictionary match
+        take its CUIs without going through the linker, and matches that NER missed are
+        added as mentions of their own.
+        """
+        if not matches:
+            return extract_mentions(self.linker(doc))
+
+        entities = list(doc.ents)
+        matched = {}
+        for index, ent in enumerate(entities):
+            for match in matches:
+                if ent.start_char < match.end and match.start < ent.end_char:
+                    matched[index] = match
+                    break
+
+        # Link only the entities without a dictionary match
+        doc.ents = [ent for index, ent in enumerate(entities) if index not in matched]
+        self.linker(doc)
+        doc.ents = entities
+
+        mentions = []
+        for index, ent in enumerate(entities):
+            candidates = (
+                self.dictionary_candidates(matched[index])
+                if index in matched
+                else list(ent._.kb_ents)
+            )
+            mentions.append((ent.start_char, (ent.text, candidates)))
+        used = set(matched.values())
+        for match in matches:
+            if match not in used:
+                mentions.append((match.start, (match.text, self.dictionary_candidates(match))))
+        return [mention for _, mention in sorted(mentions, key=lambda item: item[0])]
+
+    def dictionary_mentions(
+        self, text: str, dictionary: Optional[DrugDictionary]
+    ) -> Tuple[List[DictionaryMatch], Optional[List[Mention]]]:
+        """
+        Dictionary matches of a text, and its mentions when the matches cover enough of it
+        to skip the pipeline.
+        """
+        if dictionary is None:
+            return [], None
+        matches = dictionary.find(text)
+        if matches and coverage(text, matches) >= DICTIONARY_MIN_COVERAGE:
+            return matches, [(match.text, self.dictionary_candidates(match)) for match in matches]
+        return matches, None
+
+    def extract(self, text: str, dictionary: Optional[DrugDictionary] = None) -> List[Mention]:
+        """
+        Entity mentions of a text, trying the dictionary fast path first when given one.
+        """
+        matches, mentions = self.dictionary_mentions(text, dictionary)
+        if mentions is not None:
+            return mentions
+        return self.link(self.nlp(text, disable=self.disable), matches)
+
+    def extract_batch(
+        self,
+        texts: List[str],
+        batch_size: int,
+        n_process: int = 1,
+        dictionary: Optional[DrugDictionary] = None,
+    ) -> List[List[Mention]]:
+        """
+        Entity mentions of many texts, in order. Texts the dictionary does not fully answer
+        go through nlp.pipe together.
+        """
+        results: List[Optional[List[Mention]]] = [None] * len(texts)
+        pending = []
+        for index, text in enumerate(texts):
+            matches, results[index] = self.dictionary_mentions(text, dictionary)
+            if results[index] is None:
+                pending.append((index, matches))
+
+        docs = self.nlp.pipe(
+            (texts[index] for index, _ in pending),
+            disable=self.disable,
+            batch_size=batch_size,
+            n_process=n_process,
+        )
+        for (index, matches), doc in zip(pending, docs):
+            results[index] = self.link(doc, matches)
+        return results
+
+
+def build_profiles(nlp, candidate_generator: CandidateGenerator) -> Dict[str, ProfileRunner]:
+    return {
+        name: ProfileRunner(nlp, candidate_generator, name, profile)
+        for name, profile in PROFILES.items()
+    }
+
+
+# Text run through every profile before the service reports ready
+WARM_UP_TEXT = "The patient took ibuprofen 200 mg and acetylsalicylic acid (ASA) for pain."
+
+
+class ModelState:
+    """
+    Loading progress of the pipeline: the current stage, how long each part took, and
+    the error if loading failed.
+    """
+
+    STAGES = 5  # pipeline loading reports up to two stages, then profiles, dictionary, warm-up
+
+    def __init__(self, status: str = "not_started"):
+        self.status = status
+        self.stage: Optional[str] = None
+        self.stages_done = 0
+        self.started_at: Optional[float] = None
+        self.source: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.warm_up_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self.status == "ready"
+
+    def enter_stage(self, stage: str) -> None:
+        if self.stage is not None:
+            self.stages_done += 1
+        self.stage = stage
+        print(f"Model load: {stage}...")
+
+    def report(self) -> Dict[str, Any]:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round(time.perf_counter() - self.started_at, 3)
+        progress = 1.0 if self.is_ready else round(min(self.stages_done / self.STAGES, 0.99), 2)
+        return {
+            "status": self.status,
+            "stage": self.stage,
+            "progress": progress if self.status != "not_started" else 0.0,
+            "elapsed_seconds": elapsed,
+            "pipeline_source": self.source,
+            "load_seconds": self.load_seconds,
+            "warm_up_seconds": self.warm_up_seconds,
+            "error": self.error,
+        }
+
+
+root_nlp = None
+profiles: Dict[str, ProfileRunner] = {}
+dictionary: Optional[DrugDictionary] = None
+model_state = ModelState()
+extraction_cache = ExtractionCache(TEXT_CACHE_SIZE)
+_load_lock = threading.Lock()
+
+
+def load_model() -> None:
+    """
+    Load the pipeline, build the profiles and run a warm-up inference with each of them.
+    Safe to call more than once: only the first call loads. Failures are recorded in
+    model_state rather than raised.
+    """
+    global root_nlp, profiles, dictionary
+    with _load_lock:
+        if model_state.status in ("loading", "ready"):
+            return
+        model_state.status = "loading"
+        model_state.started_at = time.perf_counter()
+        try:
+            nlp, candidate_generator, model_state.source = load_pipeline(model_state.enter_stage)
+            model_state.enter_stage("building profiles")
+            runners = build_profiles(nlp, candidate_generator)
+            model_state.enter_stage("building dictionary")
+            drug_dictionary = None
+            if DICTIONARY_ENABLED:
+                drug_dictionary = DrugDictionary(candidate_generator.kb)
+                print(f"Dictionary built with {drug_dictionary.size} names")
+            model_state.load_seconds = round(time.perf_counter() - model_state.started_at, 3)
+
+            model_state.enter_stage("warming up")
+            warm_up_started = time.perf_counter()
+            for runner in runners.values():
+                runner.extract(WARM_UP_TEXT)
+            model_state.warm_up_seconds = round(time.perf_counter() - warm_up_started, 3)
+        except Exception as e:
+            model_state.status = "failed"
+            model_state.error = str(e)
+            print(f"Model load failed: {e}")
+            return
+
+        root_nlp, profiles, dictionary = nlp, runners, drug_dictionary
+        model_state.status = "ready"
+        print(f"Model ready after {time.perf_counter() - model_state.started_at:.1f} s")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Serve health checks right away and load the model in the background. Under the
+    # pre-fork server the master may already have loaded it, see gunicorn.conf.py.
+    if not model_state.is_ready:
+        threading.Thread(target=load_model, name="model-loader", daemon=True).start()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def get_profile(name: Optional[str]) -> ProfileRunner:
+    """
+    Look up a profile by name, falling back to the startup default.
+    """
+    name = name or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise HTTPException(
+            status_code=422, detail=f"Unknown profile {name!r}, expected one of {sorted(PROFILES)}"
+        )
+    if not model_state.is_ready:
+        raise HTTPException(status_code=503, detail="Model not loaded yet")
+    return profiles[name]
+
+
+def get_dictionary(requested: Optional[bool]) -> Optional[DrugDictionary]:
+    """
+    The dictionary to use for a request: the startup default unless the request says
+    otherwise.
+    """
+    if requested is False or (requested is None and not DICTIONARY_ENABLED):
+        return None
+    if dictionary is None:
+        raise HTTPException(
+            status_code=422, detail="The dictionary fast path is disabled, set NLP_DICTIONARY"
+        )
+    return dictionary
+
+
+def cache_version(runner: ProfileRunner, drug_dictionary: Optional[DrugDictionary]) -> str:
+    return runner.version if drug_dictionary is None else f"{runner.version}+dictionary"
+
+
+class ResponseShape(BaseModel):
+    """
+    Which linked-entity details to return. The defaults give the full response; a lean
+    client that only reads entity texts can send `{"fields": [], "max_candidates": 0}`.
+    """
+
+    fields: List[EntityField] = Field(default_factory=lambda: list(DEFAULT_FIELDS))
+    max_candidates: Optional[int] = Field(None, ge=0)
+    max_aliases: Optional[int] = Field(None, ge=0)
 
 
 class TextRequest(BaseModel):
     text: str
+    profile: Optional[str] = None
+    dictionary: Optional[bool] = None
+    compare: bool = False
+    shape: ResponseShape = Field(default_factory=ResponseShape)
 
 
-@app.post("/extract_entities", response_model=Dict[str, List[Dict[str, Any]]])
-def extract_entities(req: TextRequest) -> Dict[str, List[Dict[str, Any]]]:
+class BatchTextRequest(BaseModel):
+    texts: List[str] = Field(..., max_length=MAX_BATCH_TEXTS)
+    batch_size: int = Field(BATCH_SIZE, ge=1)
+    n_process: int = Field(1, ge=1)
+    profile: Optional[str] = None
+    dictionary: Optional[bool] = None
+    shape: ResponseShape = Field(default_factory=ResponseShape)
+
+
+class StreamTextRequest(BaseModel):
+    text: str = Field(..., max_length=MAX_STREAM_CHARS)
+    chunk_chars: int = Field(STREAM_CHUNK_CHARS, ge=1, le=STREAM_CHUNK_CHARS)
+    profile: Optional[str] = None
+    dictionary: Optional[bool] = None
+    shape: ResponseShape = Field(default_factory=ResponseShape)
+
+
+@lru_cache(maxsize=ENTITY_CACHE_SIZE)
+def entity_payload(
+    kb, cui: str, fields: Tuple[str, ...], max_aliases: Optional[int]
+) -> Optional[Dict[str, Any]]:
     """
-    Process the input text and return recognized entities along with their UMLS details.
+    Serialize a knowledge base entity once per CUI and response shape.
+    The returned dictionary is shared between responses and must not be modified.
     """
-    doc = root_nlp(req.text)
-    entities = []
+    entity_detail = kb.cui_to_entity.get(cui)
+    if not entity_detail:
+        return None
 
-    # Retrieve the linker component to access UMLS mapping.
-    linker = root_nlp.get_pipe("scispacy_linker")
+    payload = {}
+    for field in fields:
+        if field == "cui":
+            payload["cui"] = entity_detail.concept_id
+        elif field == "aliases":
+            payload["aliases"] = list(entity_detail.aliases[:max_aliases])
+        else:
+            payload[field] = getattr(entity_detail, field)
+    return payload
 
-    for ent in doc.ents:
+
+def serialize_entities(
+    mentions: List[Mention], linker, shape: ResponseShape
+) -> List[Dict[str, Any]]:
+    """
+    Convert entity mentions into response dictionaries.
+    """
+    fields = tuple(field for field in shape.fields if field != "score")
+    with_score = "score" in shape.fields
+
+    entities = []
+    for text, candidates in mentions:
         umls_entities = []
-        for umls_ent in ent._.kb_ents:
-            entity_detail = linker.kb.cui_to_entity[umls_ent[0]]
-            print(entity_detail)
-            if entity_detail:
-                umls_entities.append(
-                    {
-                        # "cui": entity_detail.concept_id,
-                        "canonical_name": entity_detail.canonical_name,
-                        "definition": entity_detail.definition,
-                        "aliases": entity_detail.aliases,
-                    }
-                )
+        for cui, score in candidates[: shape.max_candidates]:
+            payload = entity_payload(linker.kb, cui, fields, shape.max_aliases)
+            if payload is not None:
+                umls_entities.append({**payload, "score": score} if with_score else payload)
 
         entities.append(
             {
-                "text": ent.text,
+                "text": text,
                 # "label": ent.label_,
                 "umls_entities": umls_entities,
             }
         )
 
-    return {"entities": entities}
+    return entities
+
+
+def compare_paths(runner: ProfileRunner, text: str) -> Dict[str, Any]:
+    """
+    Run a text through the dictionary fast path and through the full pipeline, and report
+    the mentions each found and how long each took.
+    """
+    results = {}
+    for path, drug_dictionary in (("dictionary", get_dictionary(True)), ("pipeline", None)):
+        started = time.perf_counter()
+        mentions = runner.extract(text, drug_dictionary)
+        results[path] = {
+            "seconds": round(time.perf_counter() - started, 6),
+            "mentions": {
+                mention.lower(): [cui for cui, _ in candidates] for mention, candidates in mentions
+            },
+        }
+
+    dictionary_mentions = results["dictionary"]["mentions"]
+    pipeline_mentions = results["pipeline"]["mentions"]
+    return {
+        **results,
+        "both": sorted(dictionary_mentions.keys() & pipeline_mentions.keys()),
+        "dictionary_only": sorted(dictionary_mentions.keys() - pipeline_mentions.keys()),
+        "pipeline_only": sorted(pipeline_mentions.keys() - dictionary_mentions.keys()),
+        "same_top_cui": sorted(
+            mention
+            for mention in dictionary_mentions.keys() & pipeline_mentions.keys()
+            if dictionary_mentions[mention][:1] == pipeline_mentions[mention][:1]
+        ),
+    }
+
+
+@app.post("/extract_entities", response_model=Dict[str, Any])
+def extract_entities(req: TextRequest) -> Dict[str, Any]:
+    """
+    Process the input text and return recognized entities along with their UMLS details.
+    With `compare`, also report how the dictionary fast path and the full pipeline differ.
+    """
+    runner = get_profile(req.profile)
+    drug_dictionary = get_dictionary(req.dictionary)
+    key = extraction_cache.key_for(req.text, cache_version(runner, drug_dictionary))
+    mentions = extraction_cache.get(key)
+    if mentions is None:
+        mentions = runner.extract(req.text, drug_dictionary)
+        extraction_cache.put(key, mentions)
+
+    response = {"entities": serialize_entities(mentions, runner.linker, req.shape)}
+    if req.compare:
+        response["comparison"] = compare_paths(runner, req.text)
+    return response
+
+
+@app.post(
+    "/extract_entities_batch",
+    response_model=Dict[str, List[Dict[str, List[Dict[str, Any]]]]],
+)
+def extract_entities_batch(req: BatchTextRequest) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Process many texts with nlp.pipe and return their entities in input order.
+
+    Texts are processed in batches of `batch_size`. `n_process` above 1 runs the pipeline
+    in several processes; it is capped by NLP_MAX_N_PROCESS because every process needs
+    its own copy of the linker knowledge base. Cached texts and repeated texts within
+    the request are processed only once.
+    """
+    runner = get_profile(req.profile)
+    drug_dictionary = get_dictionary(req.dictionary)
+    n_process = min(req.n_process, MAX_N_PROCESS)
+
+    version = cache_version(runner, drug_dictionary)
+    keys = [extraction_cache.key_for(text, version) for text in req.texts]
+    found = {}
+    missing = {}
+    for key, text in zip(keys, req.texts):
+        if key in found or key in missing:
+            continue
+        mentions = extraction_cache.get(key)
+        if mentions is None:
+            missing[key] = text
+        else:
+            found[key] = mentions
+
+    if missing:
+        extracted = runner.extract_batch(
+            list(missing.values()), req.batch_size, n_process, drug_dictionary
+        )
+        for key, mentions in zip(missing, extracted):
+            found[key] = mentions
+            extraction_cache.put(key, mentions)
+
+    results = [
+        {"entities": serialize_entities(found[key], runner.linker, req.shape)} for key in keys
+    ]
+    return {"results": results}
+
+
+def stream_lines(
+    runner: ProfileRunner,
+    drug_dictionary: Optional[DrugDictionary],
+    chunks: List[TextChunk],
+    shape: ResponseShape,
+) -> Iterator[str]:
+    """
+    Extract entities chunk by chunk, yielding one NDJSON line per chunk and a final
+    summary line. Chunks left once NLP_STREAM_MAX_SECONDS have passed are skipped.
+    """
+    started = time.perf_counter()
+    version = cache_version(runner, drug_dictionary)
+    processed = 0
+    for chunk in chunks:
+        # The first chunk always runs, so every request gets some entities back
+        if processed and time.perf_counter() - started > STREAM_MAX_SECONDS:
+            break
+
+        chunk_started = time.perf_counter()
+        key = extraction_cache.key_for(chunk.text, version)
+        mentions = extraction_cache.get(key)
+        if mentions is None:
+            mentions = runner.extract(chunk.text, drug_dictionary)
+            extraction_cache.put(key, mentions)
+
+        line = {
+            "chunk": processed,
+            "start": chunk.start,
+            "end": chunk.end,
+            "seconds": round(time.perf_counter() - chunk_started, 6),
+            "entities": serialize_entities(mentions, runner.linker, shape),
+        }
+        processed += 1
+        yield json.dumps(line) + "\n"
+
+    summary = {
+        "done": True,
+        "chunks": processed,
+        "total_chunks": len(chunks),
+        "truncated": processed < len(chunks),
+        "seconds": round(time.perf_counter() - started, 6),
+    }
+    yield json.dumps(summary) + "\n"
+
+
+@app.post("/extract_entities_stream")
+def extract_entities_stream(req: StreamTextRequest) -> StreamingResponse:
+    """
+    Split a long text into sentence-aligned chunks of at most `chunk_chars` characters
+    and stream the entities of each chunk as soon as it is processed, as NDJSON.
+
+    Every chunk line has the chunk's character offsets in the text and its entities;
+    the last line reports how many chunks were processed and whether the time budget
+    cut the text short.
+    """
+    runner = get_profile(req.profile)
+    drug_dictionary = get_dictionary(req.dictionary)
+    chunks = split_text(req.text, req.chunk_chars)
+    return StreamingResponse(
+        stream_lines(runner, drug_dictionary, chunks, req.shape),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.get("/stats")
+def stats() -> Dict[str, Any]:
+    """
+    Pipeline profiles and hit rates of the extraction and entity caches.
+    """
+    entity_cache = entity_payload.cache_info()
+    return {
+        "model": model_state.report(),
+        "default_profile": DEFAULT_PROFILE,
+        "profiles": {name: profile.model_dump() for name, profile in PROFILES.items()},
+        "dictionary": {
+            "enabled": DICTIONARY_ENABLED,
+            "names": dictionary.size if dictionary is not None else 0,
+            "min_coverage": DICTIONARY_MIN_COVERAGE,
+        },
+        "extraction_cache": extraction_cache.stats(),
+        "entity_cache": {
+            "hits": entity_cache.hits,
+            "misses": entity_cache.misses,
+            "entries": entity_cache.currsize,
+            "max_entries": entity_cache.maxsize,
+        },
+    }
+
+
+@app.get("/memory")
+def memory() -> Dict[str, Any]:
+    """
+    Shared and private memory of the worker serving this request, in KiB.
+    See memory_report.py for all workers at once.
+    """
+    return {"pid": os.getpid(), **read_memory()}
 
 
 @app.get("/health")
-def health_check() -> Dict[str, str]:
+def health_check() -> Dict[str, Any]:
     """
     Health check endpoint to verify that the application is running and the model is loaded.
-    If the model is accessible, returns a simple JSON status.
+    If the model is accessible, returns a simple JSON status with how long loading took.
     """
-    if root_nlp is None:
+    if not model_state.is_ready:
         raise HTTPException(status_code=503, detail="Model not loaded yet")
-    return {"status": "ok", "message": "Service is healthy"}
+    return {
+        "status": "ok",
+        "message": "Service is healthy",
+        "pipeline_source": model_state.source,
+        "startup_seconds": model_state.load_seconds,
+    }
+
+
+@app.get("/health/live")
+def liveness():
+    """
+    The process is up and serving requests, whether or not the model is loaded yet. Returns
+    503 once loading has failed, so the orchestrator restarts the process instead of keeping
+    a replica that can never become ready.
+    """
+    if model_state.status == "failed":
+        return JSONResponse(
+            status_code=503, content={"status": "failed", "error": model_state.error}
+        )
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+def readiness():
+    """
+    Ready once the model is loaded and has completed a warm-up inference. Returns 503 with
+    the load progress until then.
+    """
+    return JSONResponse(
+        status_code=200 if model_state.is_ready else 503, content=model_state.report()
+    )
@@ -0,0 +1,88 @@
+"""
+Shared vs. private memory of the model service processes.
+
+Workers forked from a master that loaded the pipeline share the model and knowledge base
+pages until they write to them. The kernel reports this per process in
+/proc/<pid>/smaps_rollup: `shared` is memory mapped by more than one process, `private`
+is memory only this process uses, and `pss` splits shared pages evenly between the
+processes that map them.
+
+Usage: python memory_report.py <master pid>
+"""
+
+import json
+import os
+import sys
+from typing import Dict, List
+
+# smaps fields summed into each figure, in KiB
+MEMORY_FIELDS = {
+    "rss": ["Rss"],
+    "pss": ["Pss"],
+    "shared": ["Shared_Clean", "Shared_Dirty"],
+    "private": ["Private_Clean", "Private_Dirty"],
+    "swap": ["Swap"],
+}
+
+
+def read_memory(pid="self") -> Dict[str, int]:
+    """
+    Memory of one process in KiB, from smaps_rollup or, on older kernels, smaps.
+    """
+    values = {}
+    path = f"/proc/{pid}/smaps_rollup"
+    if not os.path.exists(path):
+        path = f"/proc/{pid}/smaps"
+
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                field = parts[0].rstrip(":")
+                values[field] = values.get(field, 0) + int(parts[1])
+
+    return {
+        name: sum(values.get(field, 0) for field in fields)
+        for name, fields in MEMORY_FIELDS.items()
+    }
+
+
+def child_pids(pid: int) -> List[int]:
+    """
+    Direct children of a process, e.g. the workers of a gunicorn master.
+    """
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children.extend(int(child) for child in f.read().split())
+    return sorted(children)
+
+
+def memory_report(master_pid: int) -> Dict[str, object]:
+    """
+    Memory of the master and every worker, with totals.
+
+    `total_rss` is what the processes would use without page sharing, `total_pss` what
+    they actually use together.
+    """
+    processes = {"master": {"pid": master_pid, **read_memory(master_pid)}}
+    workers = []
+    for pid in child_pids(master_pid):
+        try:
+            workers.append({"pid": pid, **read_memory(pid)})
+        except FileNotFoundError:
+            # The worker exited while the report was being collected
+            continue
+    processes["workers"] = workers
+
+    everyone = [processes["master"], *workers]
+    processes["total_rss"] = sum(process["rss"] for process in everyone)
+    processes["total_pss"] = sum(process["pss"] for process in everyone)
+    return processes
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+    print(json.dumps(memory_report(int(sys.argv[1])), indent=2))
@@ -0,0 +1,127 @@
+"""
+Fully assembled pipeline snapshots for a fast model-service start.
+
+A fresh start loads the spaCy model, then builds the linker's candidate generator: it
+parses the knowledge base JSONL, unpickles the TF-IDF vectorizer and rebuilds the ANN
+index from the TF-IDF vectors. A snapshot stores the result of all that work:
+
+- `pipeline/`: the spaCy pipeline, written with `nlp.to_disk` (the linker is left out)
+- `ann_index.bin`: the ANN index saved together with its data points
+- `linker.joblib`: knowledge base, vectorizer and alias list; numpy arrays are memory-mapped
+  on load
+- `manifest.json`: the versions the snapshot was built with
+
+Usage: python snapshot.py <directory>
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+from typing import Any, Dict, Optional, Tuple
+
+import joblib
+import nmslib
+import spacy
+from scispacy.candidate_generation import CandidateGenerator
+
+SNAPSHOT_FORMAT = 1
+MANIFEST = "manifest.json"
+
+
+def installed_versions() -> Dict[str, Any]:
+    """
+    Versions a snapshot depends on: its pickles are only safe to load with the same ones.
+    """
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "spacy": metadata.version("spacy"),
+        "scispacy": metadata.version("scispacy"),
+        "scikit-learn": metadata.version("scikit-learn"),
+    }
+
+
+def save_snapshot(
+    nlp, candidate_generator: CandidateGenerator, path: str, info: Optional[Dict[str, Any]] = None
+) -> None:
+    """
+    Write the pipeline and the linker's candidate generator to a snapshot directory.
+    """
+    os.makedirs(path, exist_ok=True)
+    nlp.to_disk(os.path.join(path, "pipeline"))
+    candidate_generator.ann_index.saveIndex(os.path.join(path, "ann_index.bin"), save_data=True)
+    joblib.dump(
+        {
+            "kb": candidate_generator.kb,
+            "vectorizer": candidate_generator.vectorizer,
+            "concept_aliases": candidate_generator.ann_concept_aliases_list,
+        },
+        os.path.join(path, "linker.joblib"),
+    )
+
+    # The manifest goes last so an interrupted build is never mistaken for a snapshot
+    manifest = {
+        **installed_versions(),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "info": info or {},
+    }
+    with open(os.path.join(path, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def read_manifest(path: str) -> Optional[Dict[str, Any]]:
+    """
+    The manifest of a snapshot, or None if there is no complete snapshot at the path.
+    """
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def is_compatible(manifest: Dict[str, Any]) -> bool:
+    return all(manifest.get(key) == value for key, value in installed_versions().items())
+
+
+def load_snapshot(path: str, ef_search: int = 200) -> Tuple[Any, CandidateGenerator]:
+    """
+    Load the pipeline and candidate generator written by save_snapshot.
+    """
+    nlp = spacy.load(os.path.join(path, "pipeline"), exclude=["scispacy_linker"])
+
+    ann_index = nmslib.init(
+        method="hnsw", space="cosinesimil_sparse", data_type=nmslib.DataType.SPARSE_VECTOR
+    )
+    ann_index.loadIndex(os.path.join(path, "ann_index.bin"), load_data=True)
+    ann_index.setQueryTimeParams({"efSearch": ef_search})
+
+    parts = joblib.load(os.path.join(path, "linker.joblib"), mmap_mode="r")
+    candidate_generator = CandidateGenerator(
+        ann_index=ann_index,
+        tfidf_vectorizer=parts["vectorizer"],
+        ann_concept_aliases_list=parts["concept_aliases"],
+        kb=parts["kb"],
+        ef_search=ef_search,
+    )
+    return nlp, candidate_generator
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+
+    from main import LINKER_CONFIG, MODEL_NAME, load_pipeline
+
+    started = time.perf_counter()
+    nlp, candidate_generator, _ = load_pipeline()
+    save_snapshot(
+        nlp,
+        candidate_generator,
+        sys.argv[1],
+        info={"model": MODEL_NAME, "linker": LINKER_CONFIG},
+    )
+    print(f"Snapshot written to {sys.argv[1]} in {time.perf_counter() - started:.1f} s")
@@ -0,0 +1,82 @@
+import json
+
+import benchmark
+import main
+import pytest
+from test_main import DummyDoc, DummyEntity, DummyNLP
+
+
+class PipelineNLP(DummyNLP):
+    """
+    Dummy pipeline whose components can be run one at a time.
+    """
+
+    def make_doc(self, text):
+        return DummyDoc([])
+
+    @property
+    def pipeline(self):
+        def ner(doc):
+            doc.ents = [DummyEntity("advil", "CHEMICAL", [("C0000870", 0.95)])]
+            return doc
+
+        def passthrough(doc):
+            return doc
+
+        return [(name, ner if name == "ner" else passthrough) for name in self.pipe_names]
+
+
+@pytest.fixture
+def pipeline_nlp(monkeypatch):
+    nlp = PipelineNLP()
+    monkeypatch.setattr(main, "root_nlp", nlp)
+    monkeypatch.setattr(main, "profiles", main.build_profiles(nlp, nlp.linker.candidate_generator))
+    monkeypatch.setattr(main, "extraction_cache", main.ExtractionCache(max_entries=100))
+    monkeypatch.setattr(main, "model_state", main.ModelState(status="ready"))
+    return nlp
+
+
+def test_build_corpus():
+    corpus = benchmark.build_corpus(size=100)
+    assert len(corpus) == 100
+    assert any("ibuprofen" in text for text in corpus)
+    assert benchmark.build_corpus(size=10) == benchmark.build_corpus(size=10)
+
+
+def test_load_corpus(tmp_path):
+    path = tmp_path / "corpus.txt"
+    path.write_text('Advil 200 mg\n\n{"text": "Tylenol 500 mg"}\n')
+    assert benchmark.load_corpus(str(path)) == ["Advil 200 mg", "Tylenol 500 mg"]
+
+
+def test_summarize():
+    summary = benchmark.summarize([float(value) for value in range(1, 101)])
+    assert summary["p50"] == 50.5
+    assert summary["p95"] == 95.0
+    assert summary["p99"] == 99.0
+    assert summary["max"] == 100.0
+
+
+def test_run_benchmark(pipeline_nlp):
+    texts = benchmark.build_corpus(size=6)
+    results = benchmark.run_benchmark(texts, concurrency_levels=[1, 3], requests=9)
+
+    assert [run["concurrency"] for run in results["runs"]] == [1, 3]
+    for run in results["runs"]:
+        assert run["errors"] == {}
+        assert run["requests_per_second"] > 0
+        assert set(run["latency_ms"]) == {"mean", "p50", "p95", "p99", "max"}
+
+    stages = results["stages"]
+    assert set(stages) == set(benchmark.STAGES)
+    assert sum(stage["share"] for stage in stages.values()) == pytest.approx(1, abs=0.01)
+    # Every request reached the pipeline, the extraction cache was off
+    assert len(pipeline_nlp.calls) == 9 * 2
+    assert results["environment"]["pipeline_version"] == main.profiles["accurate"].version
+
+
+def test_cli(pipeline_nlp, tmp_path):
+    output = tmp_path / "results.json"
+    argv = ["--concurrency", "2", "--requests", "4", "--output", str(output)]
+    assert benchmark.run(argv) == 0
+    assert json.loads(output.read_text())["runs"][0]["requests"] == 4
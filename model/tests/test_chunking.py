@@ -0,0 +1,37 @@
+import pytest
+from chunking import split_text
+
+TEXT = "Take one tablet daily. Do not exceed the dose!\nKeep out of reach of children."
+
+
+def test_chunks_pack_whole_sentences():
+    chunks = split_text(TEXT, 50)
+    assert [chunk.text for chunk in chunks] == [
+        "Take one tablet daily. Do not exceed the dose!\n",
+        "Keep out of reach of children.",
+    ]
+    for chunk in chunks:
+        assert TEXT[chunk.start : chunk.end] == chunk.text
+
+
+def test_short_text_is_one_chunk():
+    assert split_text(TEXT, 1000) == [(0, TEXT)]
+
+
+def test_long_sentences_are_cut_at_whitespace():
+    text = "ibuprofen " * 30
+    chunks = split_text(text, 45)
+    assert all(len(chunk.text) <= 45 for chunk in chunks)
+    assert all(chunk.text.strip().split() == ["ibuprofen"] * 4 for chunk in chunks[:-1])
+    assert "".join(chunk.text for chunk in chunks) == text
+
+
+def test_words_longer_than_a_chunk_are_cut():
+    chunks = split_text("x" * 25, 10)
+    assert [len(chunk.text) for chunk in chunks] == [10, 10, 5]
+
+
+def test_blank_text():
+    assert split_text("  \n\n ", 10) == []
+    with pytest.raises(ValueError):
+        split_text(TEXT, 0)
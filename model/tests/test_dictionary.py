@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+
+from dictionary import DrugDictionary, coverage
+
+KB = SimpleNamespace(
+    alias_to_cuis={
+        "ibuprofen": {"C0000870"},
+        "Ibuprofen Oral Tablet": {"C0000871"},
+        "advil": {"C0000870"},
+        "Tylenol": {"C0000970"},
+        "APAP": {"C0000970"},
+        "ib": {"C9999999"},
+    }
+)
+
+
+def test_find_whole_words_case_insensitive():
+    dictionary = DrugDictionary(KB)
+    matches = dictionary.find("Took ADVIL, not advils or tylenol.")
+    assert [(match.text, match.cuis) for match in matches] == [
+        ("ADVIL", ("C0000870",)),
+        ("tylenol", ("C0000970",)),
+    ]
+    assert matches[0].start == 5 and matches[0].end == 10
+
+
+def test_find_prefers_longest_match():
+    dictionary = DrugDictionary(KB)
+    matches = dictionary.find("Ibuprofen oral tablet 200 mg")
+    assert [match.text for match in matches] == ["Ibuprofen oral tablet"]
+    assert matches[0].cuis == ("C0000871",)
+
+
+def test_short_names_are_left_out():
+    dictionary = DrugDictionary(KB)
+    assert dictionary.size == 5
+    assert dictionary.find("ib") == []
+
+
+def test_coverage():
+    dictionary = DrugDictionary(KB)
+    text = "Advil 200 mg"
+    assert coverage(text, dictionary.find(text)) == 0.5
+    assert coverage("...", []) == 0.0
@@ -1,18 +1,24 @@
+import json
+import threading
+import time
+
 import pytest
 from fastapi.testclient import TestClient
 from main import app, setup_model
 
-
 # --- Dummy Classes for Mocking spaCy and scispaCy Behavior --- #
 
 
 class DummyEntity:
-    def __init__(self, text, label, umls_ents):
+    def __init__(self, text, label, umls_ents, start_char=0):
         self.text = text
         self.label_ = label
+        self.start_char = start_char
+        self.end_char = start_char + len(text)
         # Create a dummy namespace for custom attributes.
         self._ = type("DummyExtension", (), {})()
         self._.umls_ents = umls_ents
+        self._.kb_ents = umls_ents
 
 
 class DummyDoc:
@@ -20,11 +26,43 @@ class DummyDoc:
         self.ents = ents
 
 
+class DummyCandidate:
+    def __init__(self, concept_id, similarity):
+        self.concept_id = concept_id
+        self.similarities = [similarity]
+
+
+class DummyCandidateGenerator:
+    def __init__(self, kb):
+        self.kb = kb
+        self.calls = []
+
+    def __call__(self, mention_strings, k):
+        # Simulate the nearest-neighbour search, finding ibuprofen for "advil".
+        self.calls.append({"mentions": list(mention_strings), "k": k})
+        return [
+            (
+                [DummyCandidate("C0000870", 0.95), DummyCandidate("C0000871", 0.75)]
+                if mention.lower() == "advil"
+                else []
+            )
+            for mention in mention_strings
+        ]
+
+
 class DummyLinker:
     def __init__(self, cui_to_entity):
         # Simulate a simple UMLS mapping.
         self.umls = type("DummyUMLS", (), {})()
         self.umls.cui_to_entity = cui_to_entity
+        self.umls.alias_to_cuis = {
+            "ibuprofen": {"C0000870"},
+            "advil": {"C0000870"},
+            "motrin": {"C0000870"},
+            "ibuprofen oral tablet": {"C0000871"},
+        }
+        self.kb = self.umls
+        self.candidate_generator = DummyCandidateGenerator(self.kb)
 
 
 class DummyNLP:
@@ -35,16 +73,50 @@ class DummyNLP:
                 "C0000870": type(
                     "EntityDetail",
                     (),
-                    {"canonical_name": "Ibuprofen", "aliases": ["Advil", "Motrin", "Brufen"]},
-                )()
+                    {
+                        "concept_id": "C0000870",
+                        "canonical_name": "Ibuprofen",
+                        "definition": "A non-steroidal anti-inflammatory agent",
+                        "aliases": ["Advil", "Motrin", "Brufen"],
+                    },
+                )(),
+                "C0000871": type(
+                    "EntityDetail",
+                    (),
+                    {
+                        "concept_id": "C0000871",
+                        "canonical_name": "Ibuprofen Oral Tablet",
+                        "definition": "Ibuprofen in tablet form",
+                        "aliases": [],
+                    },
+                )(),
             }
         )
+        self.meta = {"version": "0.5.4"}
+        self.pipe_names = ["tok2vec", "tagger", "parser", "ner", "abbreviation_detector"]
+        self.pipe_calls = []
+        self.calls = []
 
-    def __call__(self, text):
+    def __call__(self, text, disable=None):
         # Simulate the extraction of a single entity.
-        dummy_entity = DummyEntity("advil", "CHEMICAL", [("C0000870", 0.95)])
+        self.calls.append(text)
+        self.disabled = disable
+        start = max(text.lower().find("advil"), 0)
+        dummy_entity = DummyEntity("advil", "CHEMICAL", [("C0000870", 0.95)], start)
         return DummyDoc([dummy_entity])
 
+    def pipe(self, texts, batch_size=32, n_process=1, disable=None):
+        # Simulate batched processing, keeping the input order.
+        texts = list(texts)
+        self.pipe_calls.append(
+            {"batch_size": batch_size, "n_process": n_process, "texts": len(texts)}
+        )
+        for text in texts:
+            if "advil" in text:
+                yield self(text, disable=disable)
+            else:
+                yield DummyDoc([])
+
     def get_pipe(self, name):
         if name == "scispacy_linker":
             return self.linker
@@ -93,3 +165,353 @@ def test_process_text(http_client):
     assert umls_entity["score"] == 0.95
     assert umls_entity["canonical_name"] == "Ibuprofen"
     assert "Advil" in umls_entity["aliases"]
+
+
+@pytest.fixture
+def dummy_nlp(monkeypatch):
+    # Replace the loaded pipeline with the dummy NLP model.
+    import main
+
+    nlp = DummyNLP()
+    monkeypatch.setattr(main, "root_nlp", nlp)
+    monkeypatch.setattr(main, "profiles", main.build_profiles(nlp, nlp.linker.candidate_generator))
+    monkeypatch.setattr(main, "extraction_cache", main.ExtractionCache(max_entries=100))
+    monkeypatch.setattr(main, "model_state", main.ModelState(status="ready"))
+    return nlp
+
+
+def test_process_batch(dummy_nlp):
+    test_client = TestClient(app)
+    payload = {
+        "texts": ["The patient took advil.", "No drugs here.", "advil again"],
+        "batch_size": 2,
+    }
+    response = test_client.post("/extract_entities_batch", json=payload)
+    assert response.status_code == 200
+
+    results = response.json()["results"]
+    assert len(results) == 3
+    assert [len(result["entities"]) for result in results] == [1, 0, 1]
+    assert results[0]["entities"][0]["text"] == "advil"
+    assert dummy_nlp.pipe_calls == [{"batch_size": 2, "n_process": 1, "texts": 3}]
+
+
+def test_process_batch_caps_processes(dummy_nlp):
+    test_client = TestClient(app)
+    payload = {"texts": ["advil"], "n_process": 8}
+    response = test_client.post("/extract_entities_batch", json=payload)
+    assert response.status_code == 200
+    assert dummy_nlp.pipe_calls[0]["n_process"] == 1
+
+
+def test_process_batch_rejects_invalid_batch_size(dummy_nlp):
+    test_client = TestClient(app)
+    response = test_client.post(
+        "/extract_entities_batch", json={"texts": ["advil"], "batch_size": 0}
+    )
+    assert response.status_code == 422
+
+
+def test_response_shape(dummy_nlp):
+    test_client = TestClient(app)
+    payload = {
+        "text": "The patient took advil.",
+        "shape": {"fields": ["canonical_name", "aliases", "score"], "max_aliases": 2},
+    }
+    response = test_client.post("/extract_entities", json=payload)
+    assert response.status_code == 200
+
+    umls_entity = response.json()["entities"][0]["umls_entities"][0]
+    assert umls_entity == {
+        "canonical_name": "Ibuprofen",
+        "aliases": ["Advil", "Motrin"],
+        "score": 0.95,
+    }
+
+
+def test_lean_response_shape(dummy_nlp):
+    test_client = TestClient(app)
+    payload = {"text": "The patient took advil.", "shape": {"fields": [], "max_candidates": 0}}
+    response = test_client.post("/extract_entities", json=payload)
+    assert response.status_code == 200
+    assert response.json() == {"entities": [{"text": "advil", "umls_entities": []}]}
+
+
+def test_default_response_shape(dummy_nlp):
+    test_client = TestClient(app)
+    response = test_client.post("/extract_entities", json={"text": "The patient took advil."})
+    assert response.status_code == 200
+
+    umls_entity = response.json()["entities"][0]["umls_entities"][0]
+    assert set(umls_entity) == {"canonical_name", "definition", "aliases"}
+    assert umls_entity["aliases"] == ["Advil", "Motrin", "Brufen"]
+
+
+def test_normalized_text_cache(dummy_nlp):
+    test_client = TestClient(app)
+    for text in ["The patient took advil.", "  the PATIENT took\nadvil. "]:
+        response = test_client.post("/extract_entities", json={"text": text})
+        assert response.status_code == 200
+        assert response.json()["entities"][0]["text"] == "advil"
+
+    assert dummy_nlp.calls == ["The patient took advil."]
+    cache_stats = test_client.get("/stats").json()["extraction_cache"]
+    assert cache_stats["hits"] == 1
+    assert cache_stats["misses"] == 1
+    assert cache_stats["hit_rate"] == 0.5
+
+
+def test_batch_uses_cache_and_skips_duplicates(dummy_nlp):
+    test_client = TestClient(app)
+    test_client.post("/extract_entities", json={"text": "advil"})
+    payload = {"texts": ["ADVIL", "no drugs", "No  drugs"]}
+    response = test_client.post("/extract_entities_batch", json=payload)
+    assert response.status_code == 200
+
+    results = response.json()["results"]
+    assert [len(result["entities"]) for result in results] == [1, 0, 0]
+    assert dummy_nlp.pipe_calls[0]["texts"] == 1
+
+
+def test_extraction_cache_evicts_least_recently_used():
+    import main
+
+    cache = main.ExtractionCache(max_entries=2)
+    for text in ["a", "b"]:
+        cache.put(cache.key_for(text, "v1"), [])
+    cache.get(cache.key_for("a", "v1"))
+    cache.put(cache.key_for("c", "v1"), [])
+
+    assert cache.get(cache.key_for("b", "v1")) is None
+    assert cache.get(cache.key_for("A", "v1")) == []
+    assert cache.get(cache.key_for("a", "v2")) is None
+
+
+def test_profiles(dummy_nlp):
+    test_client = TestClient(app)
+    candidate_generator = dummy_nlp.linker.candidate_generator
+
+    payload = {"text": "The patient took advil.", "shape": {"fields": ["cui"]}}
+    response = test_client.post("/extract_entities", json=payload)
+    assert response.status_code == 200
+    accurate = response.json()["entities"][0]["umls_entities"]
+    assert candidate_generator.calls[-1]["k"] == 30
+    assert "parser" not in dummy_nlp.disabled
+    assert accurate == [{"cui": "C0000870"}, {"cui": "C0000871"}]
+
+    response = test_client.post("/extract_entities", json={**payload, "profile": "fast"})
+    assert response.status_code == 200
+    fast = response.json()["entities"][0]["umls_entities"]
+    assert candidate_generator.calls[-1]["k"] == 10
+    assert {"tagger", "parser", "abbreviation_detector"} <= set(dummy_nlp.disabled)
+    assert fast == [{"cui": "C0000870"}]
+
+
+def test_profiles_have_separate_cache_entries(dummy_nlp):
+    test_client = TestClient(app)
+    for profile in ["accurate", "fast", "accurate"]:
+        payload = {"text": "advil", "profile": profile}
+        assert test_client.post("/extract_entities", json=payload).status_code == 200
+
+    assert len(dummy_nlp.calls) == 2
+
+
+def test_unknown_profile(dummy_nlp):
+    test_client = TestClient(app)
+    response = test_client.post("/extract_entities", json={"text": "advil", "profile": "nope"})
+    assert response.status_code == 422
+
+
+def test_health_reports_startup(dummy_nlp):
+    test_client = TestClient(app)
+    response = test_client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ok"
+
+
+def test_background_loading(monkeypatch):
+    import main
+
+    nlp = DummyNLP()
+    loaded = threading.Event()
+
+    def slow_load_pipeline(on_stage):
+        on_stage("loading spaCy model")
+        loaded.wait(5)
+        return nlp, nlp.linker.candidate_generator, "spacy.load"
+
+    monkeypatch.setattr(main, "load_pipeline", slow_load_pipeline)
+    monkeypatch.setattr(main, "model_state", main.ModelState())
+    monkeypatch.setattr(main, "extraction_cache", main.ExtractionCache(max_entries=100))
+
+    with TestClient(app) as test_client:
+        assert test_client.get("/health/live").status_code == 200
+        response = test_client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.json()["stage"] == "loading spaCy model"
+        assert test_client.post("/extract_entities", json={"text": "advil"}).status_code == 503
+
+        loaded.set()
+        for _ in range(100):
+            response = test_client.get("/health/ready")
+            if response.status_code == 200:
+                break
+            time.sleep(0.05)
+
+        assert response.status_code == 200
+        report = response.json()
+        assert report["progress"] == 1.0
+        assert report["load_seconds"] >= 0
+        assert report["warm_up_seconds"] >= 0
+        # The warm-up inference ran through every profile
+        assert len(nlp.calls) == len(main.PROFILES)
+        assert test_client.post("/extract_entities", json={"text": "advil"}).status_code == 200
+        assert test_client.get("/health").json()["pipeline_source"] == "spacy.load"
+
+
+def test_failed_loading_is_reported(monkeypatch):
+    import main
+
+    def broken_load_pipeline(on_stage):
+        raise OSError("Can't find model 'en_ner_bc5cdr_md'")
+
+    monkeypatch.setattr(main, "load_pipeline", broken_load_pipeline)
+    monkeypatch.setattr(main, "model_state", main.ModelState())
+    test_client = TestClient(app)
+    assert test_client.get("/health/live").status_code == 200
+
+    main.load_model()
+
+    # A failed load cannot recover, so liveness fails too and the process gets restarted
+    response = test_client.get("/health/live")
+    assert response.status_code == 503
+    assert "en_ner_bc5cdr_md" in response.json()["error"]
+    response = test_client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "failed"
+    assert "en_ner_bc5cdr_md" in response.json()["error"]
+
+
+@pytest.fixture
+def drug_dictionary(dummy_nlp, monkeypatch):
+    # Build the dictionary from the dummy knowledge base and use it by default.
+    import main
+    from dictionary import DrugDictionary
+
+    monkeypatch.setattr(main, "dictionary", DrugDictionary(dummy_nlp.linker.kb))
+    monkeypatch.setattr(main, "DICTIONARY_ENABLED", True)
+    return main.dictionary
+
+
+def test_dictionary_answers_covered_text(drug_dictionary, dummy_nlp):
+    test_client = TestClient(app)
+    payload = {"text": "Advil", "shape": {"fields": ["cui", "score"]}}
+    response = test_client.post("/extract_entities", json=payload)
+    assert response.status_code == 200
+
+    entities = response.json()["entities"]
+    assert entities == [{"text": "Advil", "umls_entities": [{"cui": "C0000870", "score": 1.0}]}]
+    assert dummy_nlp.calls == []
+
+
+def test_dictionary_links_only_unmatched_entities(drug_dictionary, dummy_nlp):
+    test_client = TestClient(app)
+    text = "The patient reported taking advil twice a day with food for a week, plus ibuprofen."
+    payload = {"text": text, "shape": {"fields": ["cui"]}}
+    response = test_client.post("/extract_entities", json=payload)
+    assert response.status_code == 200
+
+    entities = response.json()["entities"]
+    assert [entity["text"] for entity in entities] == ["advil", "ibuprofen"]
+    assert entities[0]["umls_entities"] == [{"cui": "C0000870"}]
+    # NER ran, but the entity the dictionary matched never reached the linker
+    assert dummy_nlp.calls == [text]
+    calls = dummy_nlp.linker.candidate_generator.calls
+    assert all("advil" not in call["mentions"] for call in calls)
+
+
+def test_dictionary_in_batch(drug_dictionary, dummy_nlp):
+    test_client = TestClient(app)
+    payload = {"texts": ["Motrin", "The patient took advil after dinner.", "no drugs at all"]}
+    response = test_client.post("/extract_entities_batch", json=payload)
+    assert response.status_code == 200
+
+    results = response.json()["results"]
+    assert [len(result["entities"]) for result in results] == [1, 1, 0]
+    assert dummy_nlp.pipe_calls[0]["texts"] == 2
+
+
+def test_dictionary_can_be_turned_off_per_request(drug_dictionary, dummy_nlp):
+    test_client = TestClient(app)
+    response = test_client.post("/extract_entities", json={"text": "advil", "dictionary": False})
+    assert response.status_code == 200
+    assert dummy_nlp.calls == ["advil"]
+
+
+def test_dictionary_disabled(dummy_nlp):
+    test_client = TestClient(app)
+    response = test_client.post("/extract_entities", json={"text": "advil", "dictionary": True})
+    assert response.status_code == 422
+
+
+def test_compare_paths(drug_dictionary, dummy_nlp):
+    test_client = TestClient(app)
+    payload = {"text": "Took ibuprofen and advil.", "compare": True}
+    response = test_client.post("/extract_entities", json=payload)
+    assert response.status_code == 200
+
+    comparison = response.json()["comparison"]
+    assert comparison["both"] == ["advil"]
+    assert comparison["dictionary_only"] == ["ibuprofen"]
+    assert comparison["pipeline_only"] == []
+    assert comparison["same_top_cui"] == ["advil"]
+    assert comparison["pipeline"]["seconds"] >= 0
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_stream_entities(dummy_nlp):
+    test_client = TestClient(app)
+    text = "The patient took advil. " * 10
+    payload = {"text": text, "chunk_chars": 100, "shape": {"fields": ["cui"]}}
+    response = test_client.post("/extract_entities_stream", json=payload)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    lines = read_ndjson(response)
+    chunks, summary = lines[:-1], lines[-1]
+    assert len(chunks) == 3
+    assert [chunk["chunk"] for chunk in chunks] == [0, 1, 2]
+    assert all(chunk["end"] - chunk["start"] <= 100 for chunk in chunks)
+    assert chunks[0]["entities"][0]["umls_entities"][0] == {"cui": "C0000870"}
+    assert summary["done"] and not summary["truncated"]
+    assert summary["chunks"] == summary["total_chunks"] == 3
+    # Identical chunks are served from the extraction cache
+    assert len(dummy_nlp.calls) == 2
+
+
+def test_stream_time_budget(dummy_nlp, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "STREAM_MAX_SECONDS", 0)
+    test_client = TestClient(app)
+    text = " ".join(f"Sentence {number} mentions advil." for number in range(20))
+    payload = {"text": text, "chunk_chars": 50}
+    response = test_client.post("/extract_entities_stream", json=payload)
+
+    summary = read_ndjson(response)[-1]
+    assert summary["chunks"] == 1
+    assert summary["truncated"]
+    assert summary["total_chunks"] > 1
+
+
+def test_stream_rejects_oversized_input(dummy_nlp):
+    import main
+
+    test_client = TestClient(app)
+    payload = {"text": "a" * (main.MAX_STREAM_CHARS + 1)}
+    assert test_client.post("/extract_entities_stream", json=payload).status_code == 422
+    payload = {"text": "advil", "chunk_chars": main.STREAM_CHUNK_CHARS + 1}
+    assert test_client.post("/extract_entities_stream", json=payload).status_code == 422
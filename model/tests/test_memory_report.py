@@ -0,0 +1,40 @@
+import multiprocessing
+import os
+
+import pytest
+
+from memory_report import memory_report, read_memory
+
+pytestmark = pytest.mark.skipif(not os.path.exists("/proc/self/smaps"), reason="needs Linux /proc")
+
+
+def test_read_memory():
+    memory = read_memory()
+    assert set(memory) == {"rss", "pss", "shared", "private", "swap"}
+    assert memory["rss"] > 0
+    assert memory["shared"] + memory["private"] == memory["rss"]
+
+
+def test_memory_report_lists_workers():
+    context = multiprocessing.get_context("fork")
+    ready = context.Event()
+    stop = context.Event()
+
+    def worker():
+        ready.set()
+        stop.wait(10)
+
+    process = context.Process(target=worker)
+    process.start()
+    try:
+        ready.wait(10)
+        report = memory_report(os.getpid())
+    finally:
+        stop.set()
+        process.join()
+
+    assert report["master"]["pid"] == os.getpid()
+    worker_report = next(w for w in report["workers"] if w["pid"] == process.pid)
+    # A forked child shares most of its pages with the parent
+    assert worker_report["shared"] > 0
+    assert report["total_pss"] <= report["total_rss"]
@@ -0,0 +1,65 @@
+import json
+
+import nmslib
+import pytest
+import spacy
+from scispacy.abbreviation import AbbreviationDetector  # noqa: F401
+from scispacy.candidate_generation import CandidateGenerator
+from scispacy.linking_utils import KnowledgeBase
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from snapshot import installed_versions, is_compatible, load_snapshot, read_manifest, save_snapshot
+
+CONCEPTS = [
+    {"concept_id": "C1", "canonical_name": "ibuprofen", "aliases": ["advil", "motrin"]},
+    {"concept_id": "C2", "canonical_name": "paracetamol", "aliases": ["acetaminophen"]},
+    {"concept_id": "C3", "canonical_name": "aspirin", "aliases": ["acetylsalicylic acid"]},
+]
+
+
+@pytest.fixture
+def candidate_generator(tmp_path):
+    # A tiny knowledge base and ANN index, built the way scispaCy builds its own.
+    kb_path = tmp_path / "kb.jsonl"
+    kb_path.write_text(
+        "\n".join(json.dumps({**concept, "types": [], "definition": None}) for concept in CONCEPTS)
+    )
+    kb = KnowledgeBase(str(kb_path))
+
+    aliases = list(kb.alias_to_cuis)
+    vectorizer = TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 3), dtype="float32")
+    vectors = vectorizer.fit_transform(aliases)
+    ann_index = nmslib.init(
+        method="hnsw", space="cosinesimil_sparse", data_type=nmslib.DataType.SPARSE_VECTOR
+    )
+    ann_index.addDataPointBatch(vectors)
+    ann_index.createIndex({"M": 10, "efConstruction": 100, "post": 0})
+
+    return CandidateGenerator(
+        ann_index=ann_index, tfidf_vectorizer=vectorizer, ann_concept_aliases_list=aliases, kb=kb
+    )
+
+
+def test_snapshot_round_trip(tmp_path, candidate_generator):
+    nlp = spacy.blank("en")
+    nlp.add_pipe("abbreviation_detector")
+    snapshot_dir = tmp_path / "snapshot"
+
+    save_snapshot(nlp, candidate_generator, str(snapshot_dir), info={"model": "blank"})
+    manifest = read_manifest(str(snapshot_dir))
+    assert manifest["info"] == {"model": "blank"}
+    assert is_compatible(manifest)
+
+    loaded_nlp, loaded_generator = load_snapshot(str(snapshot_dir))
+    assert loaded_nlp.pipe_names == ["abbreviation_detector"]
+    assert loaded_generator.kb.cui_to_entity["C1"].canonical_name == "ibuprofen"
+
+    expected = candidate_generator(["advil"], 2)[0]
+    candidates = loaded_generator(["advil"], 2)[0]
+    assert [c.concept_id for c in candidates] == [c.concept_id for c in expected]
+    assert candidates[0].concept_id == "C1"
+
+
+def test_incomplete_or_outdated_snapshots_are_ignored(tmp_path):
+    assert read_manifest(str(tmp_path)) is None
+    assert not is_compatible({**installed_versions(), "spacy": "0.0.1"})